@@ -1,30 +1,29 @@
 """Admin API endpoints for skill management."""
 import asyncio
+import time
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from src.database import get_db, User, Skill
-from src.auth import get_current_user
+from src.auth import Principal, get_current_user, get_principal, invalidate_principal
 from src.agent_skills.skill_manager import (
     get_skill_manager,
     STATUS_PENDING
 )
-from src.agent_skills.skill_validator import get_validation_orchestrator
-from src.utils.get_logger import get_logger
+from src.utils.get_logger import get_log_levels, get_logger, set_log_level
+from src.utils.metrics import ACTIVE_STREAMS
 
 router = APIRouter()
 logger = get_logger("valid-agent-skill")
 
 
-async def get_admin_user(
-    token: str = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user and verify admin status."""
-    user = db.query(User).filter(User.user_id == token).first()
+async def get_admin_user(token: str = Depends(get_current_user)) -> Principal:
+    """Get current user and verify admin status (cached principal, no DB round trip on hit)."""
+    user = get_principal(token)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     if not user.is_admin:
@@ -68,6 +67,7 @@ class SkillResponse(BaseModel):
     execution_metrics: Optional[dict] = None
     task_results: Optional[list] = None
     regression_results: Optional[dict] = None
+    snapshot_build_id: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -129,6 +129,36 @@ def _extract_skill_response(skill: Skill) -> SkillResponse:
     )
 
 
+def _extract_skill_summary(skill: Skill) -> SkillResponse:
+    """列表页响应：只读取摘要字段，不触发延迟加载的大字段"""
+    return SkillResponse(
+        skill_id=skill.skill_id,
+        name=skill.name,
+        display_name=skill.display_name,
+        description=skill.description,
+        status=skill.status,
+        validation_stage=skill.validation_stage,
+        format_valid=skill.format_valid,
+        format_errors=skill.format_errors or [],
+        format_warnings=skill.format_warnings or [],
+        completion_score=skill.completion_score,
+        trigger_accuracy_score=skill.trigger_accuracy_score,
+        offline_capability_score=skill.offline_capability_score,
+        resource_efficiency_score=skill.resource_efficiency_score,
+        validation_score=skill.validation_score,
+        layer1_passed=skill.layer1_passed,
+        layer2_passed=skill.layer2_passed,
+        created_at=str(skill.created_at) if skill.created_at else None,
+        validated_at=str(skill.validated_at) if skill.validated_at else None,
+        approved_by=skill.approved_by,
+        approved_at=str(skill.approved_at) if skill.approved_at else None,
+        rejected_by=skill.rejected_by,
+        rejected_at=str(skill.rejected_at) if skill.rejected_at else None,
+        reject_reason=skill.reject_reason,
+        runtime_image_version=skill.runtime_image_version,
+    )
+
+
 class ApproveRequest(BaseModel):
     """Approve request."""
     pass
@@ -147,7 +177,7 @@ class ValidateRequest(BaseModel):
 @router.post("/skills/upload", response_model=SkillResponse)
 async def upload_skill(
     file: UploadFile = File(...),
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Upload a new skill (simplified: basic format check only, auto-approve).
@@ -166,10 +196,14 @@ async def upload_skill(
     manager = get_skill_manager()
     
     try:
-        skill = manager.create_simplified(db, file.file, admin.user_id, file.filename)
+        skill = await asyncio.to_thread(
+            manager.create_simplified, db, file.file, admin.user_id, file.filename
+        )
         
         from src.snapshot_manager import get_snapshot_manager
-        get_snapshot_manager().rebuild_skills_snapshot()
+        build_id = get_snapshot_manager().request_rebuild(
+            f"upload {skill.name}", requested_by=admin.user_id
+        )
         
         return SkillResponse(
             skill_id=skill.skill_id,
@@ -182,6 +216,7 @@ async def upload_skill(
             format_errors=skill.format_errors or [],
             format_warnings=skill.format_warnings or [],
             created_at=str(skill.created_at) if skill.created_at else None,
+            snapshot_build_id=build_id,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -195,7 +230,7 @@ async def list_skills(
     validation_stage: Optional[str] = None,
     page: int = 1,
     size: int = 20,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """List all skills with pagination.
@@ -222,10 +257,10 @@ async def list_skills(
         total_query = total_query.filter(Skill.validation_stage == validation_stage)
     total = total_query.count()
     
-    skills = manager.list_all(db, status=status, offset=offset, limit=size)
+    skills = manager.list_all(db, status=status, offset=offset, limit=size, summary=True)
     
     return SkillListResponse(
-        skills=[_extract_skill_response(s) for s in skills],
+        skills=[_extract_skill_summary(s) for s in skills],
         total=total,
         page=page,
         size=size
@@ -236,7 +271,7 @@ async def list_skills(
 @router.get("/skills/{skill_id}", response_model=SkillResponse)
 async def get_skill(
     skill_id: str,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get skill by ID.
@@ -261,13 +296,15 @@ async def get_skill(
 @router.post("/skills/{skill_id}/validate")
 async def validate_skill(
     skill_id: str,
-    admin: User = Depends(get_admin_user),
+    force: bool = False,
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Start skill validation.
     
     Args:
         skill_id: Skill ID
+        force: Skip the validation cache and run a fresh validation
         admin: Current admin user
         db: Database session
         
@@ -287,11 +324,13 @@ async def validate_skill(
         logger.warning(f"[API validate_skill] 状态不允许验证: {skill.status}")
         raise HTTPException(status_code=400, detail=f"Cannot validate skill with status: {skill.status}")
     
+    from src.agent_skills.skill_validator import get_validation_orchestrator
+    
     orchestrator = get_validation_orchestrator()
     
     try:
         logger.info(f"[API validate_skill] 开始执行验证流程 skill_id={skill_id}")
-        result = await orchestrator.validate_skill(skill_id)
+        result = await orchestrator.validate_skill(skill_id, force=force)
         logger.info(f"[API validate_skill] 验证完成 skill_id={skill_id} passed={result.get('passed')}")
         return {"message": "Validation completed", "result": result}
     except Exception as e:
@@ -299,16 +338,117 @@ async def validate_skill(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/skills/{skill_id}/validate/stream")
+async def validate_skill_stream(
+    skill_id: str,
+    force: bool = False,
+    admin: Principal = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """启动 Skill 验证并以 SSE 推送各阶段进度（validation/progress 事件）
+    
+    验证作为 validate 任务进入任务队列（按 skill_id 去重，重复请求只订阅已有任务），
+    可由任意 worker 执行，客户端断开不会中断验证。
+    
+    Args:
+        skill_id: Skill ID
+        force: Skip the validation cache and run a fresh validation
+        admin: Current admin user
+        db: Database session
+        
+    Returns:
+        text/event-stream of validation progress events
+    """
+    from src.agent_skills.validation_events import get_validation_event_bus
+    
+    skill = get_skill_manager().get(db, skill_id)
+    if not skill:
+        raise HTTPException(status_code=404, detail="Skill not found")
+    if skill.status not in [STATUS_PENDING]:
+        raise HTTPException(status_code=400, detail=f"Cannot validate skill with status: {skill.status}")
+    
+    from src.job_queue import get_job_queue
+    
+    # 先订阅再入队，避免错过任务开始后的事件
+    bus = get_validation_event_bus()
+    queue = bus.subscribe(skill_id)
+    try:
+        job_id = get_job_queue().enqueue(
+            "validate", {"skill_id": skill_id, "force": force}, created_by=admin.user_id, dedupe_key=skill_id
+        )
+    except Exception as e:
+        bus.unsubscribe(skill_id, queue)
+        logger.error(f"[API validate_skill_stream] 入队失败 skill_id={skill_id} error={e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return StreamingResponse(
+        _validation_events(skill_id, queue),
+        media_type="text/event-stream",
+        headers={"X-Job-ID": job_id},
+    )
+
+
+@router.get("/skills/{skill_id}/validation/events")
+async def watch_validation(
+    skill_id: str,
+    admin: Principal = Depends(get_admin_user)
+):
+    """订阅正在进行的 Skill 验证进度（SSE，验证可在任意 worker 上运行）
+    
+    Args:
+        skill_id: Skill ID
+        admin: Current admin user
+        
+    Returns:
+        text/event-stream of validation progress events
+    """
+    from src.agent_skills.validation_events import get_validation_event_bus
+    
+    bus = get_validation_event_bus()
+    if not bus.is_running(skill_id):
+        raise HTTPException(status_code=404, detail="No validation in progress for this skill")
+    
+    return StreamingResponse(_validation_events(skill_id, bus.subscribe(skill_id)), media_type="text/event-stream")
+
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+async def _validation_events(skill_id: str, queue: asyncio.Queue):
+    """将事件总线队列转换为 SSE，验证结束后发送 end 事件"""
+    from src.agent_utils import SSEFormatter
+    from src.agent_skills.validation_events import get_validation_event_bus, TERMINAL_STAGES
+    
+    formatter = SSEFormatter()
+    ACTIVE_STREAMS.inc(kind="validation")
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield formatter.make_validation_progress_event(event)
+            if event["stage"] in TERMINAL_STAGES:
+                yield formatter.make_done_event()
+                return
+    finally:
+        ACTIVE_STREAMS.dec(kind="validation")
+        get_validation_event_bus().unsubscribe(skill_id, queue)
+
+
 @router.post("/skills/{skill_id}/revalidate")
 async def revalidate_skill(
     skill_id: str,
-    admin: User = Depends(get_admin_user),
+    force: bool = False,
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """重新验证 Skill
     
     Args:
         skill_id: Skill ID
+        force: Skip the validation cache and run a fresh validation
         admin: Current admin user
         db: Database session
         
@@ -335,15 +475,18 @@ async def revalidate_skill(
     skill.layer2_passed = None
     db.commit()
     
-    orchestrator = get_validation_orchestrator()
+    from src.job_queue import get_job_queue
     
     try:
-        asyncio.create_task(orchestrator.validate_skill(skill_id))
+        job_id = get_job_queue().enqueue(
+            "validate", {"skill_id": skill_id, "force": force}, created_by=admin.user_id, dedupe_key=skill_id
+        )
         return {
             "skill_id": skill_id,
-            "status": "validating",
+            "job_id": job_id,
+            "status": "queued",
             "validation_stage": "layer1",
-            "message": "Validation started"
+            "message": "Validation queued"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -352,7 +495,7 @@ async def revalidate_skill(
 @router.post("/skills/{skill_id}/approve")
 async def approve_skill(
     skill_id: str,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Approve a skill.
@@ -385,7 +528,7 @@ async def approve_skill(
 async def reject_skill(
     skill_id: str,
     request: RejectRequest,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Reject a skill.
@@ -416,7 +559,7 @@ async def reject_skill(
 @router.delete("/skills/{skill_id}")
 async def delete_skill(
     skill_id: str,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Delete a skill.
@@ -430,16 +573,27 @@ async def delete_skill(
         Success message
     """
     manager = get_skill_manager()
+    skill = manager.get(db, skill_id)
+    was_approved = skill is not None and skill.status == "approved"
+    skill_name = skill.name if skill else None
     
     if not manager.delete(db, skill_id):
         raise HTTPException(status_code=404, detail="Skill not found")
     
-    return {"message": "Skill deleted"}
+    build_id = None
+    if was_approved:
+        from src.snapshot_manager import get_snapshot_manager
+        build_id = get_snapshot_manager().request_rebuild(
+            f"delete {skill_name}", requested_by=admin.user_id
+        )
+    
+    return {"message": "Skill deleted", "snapshot_build_id": build_id}
 
 
 @router.post("/skills/full-test")
 async def run_full_test(
-    admin: User = Depends(get_admin_user),
+    force: bool = False,
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """全量测试所有已入库 Skills
@@ -449,7 +603,10 @@ async def run_full_test(
     - 新生成 2 个额外任务
     - 共 5 个任务进行验证
     
+    Skill 内容、快照与模型均未变化时跳过，除非 force=true。
+    
     Args:
+        force: Ignore fingerprints and retest every skill
         admin: Current admin user
         db: Database session
         
@@ -458,27 +615,154 @@ async def run_full_test(
     """
     logger.info(f"[API run_full_test] 收到全量测试请求 admin={admin.user_id}")
     
-    orchestrator = get_validation_orchestrator()
+    from src.job_queue import get_job_queue
     
     try:
-        asyncio.create_task(orchestrator.run_full_test())
+        job_id = get_job_queue().enqueue(
+            "full_test", {"force": force}, created_by=admin.user_id, dedupe_key="full_test"
+        )
         return {
-            "status": "started",
-            "message": "Full test started. Check skill statuses for progress."
+            "status": "queued",
+            "job_id": job_id,
+            "message": "Full test queued. Check /api/admin/jobs/{job_id} for progress."
         }
     except Exception as e:
         logger.error(f"[API run_full_test] 启动失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/jobs")
+async def list_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    limit: int = 50,
+    admin: Principal = Depends(get_admin_user)
+):
+    """获取后台任务列表
+    
+    Args:
+        status: Filter by status (optional)
+        job_type: Filter by job type (optional)
+        limit: Max number of jobs (default 50)
+        admin: Current admin user
+        
+    Returns:
+        Jobs, newest first
+    """
+    from src.job_queue import get_job_queue
+    
+    return {"jobs": get_job_queue().list(status=status, job_type=job_type, limit=limit)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    admin: Principal = Depends(get_admin_user)
+):
+    """获取后台任务状态与进度
+    
+    Args:
+        job_id: Job ID
+        admin: Current admin user
+        
+    Returns:
+        Job status, progress and result
+    """
+    from src.job_queue import get_job_queue
+    
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(
+    job_id: str,
+    admin: Principal = Depends(get_admin_user)
+):
+    """取消后台任务
+    
+    Args:
+        job_id: Job ID
+        admin: Current admin user
+        
+    Returns:
+        Job status after the cancel request
+    """
+    from src.job_queue import get_job_queue
+    
+    job = get_job_queue().cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+NARRATION_RETRY_BASE_SECONDS = 60
+NARRATION_RETRY_MAX_SECONDS = 3600
+
+_narrating_reports: set[str] = set()
+_narration_tasks: set[asyncio.Task] = set()  # 持有后台任务的强引用，避免运行中被回收
+# report_hash -> (连续失败次数, 允许重试的 monotonic 时间)，润色失败后指数退避，避免每次访问都重新调用 LLM
+_narration_failures: dict[str, tuple[int, float]] = {}
+
+
+def _should_narrate(report_hash: str) -> bool:
+    if report_hash in _narrating_reports:
+        return False
+    failure = _narration_failures.get(report_hash)
+    return failure is None or time.monotonic() >= failure[1]
+
+
+def _record_narration_failure(report_hash: str):
+    attempts = _narration_failures.get(report_hash, (0, 0.0))[0] + 1
+    delay = min(NARRATION_RETRY_MAX_SECONDS, NARRATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    _narration_failures[report_hash] = (attempts, time.monotonic() + delay)
+
+
+async def _narrate_report(skill_id: str, report_hash: str):
+    """后台生成 LLM 润色版报告，完成后按哈希校验写回"""
+    from src.config import flash_router
+    from src.database import SessionLocal
+    from src.agent_skills.report_renderer import build_narration_prompt
+    
+    manager = get_skill_manager()
+    try:
+        with SessionLocal() as db:
+            skill = manager.get(db, skill_id)
+            if not skill or skill.report_hash != report_hash:
+                return
+            prompt = build_narration_prompt(skill, skill.report_content)
+        
+        response = await flash_router.ainvoke(prompt)
+        content = response.content if hasattr(response, 'content') else str(response)
+        
+        with SessionLocal() as db:
+            saved = manager.save_narrated_report(db, skill_id, report_hash, content)
+        logger.info(f"[_narrate_report] 润色报告 skill_id={skill_id} saved={saved}")
+        _narration_failures.pop(report_hash, None)
+    except Exception as e:
+        _record_narration_failure(report_hash)
+        attempts, retry_at = _narration_failures[report_hash]
+        logger.warning(
+            f"[_narrate_report] 润色失败 skill_id={skill_id} attempts={attempts} "
+            f"retry_in={retry_at - time.monotonic():.0f}s: {e}"
+        )
+    finally:
+        _narrating_reports.discard(report_hash)
+
+
 @router.get("/skills/{skill_id}/report")
 async def get_skill_report(
     skill_id: str,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get skill validation report.
     
+    报告按验证结果缓存：首次访问返回模板渲染版本并在后台触发 LLM 润色，
+    之后直接读取缓存，不再消耗 token。
+    
     Args:
         skill_id: Skill ID
         admin: Current admin user
@@ -487,7 +771,7 @@ async def get_skill_report(
     Returns:
         Markdown validation report
     """
-    from src.config import flash_llm
+    from src.agent_skills.report_renderer import render_pending_report
     
     manager = get_skill_manager()
     skill = manager.get(db, skill_id)
@@ -497,61 +781,118 @@ async def get_skill_report(
     
     if not skill.layer1_report:
         return {
-            "content": f"""# Skill 验证报告
-
-## 基本信息
-
-| 字段 | 值 |
-|------|-----|
-| **Skill ID** | {skill.skill_id} |
-| **名称** | {skill.name} |
-| **验证阶段** | {skill.validation_stage or 'pending'} |
+            "content": render_pending_report(skill),
+            "content_type": "markdown",
+            "narrated": False
+        }
+    
+    skill = manager.get_cached_report(db, skill)
+    
+    if not skill.report_narrated and _should_narrate(skill.report_hash):
+        _narrating_reports.add(skill.report_hash)
+        task = asyncio.create_task(_narrate_report(skill.skill_id, skill.report_hash))
+        _narration_tasks.add(task)
+        task.add_done_callback(_narration_tasks.discard)
+    
+    return {
+        "content": skill.report_content,
+        "content_type": "markdown",
+        "narrated": bool(skill.report_narrated)
+    }
 
-## 说明
 
-验证尚未完成，请稍后刷新查看完整报告。
-""",
-            "content_type": "markdown"
-        }
+@router.get("/llm/stats")
+async def get_llm_stats(
+    admin: Principal = Depends(get_admin_user)
+):
+    """获取 LLM 网关统计（并发、排队等待、重试、滚动延迟）与路由状态
+    
+    Args:
+        admin: Current admin user
+        
+    Returns:
+        Per-model gateway stats
+    """
+    from src.config import big_router, flash_router
+    from src.llm_gateway import get_gateway_stats
     
-    prompt = f"""
-请根据以下验证结果生成 Markdown 格式的验证报告。
+    return {
+        "models": get_gateway_stats(),
+        "routers": [big_router.stats(), flash_router.stats()],
+    }
 
-## 基本信息
-- Skill ID: {skill.skill_id}
-- 名称: {skill.name}
-- 验证阶段: {skill.validation_stage}
 
-## 评分
-- 任务完成度: {skill.completion_score}/100
-- 触发准确性: {skill.trigger_accuracy_score}/100
-- 离线能力: {skill.offline_capability_score}/100
-- 资源效率: {skill.resource_efficiency_score}/100
-- 总分: {skill.validation_score}
+class RebuildRequest(BaseModel):
+    """Snapshot rebuild request."""
+    reason: str = "manual"
 
-## 验证报告 JSON
-{skill.layer1_report}
 
-请按照以下格式生成报告：
-1. 基本信息（表格）
-2. 第一层验证（联网盲测、离线盲测）
-3. 评分表格
-4. 评估（优点、缺点、建议、总结）
-5. 依赖信息
-6. 结论
+@router.post("/snapshots/rebuild")
+async def request_snapshot_rebuild(
+    request: RebuildRequest,
+    admin: Principal = Depends(get_admin_user)
+):
+    """请求重建 Skills 快照（异步，防抖窗口内的请求会合并）
+    
+    Args:
+        request: Rebuild request with reason
+        admin: Current admin user
+        
+    Returns:
+        Build ID and current status
+    """
+    from src.snapshot_manager import get_snapshot_manager
+    
+    manager = get_snapshot_manager()
+    build_id = manager.request_rebuild(request.reason, requested_by=admin.user_id)
+    return manager.get_build(build_id)
+
 
-输出纯 Markdown，不要用代码块包裹。
-"""
+@router.get("/snapshots/builds")
+async def list_snapshot_builds(
+    limit: int = 20,
+    admin: Principal = Depends(get_admin_user)
+):
+    """获取快照构建历史
     
-    response = await flash_llm.ainvoke(prompt)
-    content = response.content if hasattr(response, 'content') else str(response)
+    Args:
+        limit: Max number of builds (default 20)
+        admin: Current admin user
+        
+    Returns:
+        Recent builds, newest first
+    """
+    from src.snapshot_manager import get_snapshot_manager
     
+    manager = get_snapshot_manager()
     return {
-        "content": content,
-        "content_type": "markdown"
+        "builds": manager.list_builds(limit=limit),
+        "current_snapshot_id": manager.get_current_snapshot_id(),
     }
 
 
+@router.get("/snapshots/builds/{build_id}")
+async def get_snapshot_build(
+    build_id: str,
+    admin: Principal = Depends(get_admin_user)
+):
+    """获取快照构建状态
+    
+    Args:
+        build_id: Build ID
+        admin: Current admin user
+        
+    Returns:
+        Build status, stats and error
+    """
+    from src.snapshot_manager import get_snapshot_manager
+    
+    build = get_snapshot_manager().get_build(build_id)
+    if not build:
+        raise HTTPException(status_code=404, detail="Build not found")
+    return build
+
+
 class RollbackRequest(BaseModel):
     """Rollback request."""
     target_version: str
@@ -559,17 +900,17 @@ class RollbackRequest(BaseModel):
 
 @router.get("/images")
 async def list_image_versions(
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """获取镜像版本列表
+    """获取 Skills 快照版本列表
     
     Args:
         admin: Current admin user
         db: Database session
         
     Returns:
-        List of image versions
+        List of snapshot versions
     """
     from src.database import ImageVersion
     
@@ -579,8 +920,11 @@ async def list_image_versions(
         "versions": [
             {
                 "version": v.version,
+                "snapshot_name": v.snapshot_name,
                 "skill_id": v.skill_id,
                 "skill_name": None,
+                "skills": sorted((v.skills_manifest or {}).keys()),
+                "build_id": v.build_id,
                 "created_at": str(v.created_at),
                 "is_current": v.is_current
             }
@@ -594,22 +938,109 @@ async def list_image_versions(
 @router.post("/images/rollback")
 async def rollback_image(
     request: RollbackRequest,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """回滚镜像版本
-    
-    Note: 镜像管理功能已迁移到 Daytona Snapshot，此接口暂时禁用。
+    """回滚 Skills 快照版本（切换 is_current 指针，不重建快照）
     
     Args:
-        request: Rollback request with target version
+        request: Rollback request with target version (snapshot id)
         admin: Current admin user
         db: Database session
         
     Returns:
         Rollback result
     """
-    raise HTTPException(
-        status_code=501, 
-        detail="Image rollback is deprecated. Use Daytona Snapshots instead."
-    )
+    from src.snapshot_manager import get_snapshot_manager
+    
+    manager = get_snapshot_manager()
+    previous = manager.get_current_snapshot_id()
+    if not manager.set_current_version(request.target_version):
+        raise HTTPException(status_code=404, detail="Image version not found")
+    
+    logger.info(f"[Admin] {admin.user_id} rolled back snapshot {previous} -> {request.target_version}")
+    return {
+        "previous_version": previous,
+        "current_version": request.target_version,
+    }
+
+
+class RoleUpdateRequest(BaseModel):
+    """Role update request."""
+    is_admin: bool
+
+
+@router.put("/users/{user_id}/role")
+async def update_user_role(
+    user_id: str,
+    request: RoleUpdateRequest,
+    admin: Principal = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Grant or revoke admin role.
+    
+    Args:
+        user_id: Target user ID
+        request: Role update with is_admin flag
+        admin: Current admin user
+        db: Database session
+        
+    Returns:
+        Updated role
+    """
+    user = db.query(User).filter(User.user_id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user_id == admin.user_id and not request.is_admin:
+        raise HTTPException(status_code=400, detail="Cannot revoke your own admin role")
+    
+    user.is_admin = request.is_admin
+    db.commit()
+    invalidate_principal(user_id)
+    
+    logger.info(f"[Admin] {admin.user_id} set is_admin={request.is_admin} for {user_id}")
+    return {"user_id": user_id, "is_admin": request.is_admin}
+
+
+class LogLevelRequest(BaseModel):
+    """Log level update request."""
+    name: str
+    level: str
+
+
+@router.get("/logging/levels")
+async def list_log_levels(
+    admin: Principal = Depends(get_admin_user)
+):
+    """获取各模块日志级别（当前进程）
+    
+    Args:
+        admin: Current admin user
+        
+    Returns:
+        Logger name to level mapping
+    """
+    return {"levels": get_log_levels()}
+
+
+@router.put("/logging/levels")
+async def update_log_level(
+    request: LogLevelRequest,
+    admin: Principal = Depends(get_admin_user)
+):
+    """运行时调整模块日志级别（仅当前进程，重启后恢复 LOG_LEVELS 配置）
+    
+    Args:
+        request: Logger name and level (DEBUG/INFO/WARNING/ERROR)
+        admin: Current admin user
+        
+    Returns:
+        Updated level
+    """
+    try:
+        set_log_level(request.name, request.level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"[Admin] {admin.user_id} set log level {request.name}={request.level.upper()}")
+    return {"name": request.name, "level": request.level.upper()}
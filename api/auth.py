@@ -3,11 +3,11 @@ import os
 import uuid
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from src.auth import verify_password, get_password_hash, create_access_token
+from src.auth import hash_password_async, verify_password_async, create_access_token, login_throttle
 from src.config import settings
 from src.database import get_db, User
 
@@ -40,7 +40,7 @@ class RegisterResponse(BaseModel):
 
 
 @router.post("/register", response_model=RegisterResponse)
-async def register(user: UserRegister, db: Session = Depends(get_db)):
+async def register(user: UserRegister, request: Request, db: Session = Depends(get_db)):
     """Register a new user.
     
     Args:
@@ -50,6 +50,16 @@ async def register(user: UserRegister, db: Session = Depends(get_db)):
     Returns:
         RegisterResponse with success message and user_id
     """
+    ip = request.client.host if request.client else None
+    retry_after = max(login_throttle.retry_after(user.username, ip), login_throttle.register_retry_after(ip))
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    login_throttle.record_register(ip)
+    
     # Check if username already exists
     if db.query(User).filter(User.username == user.username).first():
         raise HTTPException(status_code=400, detail="Username already registered")
@@ -66,7 +76,7 @@ async def register(user: UserRegister, db: Session = Depends(get_db)):
     db_user = User(
         user_id=user_id,
         username=user.username,
-        password_hash=get_password_hash(user.password)
+        password_hash=await hash_password_async(user.password)
     )
     db.add(db_user)
     db.commit()
@@ -78,7 +88,7 @@ async def register(user: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Login and get JWT token.
     
     Args:
@@ -87,17 +97,40 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
         
     Returns:
         Token with access_token
+        
+    Raises:
+        429 when the username or client IP has too many recent failures
     """
+    ip = request.client.host if request.client else None
+    retry_after = login_throttle.retry_after(user.username, ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
     # Find user by username
     db_user = db.query(User).filter(User.username == user.username).first()
     
     # Verify user exists and password is correct
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+    verified, new_hash = (False, None)
+    if db_user:
+        verified, new_hash = await verify_password_async(user.password, db_user.password_hash)
+    if not verified:
+        login_throttle.record_failure(user.username, ip)
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password"
         )
     
+    login_throttle.reset(user.username)
+    
+    # Hash parameters changed: upgrade the stored hash transparently
+    if new_hash:
+        db_user.password_hash = new_hash
+        db.commit()
+    
     # Create JWT token
     access_token = create_access_token(data={"sub": db_user.user_id})
     
@@ -1,10 +1,13 @@
-from typing import AsyncGenerator
+import asyncio
+import uuid
+from typing import TYPE_CHECKING, AsyncGenerator
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
-from src.agent_manager import AgentManager
 from src.auth import get_current_user, verify_thread_permission
 from src.daytona_client import get_daytona_client
+from src.thread_affinity import route_thread_request
+from src.utils.tracing import get_trace_store
 from api.models import (
     ChatRequest,
     CreateSessionResponse,
@@ -15,8 +18,50 @@ from api.models import (
     ThreadListResponse
 )
 
+if TYPE_CHECKING:
+    from src.agent_manager import AgentManager
+
 router = APIRouter()
-agent_manager = AgentManager()
+
+# AgentManager 依赖 deepagents / langgraph 等，导入与初始化耗时数秒，
+# 启动时在后台完成，服务可先处理认证、文件等请求；Agent 相关接口等待其就绪
+_agent_manager: "AgentManager | None" = None
+_agent_init: asyncio.Task | None = None
+
+
+def get_agent_manager() -> "AgentManager":
+    """获取 AgentManager（首次调用时导入，未初始化）"""
+    global _agent_manager
+    if _agent_manager is None:
+        from src.agent_manager import AgentManager
+
+        _agent_manager = AgentManager()
+    return _agent_manager
+
+
+def start_agent_manager() -> asyncio.Task:
+    """在后台导入并初始化 AgentManager（导入在线程中进行，不阻塞事件循环）；失败后再次调用会重试"""
+    global _agent_init
+    if _agent_init is None or (_agent_init.done() and (_agent_init.cancelled() or _agent_init.exception())):
+        async def init() -> "AgentManager":
+            manager = await asyncio.to_thread(get_agent_manager)
+            await manager.init()
+            return manager
+
+        _agent_init = asyncio.create_task(init())
+    return _agent_init
+
+
+async def ready_agent_manager() -> "AgentManager":
+    """等待 AgentManager 初始化完成"""
+    return await asyncio.shield(start_agent_manager())
+
+
+async def close_agent_manager():
+    if _agent_init is not None and not _agent_init.done():
+        _agent_init.cancel()
+    if _agent_manager is not None:
+        await _agent_manager.close()
 
 
 @router.post("/sessions", response_model=CreateSessionResponse)
@@ -25,6 +70,7 @@ async def create_session(user_id: str = Depends(get_current_user)):
     
     Requires authentication. Returns a thread_id in format {user_id}-{uuid}.
     """
+    agent_manager = await ready_agent_manager()
     thread_id = await agent_manager.create_session(user_id)
     return CreateSessionResponse(thread_id=thread_id)
 
@@ -38,6 +84,7 @@ async def list_sessions(
     """List all sessions for current user."""
     if page_size > 100:
         page_size = 100
+    agent_manager = await ready_agent_manager()
     return await agent_manager.list_sessions(user_id, page, page_size)
 
 
@@ -45,6 +92,7 @@ async def list_sessions(
 async def chat(
     thread_id: str,
     request: ChatRequest,
+    http_request: Request,
     user_id: str = Depends(get_current_user)
 ):
     """Send a message to the agent.
@@ -53,16 +101,21 @@ async def chat(
     """
     # Verify thread ownership
     verify_thread_permission(user_id, thread_id)
+    if (routed := await route_thread_request(http_request, thread_id)) is not None:
+        return routed
+    agent_manager = await ready_agent_manager()
+    run_id = uuid.uuid4().hex[:12]
     
     async def event_generator() -> AsyncGenerator[str, None]:
         async for chunk in agent_manager.stream_chat(
-            thread_id, request.message, request.files, request.mode
+            thread_id, request.message, request.files, request.mode, run_id=run_id
         ):
             yield chunk
 
     return StreamingResponse(
         event_generator(),
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers={"X-Run-ID": run_id}
     )
 
 
@@ -70,6 +123,7 @@ async def chat(
 async def stream_resume_interrupt(
     thread_id: str,
     request: ResumeRequest,
+    http_request: Request,
     user_id: str = Depends(get_current_user)
 ):
     """Resume an interrupted session (HITL) with streaming.
@@ -77,6 +131,8 @@ async def stream_resume_interrupt(
     Requires authentication. User can only resume their own threads.
     """
     verify_thread_permission(user_id, thread_id)
+    if (routed := await route_thread_request(http_request, thread_id)) is not None:
+        return routed
 
     if request.action not in ["continue", "cancel", "answer"]:
         raise HTTPException(
@@ -90,21 +146,26 @@ async def stream_resume_interrupt(
             detail="answers is required when action is 'answer'"
         )
 
+    agent_manager = await ready_agent_manager()
+    run_id = uuid.uuid4().hex[:12]
+
     async def event_generator() -> AsyncGenerator[str, None]:
         async for chunk in agent_manager.stream_resume_interrupt(
-            thread_id, request.action, request.answers
+            thread_id, request.action, request.answers, run_id=run_id
         ):
             yield chunk
 
     return StreamingResponse(
         event_generator(),
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers={"X-Run-ID": run_id}
     )
 
 
 @router.get("/status/{thread_id}", response_model=ThreadStatus)
 async def get_thread_status(
     thread_id: str,
+    http_request: Request,
     user_id: str = Depends(get_current_user)
 ):
     """Get thread status.
@@ -112,6 +173,9 @@ async def get_thread_status(
     Returns idle or interrupted status for the thread.
     """
     verify_thread_permission(user_id, thread_id)
+    if (routed := await route_thread_request(http_request, thread_id)) is not None:
+        return routed
+    agent_manager = await ready_agent_manager()
     status = await agent_manager.get_status(thread_id)
     return ThreadStatus(**status)
 
@@ -126,10 +190,43 @@ async def get_thread_history(
     Returns all messages in the thread.
     """
     verify_thread_permission(user_id, thread_id)
+    agent_manager = await ready_agent_manager()
     history = await agent_manager.get_history(thread_id)
     return HistoryResponse(**history)
 
 
+@router.get("/runs/{run_id}/timing")
+async def get_run_timing(
+    run_id: str,
+    user_id: str = Depends(get_current_user)
+):
+    """Get the timing breakdown of a chat/resume run.
+
+    The run ID is returned in the X-Run-ID header of /chat and /resume.
+    Timing is kept in memory for the most recent runs on the serving worker.
+
+    Returns:
+        Duration, per-kind breakdown (llm, tool, sandbox, checkpoint, sync, retrieval) and spans
+    """
+    trace = get_trace_store().get(run_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    verify_thread_permission(user_id, trace.thread_id)
+    return trace.to_dict()
+
+
+@router.get("/sessions/{thread_id}/runs")
+async def list_thread_runs(
+    thread_id: str,
+    limit: int = 20,
+    user_id: str = Depends(get_current_user)
+):
+    """List recent runs of a thread with their timing summary (newest first)."""
+    verify_thread_permission(user_id, thread_id)
+    traces = get_trace_store().recent(thread_id=thread_id, limit=min(limit, 100))
+    return {"runs": [trace.to_dict(include_spans=False) for trace in traces]}
+
+
 @router.delete("/sessions/{thread_id}")
 async def destroy_session(
         thread_id: str,
@@ -153,7 +250,7 @@ async def destroy_session(
     sandbox = client.find_sandbox({"thread_id": thread_id, "type": "agent"})
     
     if sandbox:
-        client.delete_sandbox(sandbox.id)
+        client.delete_sandbox(sandbox.id, thread_id)
         return {"status": "destroyed", "thread_id": thread_id}
     
     return {"status": "not_found", "thread_id": thread_id}
@@ -1,40 +1,129 @@
 import sys
+import time
+
+_STARTED = time.perf_counter()
+
 import asyncio
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(
         asyncio.WindowsSelectorEventLoopPolicy()
     )
-from contextlib import asynccontextmanager
+import importlib
+from contextlib import asynccontextmanager, suppress
 
 from src.config import settings
+from src.utils.get_logger import configure_logging, shutdown_logging
+
+configure_logging(
+    fmt=settings.LOG_FORMAT,
+    level=settings.LOG_LEVEL,
+    levels=settings.LOG_LEVELS,
+    sample_every=settings.LOG_SAMPLE_EVERY,
+)
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.server import router as api_router, agent_manager
+from fastapi.responses import PlainTextResponse
+from api.server import router as api_router, start_agent_manager, close_agent_manager
 from api.auth import router as auth_router
 from api.webdav import router as webdav_router
 from api.files import router as files_router, upload_manager
 from api.admin import router as admin_router
 from api.workspace import router as workspace_router
-from src.database import create_tables
-from src.agent_skills.skill_validator import get_validation_orchestrator
+from src.database import create_tables, migrate_checkpoints, pending_migrations
+from src.snapshot_manager import get_snapshot_manager
+from src.job_queue import get_job_queue
+from src.auth import shutdown_hash_pool
+from src.coordination import shutdown_coordination
+from src.thread_affinity import get_thread_affinity
+from src.utils.metrics import STARTUP_SECONDS, get_registry
+
+
+class StartupReport:
+    """记录各启动阶段距进程启动的耗时（/metrics 的 process_startup_seconds）"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: dict[str, float] = {}
+
+    def record(self, phase: str) -> float:
+        elapsed = time.perf_counter() - self.started
+        self.phases[phase] = elapsed
+        STARTUP_SECONDS.set(elapsed, phase=phase)
+        print(f"[Startup] {phase}: {elapsed * 1000:.0f} ms")
+        return elapsed
+
+
+startup_report = StartupReport(_STARTED)
+startup_report.record("imports")
+
+
+async def _warm_up(job_queue):
+    """就绪后在后台完成：迁移检查、快照构建恢复、AgentManager 初始化、验证任务处理器注册"""
+    try:
+        missing = await asyncio.to_thread(pending_migrations)
+        if missing:
+            print(f"[Startup] Pending migrations ({', '.join(missing)}), run: python main.py migrate")
+    except Exception as e:
+        print(f"[Startup] Migration check failed: {e}")
+
+    try:
+        await get_snapshot_manager().resume_pending_builds()
+    except Exception as e:
+        print(f"[Startup] Snapshot build recovery failed: {e}")
+
+    try:
+        await start_agent_manager()
+        startup_report.record("agent_manager")
+    except Exception as e:
+        # 请求到达时 ready_agent_manager() 会重新尝试初始化
+        print(f"[Startup] Agent manager init failed: {e}")
+
+    try:
+        validator = await asyncio.to_thread(importlib.import_module, "src.agent_skills.skill_validator")
+        validator.register_job_handlers(job_queue)
+        await job_queue.start()
+    except Exception as e:
+        print(f"[Startup] Job queue start failed, validation jobs will stay queued: {e}")
+    startup_report.record("warm")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_tables()
-    await agent_manager.init()
-    
+    if settings.RUN_MIGRATIONS_ON_STARTUP:
+        await asyncio.to_thread(create_tables)
+        startup_report.record("migrations")
+
     cleaned = upload_manager.cleanup_stale()
     if cleaned > 0:
         print(f"[Startup] Cleaned up {cleaned} stale upload sessions")
     
+    affinity = get_thread_affinity()
+    if affinity is not None:
+        await affinity.start()
+    
+    job_queue = get_job_queue()
+    warm_up = asyncio.create_task(_warm_up(job_queue))
+    startup_report.record("ready")
+    
     try:
         yield
     finally:
-        await agent_manager.close()
+        if affinity is not None:
+            await affinity.stop()
+        if not warm_up.done():
+            warm_up.cancel()
+            with suppress(asyncio.CancelledError):
+                await warm_up
+        await job_queue.stop()
+        await close_agent_manager()
         print("[Shutdown] Agent manager closed")
+        if "src.llm_gateway" in sys.modules:
+            await sys.modules["src.llm_gateway"].close_http_clients()
+        shutdown_hash_pool()
+        shutdown_coordination()
+        shutdown_logging()
 
 app = FastAPI(
     title="Multi-tenant AI Agent Platform",
@@ -49,6 +138,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Run-ID"],
 )
 
 # Include auth router (no authentication required)
@@ -70,6 +160,12 @@ app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 app.include_router(workspace_router)
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of in-process metrics."""
+    return PlainTextResponse(get_registry().render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return {
@@ -88,7 +184,20 @@ async def root():
     }
 
 
+def migrate():
+    """建表 / 补列，并创建 LangGraph checkpoint 表"""
+    create_tables()
+    asyncio.run(migrate_checkpoints())
+    print("[Migrate] Done")
+
+
 if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate()
+        sys.exit(0)
+
+    import uvicorn
+
     uvicorn.run(
         app,
         host="0.0.0.0",
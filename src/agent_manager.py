@@ -1,6 +1,8 @@
 import asyncio
 import json
 import logging
+import time
+import uuid
 from typing import Any, AsyncIterator
 
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -8,11 +10,17 @@ from langchain_core.tools import BaseTool, StructuredTool
 from deepagents import create_deep_agent
 from typing import Annotated
 
-from src.config import big_llm, settings, flash_llm
+from src.config import big_llm, settings, flash_router
 from src.database import SessionLocal, Thread
 from src.daytona_client import get_daytona_client
-from src.utils.get_logger import get_logger
+from src.agent_skills.skill_retrieval import format_skill_hints, get_skill_retriever
+from src.utils.get_logger import bind_log_context, get_logger
+from src.utils.metrics import (
+    ACTIVE_RUNS, ACTIVE_STREAMS, AGENT_STEP_SECONDS, SSE_TOKENS, SSE_TOKENS_PER_SECOND, SSE_TTFT_SECONDS,
+    DB_POOL_AVAILABLE, DB_POOL_REQUESTS, DB_POOL_SIZE, DB_POOL_WAIT_SECONDS, DB_POOL_WAITING, get_registry,
+)
 from src.utils.langfuse_monitor import init_langfuse
+from src.utils.tracing import TracingCallbackHandler, instrument_async_method, start_trace, trace_span
 
 from psycopg_pool import AsyncConnectionPool
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
@@ -22,6 +30,7 @@ from langgraph.types import Command
 from src.agent_utils.formatter import SSEFormatter, StreamDataFormatter
 from src.agent_utils.interrupt import InterruptHandler
 from src.agent_utils.session import SessionManager
+from src.agent_utils.title import TitleService
 from src.agent_utils.types import InterruptAction
 from src.workspace_sync import SYNC_WORKSPACE
 
@@ -44,11 +53,16 @@ class AgentManager:
         self.stream_formatter = StreamDataFormatter(self.sse_formatter)
         self.interrupt_handler: InterruptHandler | None = None
         self.session_manager: SessionManager | None = None
+        self.title_service = TitleService(flash_router)
 
     async def init(self):
         await self.pool.open()
+        get_registry().add_collector(self._collect_pool_metrics)
         self.checkpointer = AsyncPostgresSaver(self.pool)
-        await self.checkpointer.setup()
+        if settings.RUN_MIGRATIONS_ON_STARTUP:
+            await self.checkpointer.setup()
+        instrument_async_method(self.checkpointer, "aput", "checkpoint")
+        instrument_async_method(self.checkpointer, "aput_writes", "checkpoint")
 
         self.compiled_agent = create_deep_agent(
             model=big_llm,
@@ -69,7 +83,7 @@ class AgentManager:
             },
             system_prompt=f"""
             用户的工作目录在 {SYNC_WORKSPACE} 中，若无明确要求，请在 {SYNC_WORKSPACE} 目录【及子目录】下执行操作。
-            已验证的 Skills 存放在 /skills 目录中，可以直接使用。
+            已验证的 Skills 存放在 /skills 目录中，可以直接使用；/skills/.index.json 列出了全部 Skill 的名称、描述与触发词，先读取它再按需打开对应的 SKILL.md。
             当你不明确用户需求时，可以调用提问工具向用户提问(可以同时提多个问题)，这个提问工具最多调用两次。
             优先尝试使用已有的 skill 完成任务。
             """,
@@ -80,6 +94,14 @@ class AgentManager:
         
         logger.info("[AgentManager] Initialized with AsyncPostgresSaver")
 
+    def _collect_pool_metrics(self):
+        stats = self.pool.get_stats()
+        DB_POOL_SIZE.set(stats.get("pool_size", 0), pool="checkpoint")
+        DB_POOL_AVAILABLE.set(stats.get("pool_available", 0), pool="checkpoint")
+        DB_POOL_WAITING.set(stats.get("requests_waiting", 0), pool="checkpoint")
+        DB_POOL_WAIT_SECONDS.set(stats.get("requests_wait_ms", 0) / 1000, pool="checkpoint")
+        DB_POOL_REQUESTS.set(stats.get("requests_num", 0), pool="checkpoint")
+
     def _get_thread_id(self, runtime: Any) -> str | None:
         config = getattr(runtime, "config", None)
         if config and isinstance(config, dict):
@@ -116,7 +138,8 @@ class AgentManager:
         thread_id: str, 
         message: str, 
         files: list[str] | None = None,
-        mode: str = "build"
+        mode: str = "build",
+        run_id: str | None = None,
     ) -> AsyncIterator[str]:
         queue: asyncio.Queue[str | None] = asyncio.Queue()
         pending = {'count': 2}
@@ -130,10 +153,22 @@ class AgentManager:
             thread = db.query(Thread).filter(Thread.thread_id == thread_id).first()
             need_title = thread and thread.title is None
         
-        async def agent_task():
+        started_at = time.perf_counter()
+        run_id = run_id or uuid.uuid4().hex[:12]
+        
+        async def traced_agent_task():
+            # task 拥有独立的 context 副本，绑定的日志字段与当前 Trace 不会泄漏到调用方
+            bind_log_context(thread_id=thread_id, user_id=user_id, run_id=run_id)
+            with start_trace(run_id, "chat", thread_id, user_id) as trace:
+                await agent_task(trace)
+        
+        async def agent_task(trace):
+            ACTIVE_RUNS.inc()
+            tokens = 0
+            first_token_at = None
             try:
                 handler, _ = init_langfuse()
-                callbacks = [handler] if handler else []
+                callbacks = [TracingCallbackHandler(trace)] + ([handler] if handler else [])
                 config = {"configurable": {"thread_id": thread_id}, "callbacks": callbacks}
                 
                 messages = []
@@ -155,16 +190,29 @@ class AgentManager:
 请先制定计划，并友好提示用户当前处于思考模式，请用户切换到【编辑】模式后再执行操作。"""
                     ))
                 
+                if settings.SKILL_RETRIEVAL_TOP_K > 0:
+                    with trace_span("skill_retrieval", "retrieval"):
+                        skills = await asyncio.to_thread(get_skill_retriever().search, message)
+                    if skills:
+                        messages.append(SystemMessage(content=format_skill_hints(skills)))
+                
                 messages.append(HumanMessage(content=message))
                 
                 current_input = {"messages": messages}
                 
+                step_started = time.perf_counter()
                 while True:
                     auto_resume = False
                     
                     async for stream_mode, data in self.compiled_agent.astream(
                         current_input, config=config, stream_mode=["messages", "updates"]
                     ):
+                        if stream_mode == "updates" and isinstance(data, dict):
+                            now = time.perf_counter()
+                            for node in data:
+                                AGENT_STEP_SECONDS.observe(now - step_started, node=node)
+                            step_started = now
+                        
                         tool_name = self.stream_formatter.extract_interrupt_tool_name(data)
                         
                         if tool_name in AUTO_APPROVE_TOOLS:
@@ -182,6 +230,11 @@ class AgentManager:
                         else:
                             formatted = self.stream_formatter.format_stream_data(stream_mode, data)
                             if formatted:
+                                if stream_mode == "messages":
+                                    tokens += 1
+                                    if first_token_at is None:
+                                        first_token_at = time.perf_counter()
+                                        SSE_TTFT_SECONDS.observe(first_token_at - started_at, mode=mode)
                                 await queue.put(formatted)
                     
                     if auto_resume:
@@ -191,20 +244,26 @@ class AgentManager:
                         
             except Exception as e:
                 logger.exception("Error in agent_task")
+                trace.set_error(f"{type(e).__name__}: {e}")
                 await queue.put(self.sse_formatter.make_error_event(str(e)))
             finally:
+                ACTIVE_RUNS.dec()
+                if tokens:
+                    SSE_TOKENS.inc(tokens, mode=mode)
+                    elapsed = time.perf_counter() - first_token_at
+                    if elapsed > 0:
+                        SSE_TOKENS_PER_SECOND.observe(tokens / elapsed, mode=mode)
                 pending['count'] -= 1
                 if pending['count'] == 0:
                     await queue.put(None)
         
         async def title_task():
+            bind_log_context(thread_id=thread_id, user_id=user_id, run_id=run_id)
             if not need_title:
                 pending['count'] -= 1
                 return
             try:
-                prompt = f"用5-10个字概括主题，只返回标题：{message[:100]}"
-                response = await flash_llm.ainvoke(prompt)
-                title = str(response.content).strip()[:20]
+                title = await self.title_service.get_title(thread_id, message)
                 
                 with SessionLocal() as db:
                     thread = db.query(Thread).filter(Thread.thread_id == thread_id).first()
@@ -221,31 +280,40 @@ class AgentManager:
                     await queue.put(None)
         
         asyncio.create_task(title_task())
-        asyncio.create_task(agent_task())
+        asyncio.create_task(traced_agent_task())
 
-        while True:
-            item = await queue.get()
-            if item is None:
-                break
-            yield item
-        
-        yield self.sse_formatter.make_done_event()
+        with ACTIVE_STREAMS.track_inprogress(kind="chat"):
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+            
+            yield self.sse_formatter.make_done_event()
 
     async def stream_resume_interrupt(
         self, 
         thread_id: str, 
         action: str,
-        answers: list[str] | None = None
+        answers: list[str] | None = None,
+        run_id: str | None = None,
     ) -> AsyncIterator[str]:
+        # 生成器在该请求的流式响应 task 中执行，绑定的字段随 task 结束
+        user_id = thread_id[:36] if len(thread_id) > 37 else "default"
+        run_id = run_id or uuid.uuid4().hex[:12]
+        bind_log_context(thread_id=thread_id, user_id=user_id, run_id=run_id)
         handler, _ = init_langfuse()
         
-        async for chunk in self.interrupt_handler.resume(
-            thread_id=thread_id,
-            action=InterruptAction(action),
-            answers=answers,
-            langfuse_handler=handler if handler else None,
-        ):
-            yield chunk
+        with ACTIVE_STREAMS.track_inprogress(kind="resume"), \
+                start_trace(run_id, "resume", thread_id, user_id) as trace:
+            async for chunk in self.interrupt_handler.resume(
+                thread_id=thread_id,
+                action=InterruptAction(action),
+                answers=answers,
+                langfuse_handler=handler if handler else None,
+                callbacks=[TracingCallbackHandler(trace)],
+            ):
+                yield chunk
 
     async def get_status(self, thread_id: str) -> dict:
         return await self.session_manager.get_status(thread_id)
@@ -11,37 +11,42 @@ Modules:
 - prompts: Agent prompts for validation
 """
 
-from src.agent_skills.skill_manager import (
-    get_skill_manager,
-    SkillManager,
-    STATUS_PENDING,
-    STATUS_VALIDATING,
-    STATUS_APPROVED,
-    STATUS_REJECTED,
-    VALIDATION_STAGE_LAYER1,
-    VALIDATION_STAGE_LAYER2,
-    VALIDATION_STAGE_COMPLETED,
-    VALIDATION_STAGE_FAILED,
-)
-from src.agent_skills.skill_validator import (
-    get_validation_orchestrator,
-    ValidationOrchestrator,
-)
-from src.agent_skills.skill_scorer import (
-    calculate_completion_score,
-    calculate_trigger_score,
-    calculate_offline_score,
-    calculate_overall_score,
-    is_passing,
-)
-from src.agent_skills.skill_format_validator import (
-    FormatValidator,
-    validate_skill_format,
-)
-from src.agent_skills.task_store import (
-    get_task_store,
-    TaskStore,
-)
+import importlib
+
+# 子模块按需导入（skill_validator 会加载 LLM 客户端，不应在导入包时触发）
+_EXPORTS = {
+    "get_skill_manager": "skill_manager",
+    "SkillManager": "skill_manager",
+    "STATUS_PENDING": "skill_manager",
+    "STATUS_VALIDATING": "skill_manager",
+    "STATUS_APPROVED": "skill_manager",
+    "STATUS_REJECTED": "skill_manager",
+    "VALIDATION_STAGE_LAYER1": "skill_manager",
+    "VALIDATION_STAGE_LAYER2": "skill_manager",
+    "VALIDATION_STAGE_COMPLETED": "skill_manager",
+    "VALIDATION_STAGE_FAILED": "skill_manager",
+    "get_validation_orchestrator": "skill_validator",
+    "ValidationOrchestrator": "skill_validator",
+    "calculate_completion_score": "skill_scorer",
+    "calculate_trigger_score": "skill_scorer",
+    "calculate_offline_score": "skill_scorer",
+    "calculate_overall_score": "skill_scorer",
+    "is_passing": "skill_scorer",
+    "FormatValidator": "skill_format_validator",
+    "validate_skill_format": "skill_format_validator",
+    "get_task_store": "task_store",
+    "TaskStore": "task_store",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     # Skill Manager
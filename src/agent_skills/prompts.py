@@ -1,5 +1,8 @@
 """Agent 提示词模块"""
 
+# 修改验证相关提示词时递增，使验证缓存失效
+PROMPT_VERSION = "1"
+
 VALIDATION_SYSTEM_PROMPT = """你是 Skill 验证专家。
 
 ## 工作流程
@@ -124,6 +127,37 @@ Skill 名称: {skill_name}
 注意：当前环境已断开网络，任何网络调用都会失败。
 """
 
+FULL_TEST_SYSTEM_PROMPT = """你是 Skill 回归测试专家。
+
+## 工作流程
+
+1. **读取 SKILL.md**：已入库的 Skills 位于 /skills/<skill 名称>/ 目录
+2. **串行执行给定任务**：不要新增或改写任务，使用 task() 工具委托给子代理执行
+3. **评估任务完成度**：按 5 级制标准评估每个任务（5 完美 / 4 良好 / 3 合格 / 2 较差 / 1 失败）
+
+## 输出格式
+
+{
+  "task_evaluations": [
+    {
+      "task_id": 1,
+      "task": "任务描述",
+      "raw_score": 4,
+      "converted_score": 75,
+      "reason": "评估理由",
+      "skill_used": "skill-name",
+      "correct_skill_used": true
+    }
+  ],
+  "assessment": {
+    "strengths": ["优点1"],
+    "weaknesses": ["缺点1"],
+    "recommendations": ["建议1"],
+    "summary": "一句话总结"
+  }
+}
+"""
+
 FULL_TEST_PROMPT = """
 ## 全量测试
 
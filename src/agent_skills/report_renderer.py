@@ -0,0 +1,153 @@
+"""Skill 验证报告渲染
+
+- 确定性模板渲染：验证结果落库时即生成，管理端直接读取
+- LLM 润色：后台异步生成，按报告哈希校验后覆盖模板版本
+"""
+import hashlib
+import json
+
+from src.database import Skill
+
+
+def compute_report_hash(skill: Skill) -> str:
+    """报告哈希：layer1_report + 各项评分，任何一项变化都会使缓存失效"""
+    payload = {
+        "layer1_report": skill.layer1_report,
+        "scores": [
+            skill.completion_score,
+            skill.trigger_accuracy_score,
+            skill.offline_capability_score,
+            skill.resource_efficiency_score,
+            skill.validation_score,
+        ],
+        "validation_stage": skill.validation_stage,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _fmt(value, suffix: str = "") -> str:
+    return "-" if value is None else f"{value}{suffix}"
+
+
+def _bullets(items: list) -> str:
+    return "\n".join(f"- {item}" for item in items) if items else "- 无"
+
+
+def render_pending_report(skill: Skill) -> str:
+    """验证尚未完成时的占位报告"""
+    return f"""# Skill 验证报告
+
+## 基本信息
+
+| 字段 | 值 |
+|------|-----|
+| **Skill ID** | {skill.skill_id} |
+| **名称** | {skill.name} |
+| **验证阶段** | {skill.validation_stage or 'pending'} |
+
+## 说明
+
+验证尚未完成，请稍后刷新查看完整报告。
+"""
+
+
+def render_report(skill: Skill) -> str:
+    """根据验证结果渲染确定性 Markdown 报告"""
+    report = skill.layer1_report or {}
+    online = report.get("online_blind_test") or {}
+    offline = report.get("offline_blind_test") or {}
+    assessment = report.get("assessment") or {}
+    passed = report.get("passed", False)
+
+    task_rows = "\n".join(
+        f"| {t.get('task_id', i + 1)} | {str(t.get('task', '')).replace('|', '/')} | {_fmt(t.get('raw_score'))} "
+        f"| {'✅' if t.get('correct_skill_used') else '❌'} | {str(t.get('reason', '')).replace('|', '/')} |"
+        for i, t in enumerate(online.get("task_results") or [])
+    ) or "| - | 无任务记录 | - | - | - |"
+
+    dependencies = skill.installed_dependencies or []
+    if isinstance(dependencies, dict):
+        dependencies = [f"{k}: {v}" for k, v in dependencies.items()]
+
+    return f"""# Skill 验证报告
+
+## 基本信息
+
+| 字段 | 值 |
+|------|-----|
+| **Skill ID** | {skill.skill_id} |
+| **名称** | {skill.name} |
+| **描述** | {skill.description or '-'} |
+| **验证阶段** | {skill.validation_stage or '-'} |
+| **验证时间** | {_fmt(skill.validated_at)} |
+
+## 第一层验证
+
+### 联网盲测
+
+结果：{'通过' if online.get('passed') else '未通过'}
+
+| 任务 | 描述 | 得分(1-5) | 正确触发 | 理由 |
+|------|------|-----------|----------|------|
+{task_rows}
+
+### 离线盲测
+
+| 指标 | 值 |
+|------|-----|
+| **结果** | {'通过' if offline.get('passed') else '未通过'} |
+| **违规网络调用** | {_fmt(offline.get('blocked_network_calls'))} |
+| **离线可用** | {'是' if offline.get('offline_capable') else '否'} |
+
+## 评分
+
+| 维度 | 分数 |
+|------|------|
+| 任务完成度 | {_fmt(skill.completion_score, '/100')} |
+| 触发准确性 | {_fmt(skill.trigger_accuracy_score, '/100')} |
+| 离线能力 | {_fmt(skill.offline_capability_score, '/100')} |
+| 资源效率 | {_fmt(skill.resource_efficiency_score, '/100')} |
+| **总分** | **{_fmt(skill.validation_score)}** |
+
+## 评估
+
+### 优点
+
+{_bullets(assessment.get('strengths') or [])}
+
+### 缺点
+
+{_bullets(assessment.get('weaknesses') or [])}
+
+### 建议
+
+{_bullets(assessment.get('recommendations') or [])}
+
+### 总结
+
+{assessment.get('summary') or '-'}
+
+## 依赖信息
+
+{_bullets(dependencies)}
+
+## 结论
+
+{'✅ 验证通过，可以入库。' if passed else '❌ 验证未通过，请根据建议修改后重新验证。'}
+"""
+
+
+def build_narration_prompt(skill: Skill, baseline: str) -> str:
+    """LLM 润色提示词：在模板报告基础上补充分析性叙述"""
+    return f"""
+请润色以下 Skill 验证报告，保留所有表格与数据不变，在"评估"与"结论"部分补充简洁的分析性叙述。
+
+## 原始验证报告 JSON
+{json.dumps(skill.layer1_report, ensure_ascii=False, default=str)}
+
+## 模板报告
+{baseline}
+
+输出纯 Markdown，不要用代码块包裹。
+"""
@@ -0,0 +1,142 @@
+"""Skill 压缩包安全解压
+
+- 上传文件按块写入磁盘，超过大小上限立即中止
+- 解压前检查条目数、声明的解压总大小与单条目压缩比（防 zip bomb）
+- 拒绝绝对路径、`..` 路径穿越与符号链接
+- 按块解压并实时累计实际写入字节（不信任 ZIP 头中的大小），同时计算每个文件的 sha256
+"""
+import hashlib
+import shutil
+import stat
+import zipfile
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
+
+from src.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+RATIO_CHECK_MIN_BYTES = 1024 * 1024  # 小文件压缩比天然很高，只对解压后超过 1MB 的条目检查
+MEMBER_READ_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, RuntimeError, EOFError, zlib.error)
+
+
+class ArchiveError(ValueError):
+    """压缩包不安全或超出限制"""
+
+
+def save_upload(file: BinaryIO, dest: Path, max_bytes: int | None = None) -> int:
+    """将上传文件流式写入 dest，返回字节数"""
+    max_bytes = max_bytes or settings.SKILL_UPLOAD_MAX_BYTES
+    written = 0
+    with open(dest, "wb") as out:
+        while chunk := file.read(CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_bytes:
+                raise ArchiveError(f"Upload exceeds {max_bytes} bytes")
+            out.write(chunk)
+    return written
+
+
+def _safe_member_path(name: str) -> PurePosixPath:
+    normalized = PurePosixPath(name.replace("\\", "/"))
+    if normalized.is_absolute() or (normalized.parts and ":" in normalized.parts[0]):
+        raise ArchiveError(f"Absolute path in archive: {name}")
+    if ".." in normalized.parts:
+        raise ArchiveError(f"Path traversal in archive: {name}")
+    return normalized
+
+
+def _is_symlink(info: zipfile.ZipInfo) -> bool:
+    return stat.S_ISLNK(info.external_attr >> 16)
+
+
+def safe_extract(zip_path: Path, dest: Path) -> dict[str, str]:
+    """安全解压到 dest，返回 {相对 dest 的 posix 路径: sha256}"""
+    max_entries = settings.SKILL_ARCHIVE_MAX_ENTRIES
+    max_total = settings.SKILL_ARCHIVE_MAX_UNCOMPRESSED_BYTES
+    max_ratio = settings.SKILL_ARCHIVE_MAX_RATIO
+
+    try:
+        archive = zipfile.ZipFile(zip_path, "r")
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(f"Invalid ZIP file: {e}") from e
+
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    root = dest.resolve()
+    file_hashes: dict[str, str] = {}
+
+    with archive:
+        members = archive.infolist()
+        if len(members) > max_entries:
+            raise ArchiveError(f"Archive has {len(members)} entries (limit {max_entries})")
+
+        declared_total = sum(info.file_size for info in members)
+        if declared_total > max_total:
+            raise ArchiveError(f"Archive expands to {declared_total} bytes (limit {max_total})")
+
+        total = 0
+        for info in members:
+            relative = _safe_member_path(info.filename)
+            if _is_symlink(info):
+                raise ArchiveError(f"Symlink in archive: {info.filename}")
+            if not relative.parts:
+                continue
+
+            target = (root / relative.as_posix()).resolve()
+            if not target.is_relative_to(root):
+                raise ArchiveError(f"Path escapes extraction dir: {info.filename}")
+
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+
+            if info.file_size > RATIO_CHECK_MIN_BYTES and info.file_size > max_ratio * max(info.compress_size, 1):
+                raise ArchiveError(f"Suspicious compression ratio for {info.filename}")
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.sha256()
+            try:
+                with archive.open(info) as src, open(target, "wb") as out:
+                    while chunk := src.read(CHUNK_SIZE):
+                        total += len(chunk)
+                        if total > max_total:
+                            raise ArchiveError(f"Archive expands beyond {max_total} bytes")
+                        digest.update(chunk)
+                        out.write(chunk)
+            except MEMBER_READ_ERRORS as e:
+                # CRC 错误、截断、加密或不支持的压缩方式
+                raise ArchiveError(f"Cannot read {info.filename}: {type(e).__name__}: {e}") from e
+            file_hashes[relative.as_posix()] = digest.hexdigest()
+
+    return file_hashes
+
+
+def extract_upload(file: BinaryIO, filename: str, work_dir: Path) -> tuple[Path, dict[str, str]]:
+    """保存并解压上传的 Skill 压缩包
+
+    Returns:
+        (skill 根目录, {相对 skill 根目录的路径: sha256})；压缩包只有一个顶层目录时以它为根
+    """
+    work_dir = Path(work_dir)
+    zip_path = work_dir / Path(filename).name
+    save_upload(file, zip_path)
+
+    extract_dir = work_dir / "extracted"
+    try:
+        file_hashes = safe_extract(zip_path, extract_dir)
+    except ArchiveError:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        raise
+    finally:
+        zip_path.unlink(missing_ok=True)
+
+    extracted_items = list(extract_dir.iterdir())
+    if len(extracted_items) == 1 and extracted_items[0].is_dir():
+        skill_dir = extracted_items[0]
+        prefix = f"{skill_dir.name}/"
+        file_hashes = {path[len(prefix):]: digest for path, digest in file_hashes.items()}
+    else:
+        skill_dir = extract_dir
+
+    return skill_dir, file_hashes
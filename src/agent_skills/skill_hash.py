@@ -0,0 +1,46 @@
+"""Skill 内容哈希：用于增量快照与去重"""
+import hashlib
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """单文件 sha256（分块读取）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_file_hashes(skill_dir: Path) -> dict[str, str]:
+    """Skill 目录下所有文件的 {相对路径: sha256}"""
+    skill_dir = Path(skill_dir)
+    return {
+        file_path.relative_to(skill_dir).as_posix(): hash_file(file_path)
+        for file_path in sorted(skill_dir.rglob("*"))
+        if file_path.is_file()
+    }
+
+
+def combine_hashes(file_hashes: dict[str, str]) -> str:
+    """将文件哈希表合并为一个目录级哈希（与文件遍历顺序无关）"""
+    digest = hashlib.sha256()
+    for relative in sorted(file_hashes):
+        digest.update(f"{relative}\0{file_hashes[relative]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def compute_skill_hash(skill_dir: Path) -> str:
+    """Skill 目录内容哈希"""
+    return combine_hashes(compute_file_hashes(skill_dir))
+
+
+def compute_validation_hash(skill_dir: Path) -> str:
+    """验证相关内容哈希：仅 SKILL.md 与 scripts/ 目录（示例、文档等改动不触发重新验证）"""
+    file_hashes = compute_file_hashes(skill_dir)
+    return combine_hashes({
+        relative: digest for relative, digest in file_hashes.items()
+        if relative == "SKILL.md" or relative.startswith("scripts/")
+    })
@@ -0,0 +1,57 @@
+"""Skills 目录索引
+
+快照构建时生成 /skills/.index.json（name、description、triggers），
+Agent 读取一个小文件即可了解全部 Skill，无需逐个扫描 /skills 下的 SKILL.md。
+"""
+import re
+from pathlib import Path
+
+import yaml
+
+from src.utils.get_logger import get_logger
+
+logger = get_logger("skill-index")
+
+_FRONTMATTER = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+
+
+def read_skill_entry(skill_dir: Path) -> dict | None:
+    """从 SKILL.md 提取索引条目，格式无效时返回 None"""
+    from deepagents.middleware.skills import _parse_skill_metadata
+
+    skill_md = Path(skill_dir) / "SKILL.md"
+    if not skill_md.exists():
+        return None
+    content = skill_md.read_text(encoding="utf-8")
+    metadata = _parse_skill_metadata(content, str(skill_md), Path(skill_dir).name)
+    if not metadata:
+        return None
+
+    triggers: list[str] = []
+    match = _FRONTMATTER.match(content)
+    if match:
+        try:
+            frontmatter = yaml.safe_load(match.group(1)) or {}
+            raw = frontmatter.get("triggers") or []
+            triggers = [str(t) for t in raw] if isinstance(raw, list) else [str(raw)]
+        except yaml.YAMLError:
+            pass
+
+    return {
+        "name": metadata["name"],
+        "description": metadata["description"],
+        "triggers": triggers,
+        "path": f"/skills/{Path(skill_dir).name}",
+    }
+
+
+def build_skills_index(skills_dir: Path, names: list[str]) -> list[dict]:
+    """为指定 Skills 生成索引（按名称排序）"""
+    entries = []
+    for name in sorted(names):
+        entry = read_skill_entry(Path(skills_dir) / name)
+        if entry:
+            entries.append(entry)
+        else:
+            logger.warning(f"[SkillIndex] Skipping {name}: invalid SKILL.md")
+    return entries
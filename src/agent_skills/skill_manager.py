@@ -1,17 +1,18 @@
 """Skill manager for CRUD operations, state transitions, and file operations."""
 import os
 import uuid
-import zipfile
 import shutil
 from pathlib import Path
 from datetime import datetime
 from typing import BinaryIO
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from sqlalchemy import or_
 
 from src.database import Skill, SessionLocal
 from src.config import settings
+from src.agent_skills.skill_archive import extract_upload
+from src.agent_skills.skill_hash import combine_hashes
 from src.utils.get_logger import get_logger
 
 logger = get_logger("valid-agent-skill")
@@ -27,6 +28,22 @@ VALIDATION_STAGE_LAYER2 = "layer2"
 VALIDATION_STAGE_COMPLETED = "completed"
 VALIDATION_STAGE_FAILED = "failed"
 
+# 列表页不需要的大字段，summary 查询时延迟加载
+HEAVY_COLUMNS = (
+    Skill.layer1_report,
+    Skill.layer2_report,
+    Skill.task_results,
+    Skill.execution_metrics,
+    Skill.task_completion_details,
+    Skill.regression_results,
+    Skill.validation_tasks,
+    Skill.full_test_results,
+    Skill.validation_report,
+    Skill.installed_dependencies,
+    Skill.requirements,
+    Skill.report_content,
+)
+
 
 def get_skill_pending_dir() -> Path:
     """Get pending skills directory."""
@@ -88,19 +105,7 @@ class SkillManager:
         try:
             temp_dir.mkdir(parents=True, exist_ok=True)
             
-            zip_path = temp_dir / filename
-            with open(zip_path, 'wb') as f:
-                f.write(file.read())
-            
-            extract_dir = temp_dir / "extracted"
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            extracted_items = list(extract_dir.iterdir())
-            if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                skill_dir = extracted_items[0]
-            else:
-                skill_dir = extract_dir
+            skill_dir, file_hashes = extract_upload(file, filename, temp_dir)
             
             passed, errors, warnings = validate_skill_format(str(skill_dir))
             
@@ -128,6 +133,7 @@ class SkillManager:
                 description=metadata.get('description', ''),
                 status=STATUS_PENDING,
                 skill_path=str(final_dir),
+                content_hash=combine_hashes(file_hashes),
                 format_valid=passed,
                 format_errors=errors,
                 format_warnings=warnings,
@@ -153,19 +159,7 @@ class SkillManager:
         try:
             temp_dir.mkdir(parents=True, exist_ok=True)
             
-            zip_path = temp_dir / filename
-            with open(zip_path, 'wb') as f:
-                f.write(file.read())
-            
-            extract_dir = temp_dir / "extracted"
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            extracted_items = list(extract_dir.iterdir())
-            if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                skill_dir = extracted_items[0]
-            else:
-                skill_dir = extract_dir
+            skill_dir, file_hashes = extract_upload(file, filename, temp_dir)
             
             skill_md_path = skill_dir / "SKILL.md"
             if not skill_md_path.exists():
@@ -195,6 +189,7 @@ class SkillManager:
                 description=metadata.get('description', ''),
                 status=STATUS_APPROVED,
                 skill_path=str(final_dir),
+                content_hash=combine_hashes(file_hashes),
                 format_valid=True,
                 format_errors=[],
                 format_warnings=[],
@@ -222,9 +217,21 @@ class SkillManager:
         """Get a skill by name."""
         return db.query(Skill).filter(Skill.name == name).first()
     
-    def list_all(self, db: Session, status: str | None = None, offset: int = 0, limit: int = 20) -> list[Skill]:
-        """List all skills, optionally filtered by status with pagination."""
+    def list_all(
+        self,
+        db: Session,
+        status: str | None = None,
+        offset: int = 0,
+        limit: int = 20,
+        summary: bool = False,
+    ) -> list[Skill]:
+        """List all skills, optionally filtered by status with pagination.
+        
+        summary=True defers the large JSON/text columns; only touch summary fields on the results.
+        """
         query = db.query(Skill)
+        if summary:
+            query = query.options(*(defer(column) for column in HEAVY_COLUMNS))
         if status:
             query = query.filter(Skill.status == status)
         return query.order_by(Skill.created_at.desc()).offset(offset).limit(limit).all()
@@ -347,11 +354,47 @@ class SkillManager:
             skill.validated_at = datetime.utcnow()
             logger.info(f"[update_validation_result] 验证完成时间: {skill.validated_at}")
         
+        if skill.layer1_report:
+            self._render_report(skill)
+        
         db.commit()
         db.refresh(skill)
         
         return skill
     
+    def _render_report(self, skill: Skill) -> None:
+        """按验证结果渲染模板报告（未提交）"""
+        from src.agent_skills.report_renderer import compute_report_hash, render_report
+        
+        report_hash = compute_report_hash(skill)
+        if skill.report_hash == report_hash and skill.report_content:
+            return
+        skill.report_hash = report_hash
+        skill.report_content = render_report(skill)
+        skill.report_narrated = False
+        logger.info(f"[_render_report] 报告已渲染 skill_id={skill.skill_id} hash={report_hash[:8]}")
+    
+    def get_cached_report(self, db: Session, skill: Skill) -> Skill:
+        """返回带有效缓存报告的 Skill，缓存缺失或过期时重新渲染模板"""
+        from src.agent_skills.report_renderer import compute_report_hash
+        
+        if skill.report_content and skill.report_hash == compute_report_hash(skill):
+            return skill
+        self._render_report(skill)
+        db.commit()
+        db.refresh(skill)
+        return skill
+    
+    def save_narrated_report(self, db: Session, skill_id: str, report_hash: str, content: str) -> bool:
+        """保存 LLM 润色后的报告，报告哈希已变化时丢弃"""
+        skill = self.get(db, skill_id)
+        if not skill or skill.report_hash != report_hash:
+            return False
+        skill.report_content = content
+        skill.report_narrated = True
+        db.commit()
+        return True
+    
     def set_validating(self, db: Session, skill_id: str) -> Skill:
         """Set skill status to validating."""
         skill = self.get(db, skill_id)
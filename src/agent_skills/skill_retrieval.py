@@ -0,0 +1,152 @@
+"""Skills 本地检索（BM25，无需 embedding）
+
+索引内容为当前快照中各 Skill 的 name、description、triggers：英文/数字按词切分，
+中文按字二元组（bigram）切分。快照发布时重建；其他 worker 通过快照指针变化
+懒加载重建，回滚同样生效。
+
+stream_chat 在每轮对话前检索 top-k 相关 Skill 摘要注入上下文，
+减少 Agent 用 ls/read_file 探索 /skills 的工具调用与输入 token。
+"""
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from src.config import settings
+from src.agent_skills.skill_index import build_skills_index
+from src.utils.get_logger import get_logger
+
+logger = get_logger("skill-retrieval")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CJK = re.compile(r"[\u4e00-\u9fff]+")
+
+# name/triggers 比 description 更能代表触发意图，按重复次数加权
+NAME_WEIGHT = 2
+TRIGGER_WEIGHT = 2
+
+
+def tokenize(text: str) -> list[str]:
+    """英文/数字按词切分，中文按 bigram 切分（单字词保留单字）"""
+    text = (text or "").lower()
+    tokens = _WORD.findall(text)
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _entry_tokens(entry: dict) -> list[str]:
+    tokens = tokenize(entry.get("name", "")) * NAME_WEIGHT
+    for trigger in entry.get("triggers") or []:
+        tokens += tokenize(trigger) * TRIGGER_WEIGHT
+    tokens += tokenize(entry.get("description", ""))
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25"""
+
+    def __init__(self, entries: list[dict], k1: float = 1.5, b: float = 0.75):
+        self.entries = entries
+        self.k1 = k1
+        self.b = b
+        self.doc_freqs = [Counter(_entry_tokens(entry)) for entry in entries]
+        self.doc_lens = [sum(freqs.values()) for freqs in self.doc_freqs]
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if entries else 0.0
+
+        df: Counter = Counter()
+        for freqs in self.doc_freqs:
+            df.update(freqs.keys())
+        n = len(entries)
+        self.idf = {term: math.log(1 + (n - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> list[tuple[dict, float]]:
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        if not terms:
+            return []
+
+        scored = []
+        for entry, freqs, length in zip(self.entries, self.doc_freqs, self.doc_lens):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_len or 1))
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > min_score:
+                scored.append((entry, score))
+
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+
+class SkillRetriever:
+    """当前快照的 Skill 检索索引"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._index = BM25Index([])
+            cls._instance._snapshot_id: str | None = None
+            cls._instance._loaded = False
+        return cls._instance
+
+    def rebuild(self, snapshot_id: str | None, entries: list[dict]):
+        """用给定索引条目重建（快照发布时调用）"""
+        index = BM25Index(entries)
+        with self._lock:
+            self._index = index
+            self._snapshot_id = snapshot_id
+            self._loaded = True
+        logger.info(f"[SkillRetriever] Indexed {len(entries)} skills for snapshot {(snapshot_id or '-')[:8]}")
+
+    def _load_entries(self, snapshot_id: str | None) -> list[dict]:
+        """读取快照 manifest 中的 Skill 名单，从本地 Skills 目录生成索引条目"""
+        from src.database import SessionLocal, ImageVersion, Skill
+
+        with SessionLocal() as db:
+            version = None
+            if snapshot_id:
+                version = db.query(ImageVersion.skills_manifest).filter(ImageVersion.version == snapshot_id).first()
+            if version and version.skills_manifest:
+                names = list(version.skills_manifest)
+            else:
+                names = [row.name for row in db.query(Skill.name).filter(Skill.status == "approved").all()]
+
+        return build_skills_index(Path(settings.SHARED_DIR) / "skills", names)
+
+    def ensure_current(self):
+        """快照指针变化（其他 worker 发布或回滚）时重建"""
+        from src.snapshot_manager import get_snapshot_manager
+
+        snapshot_id = get_snapshot_manager().get_current_snapshot_id()
+        if self._loaded and snapshot_id == self._snapshot_id:
+            return
+        self.rebuild(snapshot_id, self._load_entries(snapshot_id))
+
+    def search(self, query: str, k: int | None = None) -> list[dict]:
+        """返回 top-k 相关 Skill 条目（附 score）"""
+        try:
+            self.ensure_current()
+        except Exception as e:
+            logger.warning(f"[SkillRetriever] Failed to refresh index: {e}")
+
+        k = k or settings.SKILL_RETRIEVAL_TOP_K
+        results = self._index.search(query, k=k, min_score=settings.SKILL_RETRIEVAL_MIN_SCORE)
+        return [{**entry, "score": round(score, 3)} for entry, score in results]
+
+
+def format_skill_hints(skills: list[dict]) -> str:
+    """注入对话上下文的 Skill 摘要"""
+    lines = [f"- {s['name']}: {s['description']}（{s['path']}/SKILL.md）" for s in skills]
+    return "与本次请求可能相关的 Skills（按相关度排序，先读对应 SKILL.md 再使用）：\n" + "\n".join(lines)
+
+
+def get_skill_retriever() -> SkillRetriever:
+    return SkillRetriever()
@@ -1,16 +1,22 @@
 """Skill 验证编排器 - 双 Sandbox 方案
 
 验证流程：
-1. 创建联网 Sandbox → 联网验证
-2. 创建离线 Sandbox (network_block_all=True) → 离线验证
+1. 并发创建联网 Sandbox 与离线 Sandbox (network_block_all=True)
+2. 联网验证；Agent 通过 write_todos 产出测试任务后立即在离线 Sandbox 启动离线验证
 3. 销毁两个 Sandbox → 计算评分
+
+验证 Agent 按系统提示词编译一次并复用，Sandbox 通过运行时 config 中的
+validation_backend 键解析。
 """
 import asyncio
 import json
 import traceback
+import uuid
 from pathlib import Path
+from typing import Any, Callable
 
-from src.config import big_llm
+from src.config import big_llm, big_router, settings
+from src.coordination import ClusterSemaphore
 from src.daytona_client import get_daytona_client
 from src.agent_skills.skill_manager import (
     get_skill_manager,
@@ -26,17 +32,26 @@ from src.agent_skills.skill_scorer import (
     is_passing,
 )
 from src.agent_skills.task_store import get_task_store
+from src.agent_skills.validation_events import get_validation_event_bus
 from src.agent_skills.prompts import (
     VALIDATION_SYSTEM_PROMPT,
     VALIDATION_PROMPT,
     OFFLINE_SYSTEM_PROMPT,
     OFFLINE_VALIDATION_PROMPT,
+    FULL_TEST_SYSTEM_PROMPT,
+    FULL_TEST_PROMPT,
 )
 from src.database import SessionLocal
 from src.utils.get_logger import get_logger
 
 logger = get_logger("skill-validator")
 
+ProgressCallback = Callable[[int, str], None]
+
+
+def _task_texts(tasks: list[dict]) -> list[str]:
+    return [str(task.get("task", "")).strip() for task in tasks]
+
 
 class ValidationOrchestrator:
     """Skill 验证编排器"""
@@ -44,19 +59,91 @@ class ValidationOrchestrator:
     def __init__(self):
         self.skill_manager = get_skill_manager()
         self.task_store = get_task_store()
-        self.max_concurrent = 5
-        self._semaphore = asyncio.Semaphore(self.max_concurrent)
-        self._running_validations: dict[str, asyncio.Task] = {}
+        self.max_concurrent = settings.VALIDATION_SANDBOX_CONCURRENCY
+        self._semaphore = ClusterSemaphore("validation-sandbox", self.max_concurrent)
+        self._agents: dict[str, Any] = {}
+        self._backends: dict[str, Any] = {}
+    
+    def _resolve_backend(self, runtime: Any):
+        """根据运行时 config 中的 validation_backend 键取本次验证的 Sandbox"""
+        config = getattr(runtime, "config", None) or {}
+        key = config.get("configurable", {}).get("validation_backend")
+        return self._backends[key]
+    
+    def _get_agent(self, system_prompt: str):
+        """按系统提示词缓存编译后的验证 Agent"""
+        if system_prompt not in self._agents:
+            from deepagents import create_deep_agent
+            
+            self._agents[system_prompt] = create_deep_agent(
+                model=big_llm,
+                backend=self._resolve_backend,
+                system_prompt=system_prompt,
+            )
+        return self._agents[system_prompt]
+    
+    async def _run_agent(
+        self,
+        system_prompt: str,
+        backend,
+        prompt: str,
+        on_todos: Callable[[list[dict]], None] | None = None,
+        skill_id: str | None = None,
+        phase: str = "",
+    ) -> dict:
+        """在指定 Sandbox 上流式运行验证 Agent，返回最终状态
+        
+        on_todos 在 todos 首次出现时回调；传入 skill_id 时每次工具调用发布 agent_step 事件。
+        """
+        agent = self._get_agent(system_prompt)
+        key = str(uuid.uuid4())
+        self._backends[key] = backend
+        config = {"configurable": {"validation_backend": key}}
+        bus = get_validation_event_bus()
+        
+        try:
+            state: dict = {}
+            todos_seen = False
+            seen_messages = 0
+            async for state in agent.astream({"messages": [("user", prompt)]}, config=config, stream_mode="values"):
+                if not isinstance(state, dict):
+                    continue
+                todos = state.get("todos")
+                if todos and not todos_seen:
+                    todos_seen = True
+                    if on_todos:
+                        on_todos(todos)
+                
+                messages = state.get("messages", [])
+                if skill_id:
+                    for message in messages[seen_messages:]:
+                        for call in getattr(message, "tool_calls", None) or []:
+                            bus.publish(skill_id, "agent_step", phase=phase, tool=call.get("name"))
+                seen_messages = len(messages)
+            return state
+        finally:
+            self._backends.pop(key, None)
     
-    async def validate_skill(self, skill_id: str) -> dict:
+    async def validate_skill(
+        self,
+        skill_id: str,
+        progress: ProgressCallback | None = None,
+        force: bool = False,
+    ) -> dict:
         """验证单个 Skill（后台任务）
         
+        SKILL.md / scripts、模型与提示词版本均未变化时直接复用缓存结果。
+        
         Args:
             skill_id: Skill ID
+            progress: 进度回调 (0-100, 阶段说明)
+            force: 忽略缓存，强制重新验证
             
         Returns:
             验证结果
         """
+        from src.agent_skills.validation_cache import compute_cache_key, get_cached_validation, save_validation
+        
         with SessionLocal() as db:
             skill = self.skill_manager.get(db, skill_id)
             if not skill:
@@ -64,8 +151,23 @@ class ValidationOrchestrator:
             
             self.skill_manager.set_validating(db, skill_id)
         
+        bus = get_validation_event_bus()
+        bus.publish(skill_id, "started", skill_name=skill.name, force=force)
+        
         try:
-            result = await self._validate_single_skill(skill)
+            cache_key = await asyncio.to_thread(compute_cache_key, skill.skill_path, big_llm.model_name)
+            result = None if force else get_cached_validation(cache_key)
+            
+            if result:
+                bus.publish(skill_id, "cached", passed=result["passed"])
+                if result["tasks"]:
+                    self.task_store.save_tasks(skill_id, result["tasks"])
+                if result["passed"]:
+                    from src.snapshot_manager import get_snapshot_manager
+                    get_snapshot_manager().request_rebuild(f"validated {skill.name} (cached)")
+            else:
+                result = await self._validate_single_skill(skill, progress=progress)
+                save_validation(cache_key, skill.name, big_llm.model_name, result)
             
             with SessionLocal() as db:
                 if result["passed"]:
@@ -79,39 +181,81 @@ class ValidationOrchestrator:
                 else:
                     self.skill_manager.set_validation_failed(db, skill_id)
             
+            bus.publish(skill_id, "completed", passed=result["passed"], scores=result.get("scores"),
+                        cached=result.get("cached", False))
             return result
             
-        except Exception as e:
-            logger.error(f"[validate_skill] 验证异常: {e}\n{traceback.format_exc()}")
+        except (Exception, asyncio.CancelledError) as e:
+            logger.error(f"[validate_skill] 验证异常: {e!r}\n{traceback.format_exc()}")
+            bus.publish(skill_id, "failed", error=repr(e))
             with SessionLocal() as db:
                 self.skill_manager.set_validation_failed(db, skill_id)
             raise
     
-    async def run_full_test(self) -> dict:
+    def _full_test_fingerprint(self, skill, snapshot_id: str | None) -> dict:
+        """全量测试指纹：Skill 内容 + 快照 + 模型，三者均未变化时复用上次结果"""
+        return {
+            "content_hash": skill.content_hash,
+            "snapshot_id": snapshot_id,
+            "model": big_llm.model_name,
+        }
+    
+    async def run_full_test(self, progress: ProgressCallback | None = None, force: bool = False) -> dict:
         """全量测试所有已入库 Skills
         
+        指纹未变化的 Skill 直接复用上次结果；全部完成后只发起一次快照重建。
+        
+        Args:
+            progress: 进度回调 (0-100, 阶段说明)
+            force: 忽略指纹，强制全部重测
+        
         Returns:
             全量测试结果
         """
+        from src.snapshot_manager import get_snapshot_manager
+        
         with SessionLocal() as db:
             approved_skills = self.skill_manager.list_approved(db)
         
         if not approved_skills:
             return {"passed": True, "total_tested": 0, "message": "No skills to test"}
         
-        logger.info(f"[run_full_test] 开始全量测试 {len(approved_skills)} 个 Skills")
+        snapshot_id = get_snapshot_manager().get_current_snapshot_id()
+        logger.info(f"[run_full_test] 开始全量测试 {len(approved_skills)} 个 Skills force={force}")
         
         results = {}
         failed_skills = []
+        skipped_skills = []
+        
+        done_count = 0
         
         async def test_skill(skill):
-            async with self._semaphore:
+            nonlocal done_count
+            fingerprint = self._full_test_fingerprint(skill, snapshot_id)
+            previous = skill.full_test_results or {}
+            # 基础设施错误（沙箱 / LLM 不可用）的结果不复用，下次全量测试重新执行
+            if (
+                not force and skill.last_full_test_at and "error" not in previous
+                and previous.get("fingerprint") == fingerprint
+            ):
+                logger.info(f"[run_full_test] 指纹未变化，跳过 skill={skill.name}")
+                skipped_skills.append(skill.skill_id)
+                done_count += 1
+                return skill.skill_id, previous
+            
+            async with self._semaphore.slot():
                 try:
-                    result = await self._run_full_test_single(skill)
-                    return skill.skill_id, result
+                    result = await self._run_full_test_single(skill, snapshot_id)
                 except Exception as e:
                     logger.error(f"[run_full_test] 测试失败 skill={skill.name}: {e}")
-                    return skill.skill_id, {"passed": False, "error": str(e)}
+                    result = {"passed": False, "error": str(e)}
+                if "error" not in result:
+                    result["fingerprint"] = fingerprint
+                self.task_store.update_full_test_result(skill.skill_id, result)
+                done_count += 1
+                if progress:
+                    progress(done_count * 100 // len(approved_skills), f"{done_count}/{len(approved_skills)} {skill.name}")
+                return skill.skill_id, result
         
         tasks = [test_skill(s) for s in approved_skills]
         completed = await asyncio.gather(*tasks)
@@ -120,40 +264,91 @@ class ValidationOrchestrator:
             results[skill_id] = result
             if not result.get("passed"):
                 failed_skills.append(skill_id)
-            self.task_store.update_full_test_result(skill_id, result)
+        
+        if len(skipped_skills) < len(approved_skills):
+            get_snapshot_manager().request_rebuild("full test")
         
         return {
             "passed": len(failed_skills) == 0,
             "total_tested": len(approved_skills),
             "failed_count": len(failed_skills),
             "failed_skills": failed_skills,
+            "skipped_count": len(skipped_skills),
+            "skipped_skills": skipped_skills,
             "results": results
         }
     
-    async def _validate_single_skill(self, skill) -> dict:
+    async def _validate_single_skill(self, skill, progress: ProgressCallback | None = None) -> dict:
         """单个 Skill 的完整验证流程（双 Sandbox）
         
         流程：
-        1. 创建联网 Sandbox → 联网验证
-        2. 创建离线 Sandbox → 离线验证
+        1. 并发创建联网 / 离线 Sandbox
+        2. 联网验证；write_todos 产出任务后即启动离线验证（联网失败时取消，最终任务与 todo 不一致时重启）
         3. 销毁两个 Sandbox → 计算评分
         """
         from daytona import CreateSandboxFromSnapshotParams
         from langchain_daytona import DaytonaSandbox
         
         logger.info(f"[_validate_single_skill] 开始验证 skill={skill.name}")
+        bus = get_validation_event_bus()
+        
+        def report(pct: int, stage: str, message: str, **data):
+            bus.publish(skill.skill_id, stage, progress=pct, message=message, **data)
+            if progress:
+                progress(pct, message)
         
         client = get_daytona_client().client
         online_sandbox = None
-        offline_sandbox = None
+        offline_task: asyncio.Task | None = None
+        offline_sandbox_task = asyncio.create_task(asyncio.to_thread(
+            client.create, CreateSandboxFromSnapshotParams(network_block_all=True)
+        ))
+        
+        async def run_offline(tasks: list[dict]) -> dict:
+            offline_sandbox = await offline_sandbox_task
+            logger.info(f"[_validate_single_skill] 离线 Sandbox 已就绪 {offline_sandbox.id}，任务数={len(tasks)}")
+            bus.publish(skill.skill_id, "sandbox_created", message="离线 Sandbox 已就绪", sandbox="offline")
+            return await self._run_offline_validation(DaytonaSandbox(sandbox=offline_sandbox), skill, tasks)
+        
+        offline_tasks: list[dict] = []
+        
+        def start_offline(tasks: list[dict]):
+            nonlocal offline_task, offline_tasks
+            if offline_task is None:
+                logger.info(f"[_validate_single_skill] 启动离线验证 tasks={len(tasks)}")
+                report(30, "tasks_generated", f"已生成 {len(tasks)} 个测试任务", tasks=tasks)
+                offline_tasks = tasks
+                offline_task = asyncio.create_task(run_offline(tasks))
+        
+        async def ensure_offline(tasks: list[dict]):
+            """离线验证必须与联网验证使用同一组任务：提前按 todo 快照启动的离线验证与最终任务不一致时重启"""
+            nonlocal offline_task, offline_tasks
+            if offline_task is None:
+                start_offline(tasks)
+                return
+            if _task_texts(offline_tasks) == _task_texts(tasks):
+                return
+            logger.info(f"[_validate_single_skill] 最终任务与 todo 快照不一致，重启离线验证 tasks={len(tasks)}")
+            offline_task.cancel()
+            await asyncio.gather(offline_task, return_exceptions=True)
+            offline_tasks = tasks
+            offline_task = asyncio.create_task(run_offline(tasks))
         
         try:
-            online_sandbox = client.create()
+            report(5, "sandbox_creating", "创建验证 Sandbox")
+            online_sandbox = await asyncio.to_thread(client.create)
             online_backend = DaytonaSandbox(sandbox=online_sandbox)
             logger.info(f"[_validate_single_skill] 联网 Sandbox 已创建 {online_sandbox.id}")
+            report(15, "sandbox_created", "联网 Sandbox 已创建，开始联网验证", sandbox="online")
             
-            online_result = await self._run_online_validation(online_backend, skill)
+            online_result = await self._run_online_validation(online_backend, skill, on_tasks=start_offline)
             logger.info(f"[_validate_single_skill] 联网验证完成 passed={online_result.get('passed')}")
+            for evaluation in online_result.get("task_evaluations", []):
+                bus.publish(skill.skill_id, "task_evaluated", task_id=evaluation.get("task_id"),
+                            raw_score=evaluation.get("raw_score"),
+                            correct_skill_used=evaluation.get("correct_skill_used"))
+            report(60, "online_completed", "联网验证完成", passed=online_result["passed"],
+                   completion_score=online_result["completion_score"], trigger_score=online_result["trigger_score"])
             
             if not online_result["passed"]:
                 return {
@@ -170,16 +365,11 @@ class ValidationOrchestrator:
             self.task_store.save_tasks(skill.skill_id, online_result["tasks"])
             logger.info(f"[_validate_single_skill] 任务已保存到数据库")
             
-            offline_sandbox = client.create(CreateSandboxFromSnapshotParams(
-                network_block_all=True
-            ))
-            offline_backend = DaytonaSandbox(sandbox=offline_sandbox)
-            logger.info(f"[_validate_single_skill] 离线 Sandbox 已创建 {offline_sandbox.id}")
-            
-            offline_result = await self._run_offline_validation(
-                offline_backend, skill, online_result["tasks"]
-            )
+            await ensure_offline(online_result["tasks"])
+            offline_result = await offline_task
             logger.info(f"[_validate_single_skill] 离线验证完成 passed={offline_result.get('passed')}")
+            report(85, "offline_completed", "离线验证完成", passed=offline_result.get("passed"),
+                   blocked_network_calls=offline_result.get("blocked_network_calls"))
             
             scores = calculate_overall_score(
                 completion_score=online_result["completion_score"],
@@ -189,6 +379,7 @@ class ValidationOrchestrator:
             logger.info(f"[_validate_single_skill] 评分完成 overall={scores['overall']}")
             
             passed = is_passing(scores["overall"])
+            report(95, "scored", "评分完成", overall=scores["overall"], passed=passed)
             
             layer1_report = {
                 "passed": passed,
@@ -203,38 +394,44 @@ class ValidationOrchestrator:
             
             if passed:
                 from src.snapshot_manager import get_snapshot_manager
-                get_snapshot_manager().rebuild_skills_snapshot()
+                get_snapshot_manager().request_rebuild(f"validated {skill.name}")
             
             return {
                 "passed": passed,
                 "layer1_report": layer1_report,
                 "scores": scores,
-                "installed_dependencies": online_result.get("installed_dependencies", [])
+                "installed_dependencies": online_result.get("installed_dependencies", []),
+                "tasks": online_result["tasks"]
             }
             
         finally:
             logger.info(f"[_validate_single_skill] 销毁验证 Sandboxes")
+            if offline_task and not offline_task.done():
+                offline_task.cancel()
+                await asyncio.gather(offline_task, return_exceptions=True)
             if online_sandbox:
                 try:
-                    client.delete(online_sandbox)
-                except Exception:
-                    pass
-            if offline_sandbox:
-                try:
-                    client.delete(offline_sandbox)
+                    await asyncio.to_thread(client.delete, online_sandbox)
                 except Exception:
                     pass
+            try:
+                offline_sandbox = await offline_sandbox_task
+                await asyncio.to_thread(client.delete, offline_sandbox)
+            except Exception:
+                pass
     
     async def _run_online_validation(
         self, 
         backend, 
-        skill
+        skill,
+        on_tasks: Callable[[list[dict]], None] | None = None
     ) -> dict:
         """联网验证
         
         Args:
             backend: 联网 Sandbox
             skill: Skill 对象
+            on_tasks: Agent 通过 write_todos 产出测试任务时的回调
             
         Returns:
             验证结果
@@ -248,16 +445,17 @@ class ValidationOrchestrator:
             skill_md=skill_md
         )
         
-        from deepagents import create_deep_agent
-        
-        agent = create_deep_agent(
-            model=big_llm,
-            backend=lambda _: backend,
-            system_prompt=VALIDATION_SYSTEM_PROMPT,
-        )
+        def on_todos(todos: list[dict]):
+            if on_tasks:
+                on_tasks([
+                    {"task_id": i + 1, "task": todo.get("content", "")}
+                    for i, todo in enumerate(todos)
+                ])
         
         logger.info(f"[_run_online_validation] 开始执行 Agent")
-        result = await agent.ainvoke({"messages": [("user", prompt)]})
+        result = await self._run_agent(
+            VALIDATION_SYSTEM_PROMPT, backend, prompt, on_todos=on_todos, skill_id=skill.skill_id, phase="online"
+        )
         
         parsed = self._parse_validation_result(result)
         logger.info(f"[_run_online_validation] 解析完成 tasks={len(parsed.get('tasks', []))}")
@@ -293,13 +491,17 @@ class ValidationOrchestrator:
         """
         logger.info(f"[_run_offline_validation] 开始离线验证 skill={skill.name}")
         
-        test_result = backend.execute("curl -s --connect-timeout 2 http://google.com 2>&1 || echo 'BLOCKED'")
+        test_result = await asyncio.to_thread(
+            backend.execute, "curl -s --connect-timeout 2 http://google.com 2>&1 || echo 'BLOCKED'"
+        )
         output = test_result.output if hasattr(test_result, 'output') else str(test_result)
         
-        if "BLOCKED" not in output and "Network is unreachable" not in output:
+        network_blocked = "BLOCKED" in output or "Network is unreachable" in output
+        if not network_blocked:
             logger.warning(f"[_run_offline_validation] 网络未被阻断: {output[:100]}")
         else:
             logger.info(f"[_run_offline_validation] 网络已被阻断（预期）")
+        get_validation_event_bus().publish(skill.skill_id, "offline_check", network_blocked=network_blocked)
         
         tasks_json = json.dumps(tasks, ensure_ascii=False, indent=2)
         prompt = OFFLINE_VALIDATION_PROMPT.format(
@@ -307,15 +509,7 @@ class ValidationOrchestrator:
             tasks=tasks_json
         )
         
-        from deepagents import create_deep_agent
-        
-        agent = create_deep_agent(
-            model=big_llm,
-            backend=lambda _: backend,
-            system_prompt=OFFLINE_SYSTEM_PROMPT,
-        )
-        
-        result = await agent.ainvoke({"messages": [("user", prompt)]})
+        result = await self._run_agent(OFFLINE_SYSTEM_PROMPT, backend, prompt, skill_id=skill.skill_id, phase="offline")
         parsed = self._parse_offline_result(result)
         
         blocked_network_calls = parsed.get("blocked_network_calls", 0)
@@ -330,11 +524,15 @@ class ValidationOrchestrator:
             "offline_capable": blocked_network_calls == 0
         }
     
-    async def _run_full_test_single(self, skill) -> dict:
+    async def _run_full_test_single(self, skill, snapshot_id: str | None = None) -> dict:
         """单个 Skill 的全量测试
         
-        复用之前的 3 个任务 + 新生成 2 个任务 = 5 个任务
+        复用之前的 3 个任务 + 新生成 2 个任务 = 5 个任务，
+        在一个基于当前 Skills 快照的 Sandbox 中直接执行合并后的任务集。
         """
+        from daytona import CreateSandboxFromSnapshotParams
+        from langchain_daytona import DaytonaSandbox
+        
         logger.info(f"[_run_full_test_single] 开始全量测试 skill={skill.name}")
         
         old_tasks = self.task_store.get_tasks(skill.skill_id)
@@ -343,7 +541,40 @@ class ValidationOrchestrator:
         all_tasks = self.task_store.merge_tasks(old_tasks, new_tasks)
         logger.info(f"[_run_full_test_single] 任务合并完成 old={len(old_tasks)} new={len(new_tasks)} total={len(all_tasks)}")
         
-        return await self._validate_single_skill(skill)
+        prompt = FULL_TEST_PROMPT.format(
+            skill_name=skill.name,
+            old_count=len(old_tasks),
+            old_tasks=json.dumps(old_tasks, ensure_ascii=False, indent=2),
+            new_count=len(new_tasks),
+            new_tasks=json.dumps(new_tasks, ensure_ascii=False, indent=2),
+            total_count=len(all_tasks),
+        )
+        
+        client = get_daytona_client().client
+        params = CreateSandboxFromSnapshotParams(snapshot=snapshot_id) if snapshot_id else None
+        sandbox = await asyncio.to_thread(client.create, params)
+        try:
+            result = await self._run_agent(FULL_TEST_SYSTEM_PROMPT, DaytonaSandbox(sandbox=sandbox), prompt)
+        finally:
+            try:
+                await asyncio.to_thread(client.delete, sandbox)
+            except Exception:
+                pass
+        
+        parsed = self._parse_validation_result(result)
+        evaluations = parsed.get("task_evaluations", [])
+        completion_score = calculate_completion_score(evaluations)
+        trigger_score = calculate_trigger_score(evaluations)
+        logger.info(f"[_run_full_test_single] 完成 skill={skill.name} completion={completion_score} trigger={trigger_score}")
+        
+        return {
+            "passed": completion_score >= 50,
+            "tasks": all_tasks,
+            "task_evaluations": evaluations,
+            "completion_score": completion_score,
+            "trigger_score": trigger_score,
+            "assessment": parsed.get("assessment", {}),
+        }
     
     async def _generate_extra_tasks(self, skill, count: int = 2) -> list[dict]:
         """生成额外的测试任务
@@ -384,7 +615,7 @@ Skill 描述:
 ]
 """
         
-        response = await big_llm.ainvoke(prompt)
+        response = await big_router.ainvoke(prompt)
         content = response.content if hasattr(response, 'content') else str(response)
         
         try:
@@ -512,3 +743,28 @@ def get_validation_orchestrator() -> ValidationOrchestrator:
     if _validation_orchestrator is None:
         _validation_orchestrator = ValidationOrchestrator()
     return _validation_orchestrator
+
+
+async def _handle_validate_job(ctx) -> dict:
+    result = await get_validation_orchestrator().validate_skill(
+        ctx.payload["skill_id"], progress=ctx.report, force=ctx.payload.get("force", False)
+    )
+    return {
+        "passed": result.get("passed"),
+        "scores": result.get("scores"),
+        "reason": result.get("reason"),
+        "cached": result.get("cached", False),
+    }
+
+
+async def _handle_full_test_job(ctx) -> dict:
+    result = await get_validation_orchestrator().run_full_test(
+        progress=ctx.report, force=ctx.payload.get("force", False)
+    )
+    return {key: value for key, value in result.items() if key != "results"}
+
+
+def register_job_handlers(queue):
+    """将验证相关任务注册到任务队列"""
+    queue.register("validate", _handle_validate_job)
+    queue.register("full_test", _handle_full_test_job)
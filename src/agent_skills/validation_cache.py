@@ -0,0 +1,57 @@
+"""验证结果缓存
+
+键 = sha256(SKILL.md + scripts/ 内容哈希, 模型 ID, 提示词版本)，
+内容相同的 Skill 重复上传或重新验证时直接复用上次的 layer1_report 与评分。
+"""
+import hashlib
+from pathlib import Path
+
+from src.agent_skills.prompts import PROMPT_VERSION
+from src.agent_skills.skill_hash import compute_validation_hash
+from src.database import SessionLocal, ValidationCache
+from src.utils.get_logger import get_logger
+
+logger = get_logger("validation-cache")
+
+
+def compute_cache_key(skill_path: str, model: str) -> str:
+    content_hash = compute_validation_hash(Path(skill_path))
+    raw = f"{content_hash}\0{model}\0{PROMPT_VERSION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_validation(cache_key: str) -> dict | None:
+    """命中时返回与 _validate_single_skill 相同结构的结果"""
+    with SessionLocal() as db:
+        entry = db.query(ValidationCache).filter(ValidationCache.cache_key == cache_key).first()
+        if not entry:
+            return None
+        entry.hits = (entry.hits or 0) + 1
+        db.commit()
+        logger.info(f"[ValidationCache] Hit {cache_key[:12]} skill={entry.skill_name} hits={entry.hits}")
+        return {
+            "passed": entry.passed,
+            "layer1_report": entry.layer1_report,
+            "scores": entry.scores,
+            "installed_dependencies": entry.installed_dependencies,
+            "tasks": entry.tasks or [],
+            "cached": True,
+        }
+
+
+def save_validation(cache_key: str, skill_name: str, model: str, result: dict) -> None:
+    """保存一次完整验证的结果（覆盖同键旧记录）"""
+    with SessionLocal() as db:
+        entry = db.query(ValidationCache).filter(ValidationCache.cache_key == cache_key).first()
+        if not entry:
+            entry = ValidationCache(cache_key=cache_key, hits=0)
+            db.add(entry)
+        entry.skill_name = skill_name
+        entry.model = model
+        entry.prompt_version = PROMPT_VERSION
+        entry.passed = bool(result.get("passed"))
+        entry.layer1_report = result.get("layer1_report")
+        entry.scores = result.get("scores")
+        entry.installed_dependencies = result.get("installed_dependencies")
+        entry.tasks = result.get("tasks")
+        db.commit()
@@ -0,0 +1,85 @@
+"""验证进度事件总线
+
+编排器在各阶段发布事件（sandbox 创建、任务生成、Agent 工具调用、任务评估、离线检查、评分），
+SSE 接口订阅后实时推送给管理端。事件经 ClusterEvents 广播到所有 worker，
+验证运行在哪个进程上，任意 worker 的 SSE 连接都能收到进度。
+"""
+import asyncio
+import time
+from collections import defaultdict
+
+from src.coordination import get_cluster_events
+
+TERMINAL_STAGES = {"completed", "failed"}
+EVENTS_CHANNEL = "validation_events"
+
+
+class ValidationEventBus:
+    """按 skill_id 分发验证事件"""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._started_at: dict[str, float] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        get_cluster_events().subscribe(EVENTS_CHANNEL, self._on_event)
+
+    def subscribe(self, skill_id: str) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[skill_id].add(queue)
+        return queue
+
+    def unsubscribe(self, skill_id: str, queue: asyncio.Queue):
+        self._subscribers[skill_id].discard(queue)
+        if not self._subscribers[skill_id]:
+            self._subscribers.pop(skill_id, None)
+
+    def is_running(self, skill_id: str) -> bool:
+        return skill_id in self._started_at
+
+    def publish(self, skill_id: str, stage: str, **data):
+        """发布事件，附带自验证开始以来的耗时"""
+        now = time.monotonic()
+        if stage == "started":
+            self._started_at[skill_id] = now
+        started_at = self._started_at.get(skill_id, now)
+        if stage in TERMINAL_STAGES:
+            self._started_at.pop(skill_id, None)
+
+        event = {"skill_id": skill_id, "stage": stage, "elapsed": round(now - started_at, 2), **data}
+        get_cluster_events().publish(EVENTS_CHANNEL, event)
+
+    def _on_event(self, event: dict):
+        """ClusterEvents 回调：本进程发布时在调用线程，其他 worker 发布时在监听线程"""
+        loop = self._loop
+        if loop is None or _running_loop() is loop:
+            self._deliver(event)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        skill_id = event.get("skill_id")
+        stage = event.get("stage")
+        if stage == "started":
+            self._started_at.setdefault(skill_id, time.monotonic() - event.get("elapsed", 0))
+        elif stage in TERMINAL_STAGES:
+            self._started_at.pop(skill_id, None)
+        for queue in self._subscribers.get(skill_id, ()):
+            queue.put_nowait(event)
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+_event_bus: ValidationEventBus | None = None
+
+
+def get_validation_event_bus() -> ValidationEventBus:
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = ValidationEventBus()
+    return _event_bus
@@ -2,6 +2,7 @@ from .types import SSEEvent, InterruptAction, TOOL_EXECUTE, TOOL_WRITE_FILE, TOO
 from .formatter import SSEFormatter, StreamDataFormatter, sanitize_for_json
 from .interrupt import InterruptHandler
 from .session import SessionManager
+from .title import TitleService
 
 __all__ = [
     "SSEEvent",
@@ -15,4 +16,5 @@ __all__ = [
     "sanitize_for_json",
     "InterruptHandler",
     "SessionManager",
+    "TitleService",
 ]
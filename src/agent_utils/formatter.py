@@ -69,6 +69,9 @@ class SSEFormatter:
     def make_title_updated_event(self, title: str) -> str:
         return self.format(InternalEventType.TITLE_UPDATED, {"title": title})
 
+    def make_validation_progress_event(self, data: dict) -> str:
+        return self.format(InternalEventType.VALIDATION_PROGRESS, data)
+
 
 class StreamDataFormatter:
     def __init__(self, sse_formatter: SSEFormatter):
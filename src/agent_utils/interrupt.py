@@ -21,13 +21,14 @@ class InterruptHandler:
         action: InterruptAction,
         answers: list[str] | None = None,
         langfuse_handler: Any = None,
+        callbacks: list | None = None,
     ) -> AsyncIterator[str]:
         if action not in [InterruptAction.CONTINUE, InterruptAction.CANCEL, InterruptAction.ANSWER]:
             raise ValueError("Action must be 'continue', 'cancel' or 'answer'")
 
         config: RunnableConfig = {
             "configurable": {"thread_id": thread_id},
-            "callbacks": [langfuse_handler] if langfuse_handler else []
+            "callbacks": list(callbacks or []) + ([langfuse_handler] if langfuse_handler else [])
         }
 
         snapshot = await self.agent.aget_state(config)
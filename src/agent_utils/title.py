@@ -0,0 +1,147 @@
+"""会话标题生成
+
+问候语与短消息走启发式快速路径；其余按规范化提示词哈希依次查内存 LRU、title_cache 表，
+都未命中才调用 flash 模型。模型满载时先返回临时标题，后台合并为一次批量请求再回写。
+"""
+import asyncio
+import hashlib
+import json
+import re
+
+from src.database import SessionLocal, Thread, TitleCache
+from src.utils.get_logger import get_logger
+from src.utils.ttl_cache import TTLCache
+
+logger = get_logger("title-service")
+
+TITLE_MAX_LENGTH = 20
+SHORT_MESSAGE_CHARS = 12
+DEFAULT_TITLE = "新对话"
+GREETINGS = {
+    "hi", "hello", "hey", "你好", "您好", "嗨", "哈喽", "在吗", "在么", "你是谁", "早上好", "晚上好", "test", "测试",
+}
+
+BATCH_WINDOW_SECONDS = 2.0
+BATCH_MAX_SIZE = 8
+BATCH_MAX_DEFER_SECONDS = 60.0
+
+_PUNCTUATION = re.compile(r"[\s,.!?;:，。！？；：、~～…\"'“”‘’]+")
+
+
+def normalize_prompt(message: str) -> str:
+    return _PUNCTUATION.sub(" ", message.strip().lower()).strip()
+
+
+def heuristic_title(message: str) -> str | None:
+    """无需 LLM 的快速路径：问候语与短消息"""
+    normalized = normalize_prompt(message)
+    if not normalized or normalized in GREETINGS:
+        return DEFAULT_TITLE
+    if len(normalized) <= SHORT_MESSAGE_CHARS:
+        return message.strip()[:TITLE_MAX_LENGTH]
+    return None
+
+
+def _clean_title(raw: str) -> str:
+    cleaned = raw.strip().strip("\"'“”《》#* ")
+    return cleaned.splitlines()[0][:TITLE_MAX_LENGTH] if cleaned else DEFAULT_TITLE
+
+
+class TitleService:
+    """会话标题生成：启发式快速路径 → LRU → 持久化缓存 → LLM（满载时延后批量生成）"""
+
+    def __init__(self, router, cache_size: int = 2048):
+        self.router = router
+        self._cache = TTLCache(maxsize=cache_size)
+        self._pending: list[tuple[str, str, str, str]] = []
+        self._worker: asyncio.Task | None = None
+
+    @staticmethod
+    def _prompt_hash(message: str) -> str:
+        return hashlib.sha256(normalize_prompt(message[:100]).encode("utf-8")).hexdigest()
+
+    async def get_title(self, thread_id: str, message: str) -> str:
+        title = heuristic_title(message)
+        if title:
+            return title
+
+        key = self._prompt_hash(message)
+        title = self._cache.get(key) or await asyncio.to_thread(self._load_cached, key)
+        if title:
+            self._cache.set(key, title)
+            return title
+
+        if self.router.saturated:
+            provisional = message.strip()[:TITLE_MAX_LENGTH]
+            self._defer(thread_id, message, provisional, key)
+            return provisional
+
+        prompt = f"用5-10个字概括主题，只返回标题：{message[:100]}"
+        response = await self.router.ainvoke(prompt)
+        title = _clean_title(str(response.content))
+        await asyncio.to_thread(self._remember, key, title)
+        return title
+
+    def _load_cached(self, key: str) -> str | None:
+        with SessionLocal() as db:
+            entry = db.query(TitleCache).filter(TitleCache.prompt_hash == key).first()
+            if not entry:
+                return None
+            entry.hits = (entry.hits or 0) + 1
+            db.commit()
+            return entry.title
+
+    def _remember(self, key: str, title: str) -> None:
+        self._cache.set(key, title)
+        try:
+            with SessionLocal() as db:
+                if not db.query(TitleCache).filter(TitleCache.prompt_hash == key).first():
+                    db.add(TitleCache(prompt_hash=key, title=title, hits=0))
+                    db.commit()
+        except Exception as e:
+            logger.warning(f"[TitleService] Persist title cache failed: {e}")
+
+    def _defer(self, thread_id: str, message: str, provisional: str, key: str) -> None:
+        logger.info(f"[TitleService] Flash model saturated, deferring title for {thread_id}")
+        self._pending.append((thread_id, message, provisional, key))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        await asyncio.sleep(BATCH_WINDOW_SECONDS)
+        waited = BATCH_WINDOW_SECONDS
+        while self._pending:
+            if self.router.saturated and waited < BATCH_MAX_DEFER_SECONDS:
+                await asyncio.sleep(1)
+                waited += 1
+                continue
+            batch = self._pending[:BATCH_MAX_SIZE]
+            del self._pending[:BATCH_MAX_SIZE]
+            try:
+                await self._generate_batch(batch)
+            except Exception as e:
+                logger.warning(f"[TitleService] Deferred title batch failed: {e}")
+
+    async def _generate_batch(self, batch: list[tuple[str, str, str, str]]) -> None:
+        lines = "\n".join(f"{i + 1}. {message[:100]}" for i, (_, message, _, _) in enumerate(batch))
+        prompt = (
+            f"为以下 {len(batch)} 条消息分别用5-10个字概括主题。"
+            f"只返回 JSON 字符串数组，顺序与消息一致：\n{lines}"
+        )
+        response = await self.router.ainvoke(prompt, hedge=False)
+        content = str(response.content)
+        start, end = content.find("["), content.rfind("]") + 1
+        titles = json.loads(content[start:end]) if start >= 0 and end > start else []
+        await asyncio.to_thread(self._apply_batch, batch, titles)
+        logger.info(f"[TitleService] Deferred titles generated: {min(len(titles), len(batch))}/{len(batch)}")
+
+    def _apply_batch(self, batch: list[tuple[str, str, str, str]], titles: list) -> None:
+        """写入缓存，并替换仍为临时标题的会话标题（用户已改名的不覆盖）"""
+        with SessionLocal() as db:
+            for (thread_id, _, provisional, key), raw in zip(batch, titles):
+                title = _clean_title(str(raw))
+                self._remember(key, title)
+                thread = db.query(Thread).filter(Thread.thread_id == thread_id).first()
+                if thread and thread.title == provisional:
+                    thread.title = title
+            db.commit()
@@ -15,6 +15,7 @@ class SSEEvent(StrEnum):
     END = "end"
     TITLE_UPDATED = "title_updated"
     TODOS_UPDATED = "todos_updated"
+    VALIDATION_PROGRESS = "validation/progress"
 
 
 class InterruptAction(StrEnum):
@@ -33,6 +34,7 @@ class InternalEventType(StrEnum):
     DONE = "done"
     TITLE_UPDATED = "title_updated"
     TODOS_UPDATED = "todos_updated"
+    VALIDATION_PROGRESS = "validation_progress"
 
 
 TOOL_EXECUTE = "execute"
@@ -55,6 +57,7 @@ INTERNAL_TO_SSE_EVENT: dict[str, str] = {
     InternalEventType.DONE: SSEEvent.END,
     InternalEventType.TITLE_UPDATED: SSEEvent.TITLE_UPDATED,
     InternalEventType.TODOS_UPDATED: SSEEvent.TODOS_UPDATED,
+    InternalEventType.VALIDATION_PROGRESS: SSEEvent.VALIDATION_PROGRESS,
 }
 
 
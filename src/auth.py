@@ -1,4 +1,14 @@
-"""Authentication utilities for JWT and password hashing."""
+"""Authentication utilities for JWT and password hashing.
+
+argon2 哈希是 CPU 密集操作，异步接口通过有界进程池执行，不阻塞事件循环；
+哈希参数（cost）可配置，参数变化后在登录成功时透明重新哈希。
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -8,6 +18,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from src.config import settings
+from src.utils.ttl_cache import TTLCache
 
 # JWT configuration from settings
 SECRET_KEY = settings.SECRET_KEY
@@ -15,7 +26,13 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = settings.ACCESS_TOKEN_EXPIRE_HOURS
 
 # Password hashing context - use argon2 instead of bcrypt to avoid 72 byte limit
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.PASSWORD_HASH_TIME_COST,
+    argon2__memory_cost=settings.PASSWORD_HASH_MEMORY_COST,
+    argon2__parallelism=settings.PASSWORD_HASH_PARALLELISM,
+)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -33,6 +50,109 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password[:72])
 
 
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """校验密码；哈希参数已过期时返回新哈希"""
+    return pwd_context.verify_and_update(plain_password[:72], hashed_password)
+
+
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = threading.Lock()
+_hash_slots: asyncio.Semaphore | None = None
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        return _hash_pool
+
+
+async def _run_in_hash_pool(func, *args):
+    """在进程池中执行哈希；排队数量有上限，超出的请求在事件循环上等待"""
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS * 2)
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_get_hash_pool(), func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify a password without blocking the event loop.
+    
+    Returns:
+        (verified, new_hash)；new_hash 非空表示哈希参数已变化，应回写数据库
+    """
+    return await _run_in_hash_pool(_verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+
+class LoginThrottle:
+    """登录失败限流：按用户名与 IP 统计滑动窗口内的失败次数
+    
+    超过阈值后直接拒绝，不再执行哈希校验，防止暴力破解消耗 CPU。
+    注册请求每次都要哈希，按 IP 单独计数限流。
+    """
+
+    def __init__(self):
+        self._failures = TTLCache(maxsize=100_000, ttl=settings.LOGIN_FAILURE_WINDOW_SECONDS)
+
+    def _recent(self, key: tuple) -> list[float]:
+        cutoff = time.monotonic() - settings.LOGIN_FAILURE_WINDOW_SECONDS
+        return [t for t in self._failures.get(key, []) if t > cutoff]
+
+    def retry_after(self, username: str, ip: str | None) -> int:
+        """被限流时返回需等待的秒数，否则返回 0"""
+        limits = [(("user", username), settings.LOGIN_MAX_FAILURES_PER_USER)]
+        if ip:
+            limits.append((("ip", ip), settings.LOGIN_MAX_FAILURES_PER_IP))
+        return self._wait(limits)
+
+    def register_retry_after(self, ip: str | None) -> int:
+        """注册限流：按 IP 统计窗口内的注册请求，被限流时返回需等待的秒数"""
+        if not ip:
+            return 0
+        return self._wait([(("register", ip), settings.REGISTER_MAX_PER_IP)])
+
+    def record_register(self, ip: str | None):
+        if ip:
+            key = ("register", ip)
+            self._failures.set(key, self._recent(key) + [time.monotonic()])
+
+    def _wait(self, limits: list[tuple[tuple, int]]) -> int:
+        wait = 0.0
+        for key, limit in limits:
+            recent = self._recent(key)
+            if len(recent) >= limit:
+                oldest = recent[-limit]
+                wait = max(wait, oldest + settings.LOGIN_FAILURE_WINDOW_SECONDS - time.monotonic())
+        return int(wait) + 1 if wait > 0 else 0
+
+    def record_failure(self, username: str, ip: str | None):
+        now = time.monotonic()
+        keys = [("user", username)] + ([("ip", ip)] if ip else [])
+        for key in keys:
+            self._failures.set(key, self._recent(key) + [now])
+
+    def reset(self, username: str):
+        self._failures.pop(("user", username))
+
+
+login_throttle = LoginThrottle()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -45,21 +165,102 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
-    """Get current user from JWT token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+# 已验证 token 缓存：key 为 token 的 sha256，条目在 token 的 exp 时过期
+_token_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> Optional[str]:
+    """Verify a JWT and return its subject (user_id), or None if invalid."""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    user_id = _token_cache.get(key)
+    if user_id is not None:
+        return user_id
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        return user_id
     except JWTError:
-        raise credentials_exception
+        return None
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp else ACCESS_TOKEN_EXPIRE_HOURS * 3600
+    if ttl > 0:
+        _token_cache.set(key, user_id, ttl=ttl)
+    return user_id
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
+    """Get current user from JWT token."""
+    user_id = decode_access_token(token)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+@dataclass(frozen=True)
+class Principal:
+    """已认证用户的身份与角色"""
+    user_id: str
+    username: str
+    is_admin: bool
+
+
+# 用户/角色缓存：短 TTL；修改角色时 invalidate_principal 经 ClusterEvents 通知所有 worker 立即失效
+_principal_cache = TTLCache(maxsize=settings.AUTH_PRINCIPAL_CACHE_SIZE, ttl=settings.AUTH_PRINCIPAL_CACHE_TTL)
+_MISSING = Principal(user_id="", username="", is_admin=False)
+PRINCIPAL_CHANNEL = "principal_invalidation"
+_principal_subscribed = False
+_principal_lock = threading.Lock()
+
+
+def _drop_principal(payload: dict):
+    """ClusterEvents 回调（可能在监听线程中调用）"""
+    user_id = payload.get("user_id")
+    if user_id is None:
+        _principal_cache.clear()
+    else:
+        _principal_cache.pop(user_id)
+
+
+def _subscribe_invalidations():
+    global _principal_subscribed
+    if _principal_subscribed:
+        return
+    with _principal_lock:
+        if not _principal_subscribed:
+            from src.coordination import get_cluster_events
+
+            get_cluster_events().subscribe(PRINCIPAL_CHANNEL, _drop_principal)
+            _principal_subscribed = True
+
+
+def get_principal(user_id: str) -> Optional[Principal]:
+    """Load a user's principal, cached for AUTH_PRINCIPAL_CACHE_TTL seconds."""
+    principal = _principal_cache.get(user_id)
+    if principal is None:
+        from src.database import SessionLocal, User
+
+        _subscribe_invalidations()
+
+        with SessionLocal() as db:
+            user = db.query(User.user_id, User.username, User.is_admin).filter(User.user_id == user_id).first()
+        principal = Principal(user.user_id, user.username, bool(user.is_admin)) if user else _MISSING
+        _principal_cache.set(user_id, principal)
+    return None if principal is _MISSING else principal
+
+
+def invalidate_principal(user_id: str | None = None):
+    """Drop a cached principal (all principals when user_id is None) on every worker."""
+    from src.coordination import get_cluster_events
+
+    _subscribe_invalidations()
+    get_cluster_events().publish(PRINCIPAL_CHANNEL, {"user_id": user_id})
 
 
 def verify_thread_permission(user_id: str, thread_id: str) -> None:
@@ -1,10 +1,13 @@
 """Chunk upload manager for large file uploads."""
 import json
 import shutil
+import time
 import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from src.utils.metrics import CHUNK_UPLOAD_BYTES, CHUNK_UPLOAD_SECONDS, CHUNK_UPLOAD_THROUGHPUT
+
 
 class ChunkUploadManager:
     """Manager for chunked file uploads.
@@ -65,6 +68,7 @@ class ChunkUploadManager:
         Raises:
             ValueError: If upload_id not found
         """
+        start = time.perf_counter()
         meta = self._load_meta(upload_id)
         
         if chunk_index < 0 or chunk_index >= meta["total_chunks"]:
@@ -77,6 +81,8 @@ class ChunkUploadManager:
             meta["received"].append(chunk_index)
             self._save_meta(upload_id, meta)
         
+        CHUNK_UPLOAD_BYTES.inc(len(data))
+        CHUNK_UPLOAD_SECONDS.observe(time.perf_counter() - start)
         return True
     
     def get_progress(self, upload_id: str) -> dict:
@@ -133,6 +139,10 @@ class ChunkUploadManager:
                 chunk_path = self.upload_dir / upload_id / f"chunk_{i}"
                 outfile.write(chunk_path.read_bytes())
         
+        elapsed = (datetime.now() - datetime.fromisoformat(meta["created_at"])).total_seconds()
+        if elapsed > 0:
+            CHUNK_UPLOAD_THROUGHPUT.observe(meta["total_size"] / elapsed)
+        
         self.cancel(upload_id)
         
         return target
@@ -1,8 +1,8 @@
 """Configuration settings for the backend application."""
+import threading
 from pathlib import Path
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from langchain_openai import ChatOpenAI
 
 from src.utils.get_root_path import get_project_root
 
@@ -31,13 +31,36 @@ class Settings(BaseSettings):
 
     # 数据库配置
     DATABASE_URL: str
+    RUN_MIGRATIONS_ON_STARTUP: bool = False  # 启动时执行建表/补列与 checkpoint 迁移；默认由部署步骤执行 python main.py migrate
 
     # JWT配置
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_HOURS: int
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # 已验证 token 缓存条目数（缓存至 token 过期）
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 10000  # 用户/角色缓存条目数
+    AUTH_PRINCIPAL_CACHE_TTL: float = 30  # 用户/角色缓存时间（秒），跨进程修改角色在此时间内生效
+
+    # 密码哈希配置（修改 cost 后，旧哈希在用户下次登录时自动升级）
+    PASSWORD_HASH_WORKERS: int = 2  # 哈希进程池大小
+    PASSWORD_HASH_TIME_COST: int = 3  # argon2 迭代次数
+    PASSWORD_HASH_MEMORY_COST: int = 65536  # argon2 内存（KiB）
+    PASSWORD_HASH_PARALLELISM: int = 4  # argon2 并行度
+
+    # 登录限流配置
+    LOGIN_FAILURE_WINDOW_SECONDS: int = 300  # 失败计数窗口（秒）
+    LOGIN_MAX_FAILURES_PER_USER: int = 5  # 窗口内单用户名最大失败次数
+    LOGIN_MAX_FAILURES_PER_IP: int = 20  # 窗口内单 IP 最大失败次数
+    REGISTER_MAX_PER_IP: int = 10  # 窗口内单 IP 最大注册请求数（每次注册都会执行一次哈希）
 
     PORT: int
 
+    # 日志配置
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_LEVEL: str = "INFO"  # 默认级别
+    LOG_LEVELS: dict[str, str] = {}  # 按模块覆盖级别，如 {"workspace-sync": "DEBUG"}，运行时可经管理接口调整
+    LOG_SAMPLE_EVERY: int = 100  # 逐文件等高频日志每 N 条保留 1 条
+    TRACE_BUFFER_SIZE: int = 500  # 进程内保留最近多少次运行的耗时追踪（/api/runs/{run_id}/timing）
+
     OPENAI_API_BASE_8001: str
     OPENAI_API_BASE_8002: str
 
@@ -49,16 +72,64 @@ class Settings(BaseSettings):
     SKILL_IMAGE_VERSIONS_TO_KEEP: int = 5
     SKILL_PENDING_DIR: str = ""  # 待验证 skill 目录，默认为 {WORKSPACE_ROOT}/skills_pending
     SKILL_APPROVED_DIR: str = ""  # 已入库 skill 目录，默认为 {SHARED_DIR}/skills
+    SKILL_UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024  # 上传压缩包大小上限
+    SKILL_ARCHIVE_MAX_UNCOMPRESSED_BYTES: int = 200 * 1024 * 1024  # 解压后总大小上限
+    SKILL_ARCHIVE_MAX_ENTRIES: int = 2000  # 压缩包条目数上限
+    SKILL_ARCHIVE_MAX_RATIO: int = 100  # 单条目最大压缩比
+    SKILL_RETRIEVAL_TOP_K: int = 3  # 每轮对话注入的相关 Skill 数量，0 表示关闭
+    SKILL_RETRIEVAL_MIN_SCORE: float = 1.0  # BM25 最低得分，低于此值不注入
+
+    # 沙箱后端配置
+    SANDBOX_PROVIDER: str = "daytona"  # daytona | local（本地目录 + subprocess，用于本机性能分析与回归测试）
+    LOCAL_SANDBOX_ROOT: str = ""  # local 后端根目录，默认为 {WORKSPACE_ROOT}/.sandboxes
+    LOCAL_SANDBOX_LATENCY: float = 0  # local 后端每次操作注入的延迟（秒）
+    LOCAL_SANDBOX_FAILURE_RATE: float = 0  # local 后端每次操作注入的失败概率（0~1）
+    LOCAL_SANDBOX_SEED: int | None = None  # 故障注入随机种子，便于复现
 
     # Daytona 配置
     DAYTONA_API_KEY: str = ""
     DAYTONA_API_URL: str = "http://localhost:3000/api"
     DAYTONA_AUTO_STOP_INTERVAL: int = 15  # 分钟
     DAYTONA_SKILLS_SNAPSHOT_ID: str = ""  # 全局 Skills 快照 ID
+    SNAPSHOT_BUILD_DEBOUNCE_SECONDS: float = 10  # 快照重建请求合并窗口（秒）
+    SNAPSHOT_POINTER_CACHE_TTL: float = 5  # 当前快照指针缓存时间（秒），多 worker 在此时间内收敛
+    SANDBOX_HANDLE_CACHE_TTL: float = 300  # 按 thread 缓存沙箱句柄的时间（秒），0 关闭
+
+    # 线程亲和（多节点部署时同一 thread 固定由一个 worker 处理，提升进程内缓存命中率）
+    THREAD_AFFINITY_ENABLED: bool = False
+    WORKER_ADVERTISE_URL: str = ""  # 其他 worker 访问本 worker 的地址，如 http://10.0.0.5:8000（每个 worker 唯一）
+    THREAD_AFFINITY_MODE: str = "proxy"  # proxy：非属主转发请求 | redirect：307 重定向到属主
+    WORKER_HEARTBEAT_INTERVAL: float = 5  # 成员心跳间隔（秒）
+    WORKER_TTL_SECONDS: float = 20  # 超过该时间未心跳的 worker 移出哈希环
+    HASH_RING_VNODES: int = 128  # 每个 worker 的虚拟节点数
     
     # 文件同步配置
     SYNC_POLL_INTERVAL: int = 5  # 轮询间隔（秒）
 
+    # 验证任务队列配置
+    JOB_QUEUE_GLOBAL_CONCURRENCY: int = 5  # 所有 worker 合计同时运行的任务上限
+    JOB_QUEUE_WORKER_SLOTS: int = 2  # 单进程同时执行的任务数
+    JOB_QUEUE_POLL_INTERVAL: float = 2  # 空闲轮询间隔（秒）
+    JOB_QUEUE_LEASE_SECONDS: int = 120  # 租约时长，超时未续约视为 worker 崩溃
+    JOB_QUEUE_MAX_ATTEMPTS: int = 3  # 最大尝试次数（含首次）
+    VALIDATION_SANDBOX_CONCURRENCY: int = 5  # 全量测试时所有 worker 合计同时运行的验证沙箱数
+
+    # LLM 网关配置
+    LLM_MAX_CONNECTIONS: int = 50  # 单 provider 最大连接数
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_TIMEOUT: float = 300  # 单次请求超时（秒）
+    LLM_MAX_CONCURRENCY: int = 8  # 单模型默认最大并发
+    LLM_MODEL_CONCURRENCY: dict[str, int] = {}  # 按模型覆盖并发，如 {"glm-5": 4}
+    LLM_RATE_LIMIT_PER_SECOND: float = 5  # 单模型请求速率，0 表示不限速
+    LLM_RATE_LIMIT_BURST: int = 10
+    LLM_MAX_RETRIES: int = 3  # 429/5xx/超时重试次数（指数退避 + 抖动）
+
+    # LLM 路由配置（非 Agent 调用的故障转移/对冲）
+    LLM_ROUTER_HEDGE_DELAY: float = 3.0  # 主模型多久未返回时对冲到备用模型（秒）
+    LLM_ROUTER_TIMEOUT: float = 120.0  # 单个候选模型的最长等待（秒）
+    LLM_ROUTER_ERROR_THRESHOLD: float = 0.5  # 滚动错误率超过该值视为降级
+    LLM_ROUTER_MAX_P95_MS: float = 30000  # 滚动 p95 超过该值视为降级
+
     @field_validator("IS_LANGFUSE", mode="before")
     def parse_is_langfuse(cls, v):
         return int(v)
@@ -73,53 +144,80 @@ def _resolve_path(path_str: str) -> str:
 # Global settings instance
 settings = Settings()
 
-# Create LLM instance using settings
-llm_glm_4_7 = ChatOpenAI(
-    model="glm-4.7",
-    temperature=0,
-    openai_api_key=settings.ZHIPUAI_API_KEY,
-    openai_api_base=settings.ZHIPUAI_API_BASE,
-    extra_body={
-        "response_format": {"type": "text"},
-        "thinking": {"type": "enabled"}
-    }
-)
-
-llm_glm_5 = ChatOpenAI(
-    model="glm-5",
-    temperature=0,
-    openai_api_key=settings.ZHIPUAI_API_KEY,
-    openai_api_base=settings.ZHIPUAI_API_BASE,
-    extra_body={
-        "response_format": {"type": "text"},
-        "thinking": {"type": "enabled"}
-    }
-)
-
-llm_qwen3_vl_30b_a3b_instruct = ChatOpenAI(
-    model="Qwen3-VL-30B-A3B-Instruct",
-    base_url=settings.OPENAI_API_BASE_8001,
-    api_key="EMPTY",   # vllm不校验
-    temperature=0.7,
-    max_tokens=1024,
-)
-
-
-llm_minimax_m2_1 = ChatOpenAI(
-    model="MiniMax-M2.1",
-    base_url=settings.OPENAI_API_BASE_8002,
-    api_key="EMPTY",   # vllm不校验
-    temperature=0.7,
-    max_tokens=1024,
-)
-
-llm_modelscope_qwen3_vl_30b_a3b_instruct = ChatOpenAI(
-    model="Qwen/Qwen3-VL-30B-A3B-Instruct",
-    base_url=settings.MODELSCOPE_URL,
-    api_key=settings.MODELSCOPE_SDK_TOKEN,
-    temperature=0.7,
-    max_tokens=1024,
-)
-
-big_llm = llm_glm_5
-flash_llm = llm_modelscope_qwen3_vl_30b_a3b_instruct
+# LLM 客户端与路由在首次访问时创建（PEP 562 模块 __getattr__），
+# 导入 settings 不再加载 langchain_openai / openai，也不创建 HTTP 客户端
+def _zhipu_model(model: str):
+    return dict(
+        model=model,
+        base_url=settings.ZHIPUAI_API_BASE,
+        api_key=settings.ZHIPUAI_API_KEY,
+        temperature=0,
+        extra_body={
+            "response_format": {"type": "text"},
+            "thinking": {"type": "enabled"}
+        }
+    )
+
+
+_MODEL_SPECS = {
+    "llm_glm_4_7": lambda: _zhipu_model("glm-4.7"),
+    "llm_glm_5": lambda: _zhipu_model("glm-5"),
+    "llm_qwen3_vl_30b_a3b_instruct": lambda: dict(
+        model="Qwen3-VL-30B-A3B-Instruct",
+        base_url=settings.OPENAI_API_BASE_8001,
+        api_key="EMPTY",   # vllm不校验
+        temperature=0.7,
+        max_tokens=1024,
+    ),
+    "llm_minimax_m2_1": lambda: dict(
+        model="MiniMax-M2.1",
+        base_url=settings.OPENAI_API_BASE_8002,
+        api_key="EMPTY",   # vllm不校验
+        temperature=0.7,
+        max_tokens=1024,
+    ),
+    "llm_modelscope_qwen3_vl_30b_a3b_instruct": lambda: dict(
+        model="Qwen/Qwen3-VL-30B-A3B-Instruct",
+        base_url=settings.MODELSCOPE_URL,
+        api_key=settings.MODELSCOPE_SDK_TOKEN,
+        temperature=0.7,
+        max_tokens=1024,
+    ),
+}
+
+_MODEL_ALIASES = {
+    "big_llm": "llm_glm_5",
+    "flash_llm": "llm_modelscope_qwen3_vl_30b_a3b_instruct",
+}
+
+# 非 Agent 调用走路由，主模型降级时切换到 vLLM 备用端点
+_ROUTER_SPECS = {
+    "big_router": ("big", ["llm_glm_5", "llm_glm_4_7", "llm_minimax_m2_1"]),
+    "flash_router": ("flash", ["flash_llm", "llm_qwen3_vl_30b_a3b_instruct", "llm_minimax_m2_1"]),
+}
+
+_lazy_lock = threading.RLock()
+
+
+def __getattr__(name: str):
+    if name not in _MODEL_SPECS and name not in _MODEL_ALIASES and name not in _ROUTER_SPECS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with _lazy_lock:
+        # 并发首次访问时只创建一次；赋值到模块全局后不再经过 __getattr__
+        if name in globals():
+            return globals()[name]
+        if name in _MODEL_ALIASES:
+            value = __getattr__(_MODEL_ALIASES[name])
+        elif name in _ROUTER_SPECS:
+            # llm_gateway / llm_router 会回读 settings，需在 settings 创建之后导入
+            from src.llm_router import LLMRouter
+
+            router_name, members = _ROUTER_SPECS[name]
+            value = LLMRouter(router_name, [__getattr__(member) for member in members])
+        else:
+            from src.llm_gateway import create_chat_model
+
+            value = create_chat_model(**_MODEL_SPECS[name]())
+        globals()[name] = value
+        return value
@@ -0,0 +1,290 @@
+"""多 worker / 多节点协调（Postgres advisory lock + LISTEN/NOTIFY）
+
+- ClusterLocks：会话级 advisory lock，持有于本进程的一条专用连接；进程退出或连接断开时
+  由 Postgres 自动释放，其他 worker 下次尝试即可接手（用于"每用户一个轮询器"、快照构建者）
+- ClusterSemaphore：N 个槽位锁组成的集群级信号量（验证沙箱并发）
+- cluster_mutex：事务级 advisory lock，with 块内跨 worker 串行执行（如按 thread 创建沙箱）
+- ClusterEvents：经单一 NOTIFY 通道广播 {channel, payload}，本进程发布的消息直接本地分发
+
+锁以进程为持有者：同一进程重复 try_acquire 同一把锁视为已持有。
+非 Postgres（本地 sqlite 开发）时全部退化为进程内实现，单进程部署语义不变。
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator
+
+from sqlalchemy import text
+
+from src.database import SessionLocal, engine
+from src.utils.get_logger import get_logger
+
+logger = get_logger("coordination")
+
+NOTIFY_CHANNEL = "agent_cluster"
+NOTIFY_MAX_BYTES = 7900  # Postgres NOTIFY 负载上限 8000 字节
+LOCK_CHECK_INTERVAL = 5  # 复用已持有的锁前，最多每隔这么久确认一次连接存活（秒）
+LISTEN_RECONNECT_DELAY = 5
+LOCAL_MUTEX_STRIPES = 64
+
+EventHandler = Callable[[dict], None]
+
+
+def is_clustered() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def _conninfo() -> str:
+    """SQLAlchemy URL → libpq 连接串（psycopg 直连用）"""
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def lock_key(namespace: str, name: str = "") -> int:
+    """advisory lock 键（有符号 64 位）"""
+    digest = hashlib.blake2b(f"{namespace}:{name}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+# ---------------------------------------------------------------- 会话级锁
+
+class ClusterLocks:
+    """本进程持有的会话级 advisory lock"""
+
+    def __init__(self, conninfo: str | None):
+        self._conninfo = conninfo
+        self._conn = None
+        self._held: set[int] = set()
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+
+    def _connection(self):
+        """返回存活的专用连接；连接失效时重连，原有锁已被 Postgres 释放"""
+        if self._conn is not None and not self._conn.closed:
+            if time.monotonic() - self._checked_at < LOCK_CHECK_INTERVAL:
+                return self._conn
+            try:
+                self._conn.execute("SELECT 1")
+                self._checked_at = time.monotonic()
+                return self._conn
+            except Exception as e:
+                logger.warning(f"[ClusterLocks] Lock connection lost, {len(self._held)} locks released: {e}")
+                self._conn.close()
+
+        import psycopg
+
+        self._held.clear()
+        self._conn = psycopg.connect(self._conninfo, autocommit=True)
+        self._checked_at = time.monotonic()
+        return self._conn
+
+    def try_acquire(self, key: int) -> bool:
+        """非阻塞获取，已由本进程持有时直接返回 True"""
+        with self._lock:
+            if self._conninfo is None:
+                self._held.add(key)
+                return True
+            conn = self._connection()
+            if key in self._held:
+                return True
+            acquired = conn.execute("SELECT pg_try_advisory_lock(%s)", (key,)).fetchone()[0]
+            if acquired:
+                self._held.add(key)
+            return bool(acquired)
+
+    def release(self, key: int):
+        with self._lock:
+            if key not in self._held:
+                return
+            self._held.discard(key)
+            if self._conninfo is None or self._conn is None or self._conn.closed:
+                return
+            try:
+                self._conn.execute("SELECT pg_advisory_unlock(%s)", (key,))
+            except Exception as e:
+                logger.warning(f"[ClusterLocks] Unlock failed: {e}")
+
+    def holds(self, key: int) -> bool:
+        return key in self._held
+
+    def close(self):
+        with self._lock:
+            self._held.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ClusterSemaphore:
+    """集群级信号量：limit 个槽位锁，本进程内的协程各占不同槽位"""
+
+    def __init__(self, name: str, limit: int, poll_interval: float = 1.0):
+        self.name = name
+        self.limit = max(1, limit)
+        self.poll_interval = poll_interval
+        self._keys = [lock_key(f"semaphore:{name}", str(slot)) for slot in range(self.limit)]
+        self._taken: set[int] = set()
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> int | None:
+        locks = get_cluster_locks()
+        with self._lock:
+            for key in self._keys:
+                if key not in self._taken and locks.try_acquire(key):
+                    self._taken.add(key)
+                    return key
+        return None
+
+    def _give_back(self, key: int):
+        with self._lock:
+            get_cluster_locks().release(key)
+            self._taken.discard(key)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """等待空闲槽位，with 块结束后归还"""
+        while True:
+            key = await asyncio.to_thread(self._try_take)
+            if key is not None:
+                break
+            await asyncio.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self._give_back, key)
+
+
+# ---------------------------------------------------------------- 事务级互斥
+
+_local_mutexes = [threading.Lock() for _ in range(LOCAL_MUTEX_STRIPES)]
+
+
+@contextmanager
+def cluster_mutex(key: int) -> Iterator[None]:
+    """with 块内持有事务级 advisory lock（阻塞等待），块结束随事务释放"""
+    if not is_clustered():
+        with _local_mutexes[key % LOCAL_MUTEX_STRIPES]:
+            yield
+        return
+
+    with SessionLocal() as db:
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": key})
+        try:
+            yield
+        finally:
+            db.rollback()
+
+
+# ---------------------------------------------------------------- 广播
+
+class ClusterEvents:
+    """跨进程事件广播（处理函数在监听线程中调用，需自行保证线程安全）"""
+
+    def __init__(self, conninfo: str | None):
+        self._conninfo = conninfo
+        self._origin = uuid.uuid4().hex
+        self._handlers: dict[str, list[EventHandler]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cluster-notify")
+
+    def subscribe(self, channel: str, handler: EventHandler):
+        with self._lock:
+            self._handlers[channel].append(handler)
+            if self._conninfo and self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name="cluster-events", daemon=True)
+                self._thread.start()
+
+    def publish(self, channel: str, payload: dict):
+        """本地立即分发，并通知其他进程"""
+        self._dispatch(channel, payload)
+        if not self._conninfo or self._stopping.is_set():
+            return
+        message = json.dumps({"o": self._origin, "c": channel, "p": payload}, ensure_ascii=False, default=str)
+        if len(message.encode("utf-8")) > NOTIFY_MAX_BYTES:
+            logger.warning(f"[ClusterEvents] Payload too large for NOTIFY, channel={channel}")
+            return
+        # 单线程发送：不阻塞事件循环，且保持发布顺序
+        self._sender.submit(self._notify, channel, message)
+
+    def _notify(self, channel: str, message: str):
+        try:
+            with SessionLocal() as db:
+                db.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": NOTIFY_CHANNEL, "message": message})
+                db.commit()
+        except Exception as e:
+            logger.warning(f"[ClusterEvents] Notify failed on {channel}: {e}")
+
+    def _dispatch(self, channel: str, payload: dict):
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.warning(f"[ClusterEvents] Handler failed on {channel}: {e}")
+
+    def _listen(self):
+        import psycopg
+
+        while not self._stopping.is_set():
+            try:
+                with psycopg.connect(self._conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    logger.info(f"[ClusterEvents] Listening on {NOTIFY_CHANNEL}")
+                    while not self._stopping.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._on_notify(notify.payload)
+            except Exception as e:
+                logger.warning(f"[ClusterEvents] Listener disconnected, retry in {LISTEN_RECONNECT_DELAY}s: {e}")
+                self._stopping.wait(LISTEN_RECONNECT_DELAY)
+
+    def _on_notify(self, raw: str):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+        if message.get("o") == self._origin:
+            return
+        self._dispatch(message.get("c", ""), message.get("p") or {})
+
+    def close(self):
+        self._stopping.set()
+        self._sender.shutdown(wait=True)
+
+
+_locks: ClusterLocks | None = None
+_events: ClusterEvents | None = None
+_init_lock = threading.Lock()
+
+
+def get_cluster_locks() -> ClusterLocks:
+    global _locks
+    if _locks is None:
+        with _init_lock:
+            if _locks is None:
+                _locks = ClusterLocks(_conninfo() if is_clustered() else None)
+    return _locks
+
+
+def get_cluster_events() -> ClusterEvents:
+    global _events
+    if _events is None:
+        with _init_lock:
+            if _events is None:
+                _events = ClusterEvents(_conninfo() if is_clustered() else None)
+    return _events
+
+
+def shutdown_coordination():
+    """释放本进程持有的锁并停止监听（其他 worker 随即可以接手）"""
+    if _events is not None:
+        _events.close()
+    if _locks is not None:
+        _locks.close()
@@ -1,5 +1,5 @@
 """Database connection and models."""
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Integer, Float, Text, JSON, ForeignKey, func
+from sqlalchemy import create_engine, inspect, text, Column, String, DateTime, Boolean, Integer, Float, Text, JSON, ForeignKey, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -31,6 +31,16 @@ class Thread(Base):
     created_at = Column(DateTime, server_default=func.now())
 
 
+class TitleCache(Base):
+    """Persistent cache of generated session titles keyed by normalized prompt."""
+    __tablename__ = "title_cache"
+
+    prompt_hash = Column(String(64), primary_key=True)
+    title = Column(String(20), nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class Skill(Base):
     """Skill model for skill validation and management."""
     __tablename__ = "skills"
@@ -87,6 +97,11 @@ class Skill(Base):
     requirements = Column(Text)
 
     runtime_image_version = Column(String(50))
+    content_hash = Column(String(64))
+
+    report_hash = Column(String(64))
+    report_content = Column(Text)
+    report_narrated = Column(Boolean, default=False)
 
     approved_by = Column(String(50), ForeignKey("users.user_id"))
     approved_at = Column(DateTime)
@@ -109,6 +124,78 @@ class ImageVersion(Base):
     created_at = Column(DateTime, server_default=func.now())
     is_current = Column(Boolean, default=False)
     dependencies_snapshot = Column(JSON)
+    snapshot_name = Column(String(100))
+    skills_manifest = Column(JSON)  # {skill_name: content_hash}
+    build_id = Column(String(50))
+
+
+class SnapshotBuild(Base):
+    """Skills snapshot build request and its progress."""
+    __tablename__ = "snapshot_builds"
+
+    build_id = Column(String(50), primary_key=True)
+    status = Column(String(20), default="queued", nullable=False, index=True)
+    reason = Column(String(255))
+    requested_by = Column(String(50))
+    request_count = Column(Integer, default=1)
+    base_snapshot_id = Column(String(100))
+    snapshot_id = Column(String(100))
+    stats = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class ValidationJob(Base):
+    """Persistent background job (skill validation / full test)."""
+    __tablename__ = "validation_jobs"
+
+    job_id = Column(String(50), primary_key=True)
+    job_type = Column(String(30), nullable=False, index=True)
+    payload = Column(JSON)
+    status = Column(String(20), default="queued", nullable=False, index=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, index=True)
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    cancel_requested = Column(Boolean, default=False)
+    progress = Column(Integer, default=0)
+    progress_message = Column(String(255))
+    result = Column(JSON)
+    error = Column(Text)
+    created_by = Column(String(50))
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class ValidationCache(Base):
+    """Validation result cache keyed by skill content, model and prompt version."""
+    __tablename__ = "validation_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    skill_name = Column(String(100))
+    model = Column(String(100))
+    prompt_version = Column(String(20))
+    passed = Column(Boolean, default=False)
+    layer1_report = Column(JSON)
+    scores = Column(JSON)
+    installed_dependencies = Column(JSON)
+    tasks = Column(JSON)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class WorkerMember(Base):
+    """Live API worker registered in the thread-affinity hash ring."""
+    __tablename__ = "worker_members"
+
+    worker_id = Column(String(100), primary_key=True)
+    url = Column(String(255), nullable=False, index=True)
+    started_at = Column(DateTime, server_default=func.now())
+    heartbeat_at = Column(DateTime, index=True)
 
 
 def get_db():
@@ -120,6 +207,53 @@ def get_db():
         db.close()
 
 
+# create_all 不会给已存在的表补列，后续新增的列在此登记
+COLUMN_MIGRATIONS: list[tuple[str, str, str]] = [
+    ("skills", "report_hash", "VARCHAR(64)"),
+    ("skills", "report_content", "TEXT"),
+    ("skills", "report_narrated", "BOOLEAN DEFAULT FALSE"),
+    ("skills", "content_hash", "VARCHAR(64)"),
+    ("image_versions", "snapshot_name", "VARCHAR(100)"),
+    ("image_versions", "skills_manifest", "JSON"),
+    ("image_versions", "build_id", "VARCHAR(50)"),
+]
+
+
+def migrate_columns():
+    """Add registered columns missing from existing tables."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column, ddl in COLUMN_MIGRATIONS:
+            if table not in existing_tables:
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table)}
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
 def create_tables():
     """Create all tables."""
     Base.metadata.create_all(bind=engine)
+    migrate_columns()
+
+
+def pending_migrations() -> list[str]:
+    """List missing tables/columns without changing the schema."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    pending = [f"table {name}" for name in Base.metadata.tables if name not in existing_tables]
+    for table, column, _ in COLUMN_MIGRATIONS:
+        if table in existing_tables and column not in {c["name"] for c in inspector.get_columns(table)}:
+            pending.append(f"column {table}.{column}")
+    return pending
+
+
+async def migrate_checkpoints():
+    """Create/upgrade LangGraph checkpoint tables (Postgres only)."""
+    if not settings.DATABASE_URL.startswith("postgres"):
+        return
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+    async with AsyncPostgresSaver.from_conn_string(settings.DATABASE_URL) as checkpointer:
+        await checkpointer.setup()
@@ -1,11 +1,61 @@
-"""Daytona SDK 封装 + 沙箱管理"""
-from daytona import Daytona, DaytonaConfig, CreateSandboxFromSnapshotParams
-from langchain_daytona import DaytonaSandbox
+"""Daytona SDK 封装 + 沙箱管理（底层后端由 SANDBOX_PROVIDER 选择，见 sandbox_provider）"""
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from daytona import CreateSandboxFromSnapshotParams
 from src.config import settings
+from src.coordination import cluster_mutex, get_cluster_events, lock_key
+from src.sandbox_provider import SandboxProvider, create_sandbox_provider
 from src.utils.get_logger import get_logger
+from src.utils.metrics import DAYTONA_OP_SECONDS, SANDBOX_HANDLE_CACHE
+from src.utils.tracing import trace_span
+from src.utils.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    from langchain_daytona import DaytonaSandbox
 
 logger = get_logger("daytona-client")
 
+SANDBOX_DELETED_CHANNEL = "sandbox_deleted"
+
+
+@contextmanager
+def timed_operation(operation: str):
+    """记录 Daytona 操作耗时（按成功/失败区分），运行中时同时记为 sandbox span"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with trace_span(operation, "sandbox"):
+            yield
+        outcome = "ok"
+    finally:
+        DAYTONA_OP_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome=outcome)
+
+
+@lru_cache(maxsize=1)
+def _metered_sandbox_class():
+    """首次使用时再定义：langchain_daytona 会加载 deepagents，导入耗时数秒"""
+    from langchain_daytona import DaytonaSandbox
+
+    class MeteredDaytonaSandbox(DaytonaSandbox):
+        """记录文件传输耗时的 DaytonaSandbox（异步版本经 to_thread 调用同步方法，同样计入）"""
+
+        def upload_files(self, files):
+            with timed_operation("upload_files"):
+                return super().upload_files(files)
+
+        def download_files(self, paths):
+            with timed_operation("download_files"):
+                return super().download_files(paths)
+
+    return MeteredDaytonaSandbox
+
+
+def metered_sandbox(sandbox) -> "DaytonaSandbox":
+    return _metered_sandbox_class()(sandbox=sandbox)
+
 
 class DaytonaClient:
     """Daytona 客户端单例"""
@@ -14,18 +64,18 @@ class DaytonaClient:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._client = Daytona(DaytonaConfig(
-                api_key=settings.DAYTONA_API_KEY,
-                api_url=settings.DAYTONA_API_URL,
-            ))
-            logger.info("[DaytonaClient] Initialized")
+            cls._instance._client = create_sandbox_provider()
+            # thread_id → 沙箱句柄：省去每次工具调用前的 find_one；开启线程亲和时同一 thread 总命中同一进程
+            cls._instance._handles = TTLCache(maxsize=4096, ttl=settings.SANDBOX_HANDLE_CACHE_TTL)
+            get_cluster_events().subscribe(SANDBOX_DELETED_CHANNEL, cls._instance._on_sandbox_deleted)
+            logger.info(f"[DaytonaClient] Initialized ({settings.SANDBOX_PROVIDER} provider)")
         return cls._instance
     
     @property
-    def client(self) -> Daytona:
+    def client(self) -> SandboxProvider:
         return self._client
     
-    def create_agent_sandbox(self, thread_id: str, user_id: str) -> DaytonaSandbox:
+    def create_agent_sandbox(self, thread_id: str, user_id: str) -> "DaytonaSandbox":
         """基于 Skills 快照创建 Agent 沙箱"""
         from src.snapshot_manager import get_snapshot_manager
         
@@ -47,46 +97,73 @@ class DaytonaClient:
             )
             logger.info("[DaytonaClient] Creating sandbox with default image")
         
-        sandbox = self._client.create(params)
+        with timed_operation("create"):
+            sandbox = self._client.create(params)
         logger.info(f"[DaytonaClient] Created sandbox {sandbox.id}")
         
-        return DaytonaSandbox(sandbox=sandbox)
+        return metered_sandbox(sandbox)
     
     def find_sandbox(self, labels: dict):
         """根据标签查找沙箱"""
         try:
-            return self._client.find_one(labels=labels)
+            with timed_operation("find_one"):
+                return self._client.find_one(labels=labels)
         except Exception as e:
             logger.debug(f"[DaytonaClient] Sandbox not found: {e}")
             return None
     
-    def get_or_create_sandbox(self, thread_id: str, user_id: str) -> DaytonaSandbox:
+    def get_or_create_sandbox(self, thread_id: str, user_id: str) -> "DaytonaSandbox":
         """获取或创建沙箱（支持会话恢复）"""
+        cached = self._handles.get(thread_id)
+        if cached is not None:
+            SANDBOX_HANDLE_CACHE.inc(result="hit")
+            return cached
+        SANDBOX_HANDLE_CACHE.inc(result="miss")
+        
+        sandbox = self._find_or_create_sandbox(thread_id, user_id)
+        if settings.SANDBOX_HANDLE_CACHE_TTL > 0:
+            self._handles.set(thread_id, sandbox)
+        return sandbox
+    
+    def _find_or_create_sandbox(self, thread_id: str, user_id: str) -> "DaytonaSandbox":
         existing = self.find_sandbox({"thread_id": thread_id, "type": "agent","user_id": user_id})
         
         if existing:
             logger.info(f"[DaytonaClient] Reusing existing sandbox {existing.id}")
-            return DaytonaSandbox(sandbox=existing)
+            return metered_sandbox(existing)
         
-        daytona_sandbox = self.create_agent_sandbox(thread_id, user_id)
-        
-        self._initial_sync(user_id, daytona_sandbox)
+        # 同一 thread 的并发请求可能落在不同 worker，创建过程按 thread 串行，拿到锁后再查一次
+        with cluster_mutex(lock_key("sandbox", thread_id)):
+            existing = self.find_sandbox({"thread_id": thread_id, "type": "agent","user_id": user_id})
+            if existing:
+                logger.info(f"[DaytonaClient] Reusing sandbox {existing.id} created concurrently")
+                return metered_sandbox(existing)
+            
+            daytona_sandbox = self.create_agent_sandbox(thread_id, user_id)
+            
+            self._initial_sync(user_id, daytona_sandbox)
         
         return daytona_sandbox
     
-    def _initial_sync(self, user_id: str, sandbox: DaytonaSandbox):
+    def _initial_sync(self, user_id: str, sandbox: "DaytonaSandbox"):
         """首次同步用户工作空间到沙箱"""
         from src.workspace_sync import get_sync_service
         sync_service = get_sync_service()
-        sync_service.initial_sync_to_sandbox(user_id, sandbox)
+        with trace_span("initial_sync", "sync"):
+            sync_service.initial_sync_to_sandbox(user_id, sandbox)
     
-    def delete_sandbox(self, sandbox_id: str):
-        """删除沙箱"""
+    def delete_sandbox(self, sandbox_id: str, thread_id: str | None = None):
+        """删除沙箱（传入 thread_id 时同时让所有 worker 丢弃该 thread 的句柄缓存）"""
         try:
             self._client.delete(sandbox_id)
             logger.info(f"[DaytonaClient] Deleted sandbox {sandbox_id}")
         except Exception as e:
             logger.warning(f"[DaytonaClient] Failed to delete sandbox: {e}")
+        if thread_id:
+            get_cluster_events().publish(SANDBOX_DELETED_CHANNEL, {"thread_id": thread_id})
+    
+    def _on_sandbox_deleted(self, payload: dict):
+        self._handles.pop(payload.get("thread_id"))
 
 
 def get_daytona_client() -> DaytonaClient:
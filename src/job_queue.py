@@ -0,0 +1,373 @@
+"""持久化后台任务队列（validation_jobs 表）
+
+- 入队即落库，进程重启不丢任务
+- worker 以 SELECT ... FOR UPDATE SKIP LOCKED 领取任务并持有租约，运行期间定期续约；
+  租约过期（worker 崩溃）的任务会被其他 worker 重新放回队列
+- 失败按指数退避 + 抖动重试，超过最大次数后标记失败
+- 全局并发上限：领取时统计所有 worker 上未过期的运行中任务（Postgres 下用事务级 advisory lock 串行化领取）
+- 支持进度上报与取消（排队中直接取消，运行中由心跳发现后中断）
+- 数据库读写均为同步 SQLAlchemy，worker 侧经 asyncio.to_thread 调用，不阻塞事件循环
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.coordination import cluster_mutex, lock_key
+from src.database import SessionLocal, ValidationJob, engine
+from src.utils.get_logger import get_logger
+
+logger = get_logger("job-queue")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+CLAIM_LOCK_KEY = 0x6A6F6271  # "jobq"
+RETRY_BACKOFF_SCALE = 10  # 任务级重试在 LLM 退避基础上放大（秒级 → 十秒级）
+
+
+class JobContext:
+    """传给任务处理函数的上下文"""
+
+    def __init__(self, queue: "JobQueue", job_id: str, job_type: str, payload: dict, attempt: int):
+        self.queue = queue
+        self.job_id = job_id
+        self.job_type = job_type
+        self.payload = payload
+        self.attempt = attempt
+
+    def report(self, progress: int, message: str | None = None):
+        """上报进度（0-100）"""
+        self.queue.update_progress(self.job_id, progress, message)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+
+class JobQueue:
+    """基于数据库的任务队列与本进程 worker"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._handlers: dict[str, JobHandler] = {}
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    def register(self, job_type: str, handler: JobHandler):
+        self._handlers[job_type] = handler
+
+    # ---------------------------------------------------------------- producer API
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: dict,
+        created_by: str | None = None,
+        dedupe_key: str | None = None,
+    ) -> str:
+        """入队，dedupe_key 相同的活跃任务已存在时直接返回其 job_id
+
+        带 dedupe_key 时"查重 + 插入"在按 (job_type, dedupe_key) 的集群互斥锁内执行，
+        并发请求（含其他 worker）不会重复入队。
+        """
+        if not dedupe_key:
+            return self._insert(job_type, payload, created_by, None)
+        with cluster_mutex(lock_key("job-enqueue", f"{job_type}:{dedupe_key}")):
+            with SessionLocal() as db:
+                for job in db.query(ValidationJob).filter(
+                    ValidationJob.job_type == job_type,
+                    ValidationJob.status.in_(ACTIVE_STATUSES),
+                ).all():
+                    if (job.payload or {}).get("dedupe_key") == dedupe_key:
+                        return job.job_id
+            return self._insert(job_type, payload, created_by, dedupe_key)
+
+    def _insert(self, job_type: str, payload: dict, created_by: str | None, dedupe_key: str | None) -> str:
+        with SessionLocal() as db:
+            job = ValidationJob(
+                job_id=str(uuid.uuid4()),
+                job_type=job_type,
+                payload={**payload, "dedupe_key": dedupe_key} if dedupe_key else payload,
+                status=JOB_QUEUED,
+                max_attempts=settings.JOB_QUEUE_MAX_ATTEMPTS,
+                run_after=datetime.utcnow(),
+                created_by=created_by,
+            )
+            db.add(job)
+            db.commit()
+            logger.info(f"[JobQueue] Enqueued {job_type} job={job.job_id[:8]}")
+            return job.job_id
+
+    def cancel(self, job_id: str) -> dict | None:
+        """取消任务：排队中直接取消，运行中标记后由心跳中断"""
+        with SessionLocal() as db:
+            job = db.query(ValidationJob).filter(ValidationJob.job_id == job_id).first()
+            if not job:
+                return None
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finished_at = datetime.utcnow()
+            elif job.status == JOB_RUNNING:
+                job.cancel_requested = True
+            db.commit()
+            result = _job_to_dict(job)
+
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        return result
+
+    def get(self, job_id: str) -> dict | None:
+        with SessionLocal() as db:
+            job = db.query(ValidationJob).filter(ValidationJob.job_id == job_id).first()
+            return _job_to_dict(job) if job else None
+
+    def list(self, status: str | None = None, job_type: str | None = None, limit: int = 50) -> list[dict]:
+        with SessionLocal() as db:
+            query = db.query(ValidationJob)
+            if status:
+                query = query.filter(ValidationJob.status == status)
+            if job_type:
+                query = query.filter(ValidationJob.job_type == job_type)
+            jobs = query.order_by(ValidationJob.created_at.desc()).limit(limit).all()
+            return [_job_to_dict(job) for job in jobs]
+
+    def update_progress(self, job_id: str, progress: int, message: str | None = None):
+        with SessionLocal() as db:
+            db.query(ValidationJob).filter(ValidationJob.job_id == job_id).update({
+                "progress": max(0, min(100, int(progress))),
+                "progress_message": (message or "")[:255],
+            })
+            db.commit()
+
+    # ---------------------------------------------------------------- worker side
+
+    def _claim(self) -> tuple[str, str, dict, int] | None:
+        """领取一个可运行的任务，受全局并发上限约束"""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            if engine.dialect.name == "postgresql":
+                db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CLAIM_LOCK_KEY})
+
+            running = db.query(ValidationJob).filter(
+                ValidationJob.status == JOB_RUNNING,
+                ValidationJob.lease_expires_at > now,
+            ).count()
+            if running >= settings.JOB_QUEUE_GLOBAL_CONCURRENCY:
+                db.rollback()
+                return None
+
+            job = db.query(ValidationJob).filter(
+                ValidationJob.status == JOB_QUEUED,
+                ValidationJob.run_after <= now,
+            ).order_by(ValidationJob.run_after).with_for_update(skip_locked=True).first()
+            if not job:
+                db.rollback()
+                return None
+
+            job.status = JOB_RUNNING
+            job.lease_owner = self.worker_id
+            job.lease_expires_at = now + timedelta(seconds=settings.JOB_QUEUE_LEASE_SECONDS)
+            job.attempts = (job.attempts or 0) + 1
+            job.started_at = job.started_at or now
+            db.commit()
+            return job.job_id, job.job_type, job.payload or {}, job.attempts
+
+    def _renew_lease(self, job_id: str) -> bool:
+        """续约，返回是否被请求取消"""
+        with SessionLocal() as db:
+            job = db.query(ValidationJob).filter(
+                ValidationJob.job_id == job_id,
+                ValidationJob.lease_owner == self.worker_id,
+            ).first()
+            if not job:
+                return True
+            job.lease_expires_at = datetime.utcnow() + timedelta(seconds=settings.JOB_QUEUE_LEASE_SECONDS)
+            db.commit()
+            return bool(job.cancel_requested)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: str | None = None):
+        with SessionLocal() as db:
+            job = db.query(ValidationJob).filter(ValidationJob.job_id == job_id).first()
+            if not job:
+                return
+            job.status = status
+            job.result = result
+            job.error = error
+            job.lease_owner = None
+            job.lease_expires_at = None
+            job.finished_at = datetime.utcnow()
+            if status == JOB_SUCCEEDED:
+                job.progress = 100
+            db.commit()
+
+    def _retry_or_fail(self, job_id: str, error: str):
+        with SessionLocal() as db:
+            job = db.query(ValidationJob).filter(ValidationJob.job_id == job_id).first()
+            if not job:
+                return
+            job.error = error
+            job.lease_owner = None
+            job.lease_expires_at = None
+            if (job.attempts or 0) < (job.max_attempts or 1):
+                # llm_gateway 依赖 openai / langchain_openai，失败重试时才导入
+                from src.llm_gateway import backoff_delay
+
+                delay = backoff_delay(job.attempts) * RETRY_BACKOFF_SCALE
+                job.status = JOB_QUEUED
+                job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning(f"[JobQueue] Job {job_id[:8]} attempt {job.attempts} failed, retry in {delay:.1f}s: {error}")
+            else:
+                job.status = JOB_FAILED
+                job.finished_at = datetime.utcnow()
+                logger.error(f"[JobQueue] Job {job_id[:8]} failed after {job.attempts} attempts: {error}")
+            db.commit()
+
+    def requeue_expired(self) -> int:
+        """回收租约已过期的运行中任务（worker 崩溃），计入尝试次数"""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            expired = db.query(ValidationJob).filter(
+                ValidationJob.status == JOB_RUNNING,
+                ValidationJob.lease_expires_at < now,
+            ).with_for_update(skip_locked=True).all()
+            for job in expired:
+                job.lease_owner = None
+                job.lease_expires_at = None
+                if job.cancel_requested:
+                    job.status = JOB_CANCELLED
+                    job.finished_at = now
+                elif (job.attempts or 0) < (job.max_attempts or 1):
+                    job.status = JOB_QUEUED
+                    job.run_after = now
+                else:
+                    job.status = JOB_FAILED
+                    job.error = "Lease expired"
+                    job.finished_at = now
+            db.commit()
+        if expired:
+            logger.warning(f"[JobQueue] Reclaimed {len(expired)} jobs with expired leases")
+        return len(expired)
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task):
+        interval = max(1.0, settings.JOB_QUEUE_LEASE_SECONDS / 3)
+        while not task.done():
+            await asyncio.sleep(interval)
+            if await asyncio.to_thread(self._renew_lease, job_id):
+                logger.info(f"[JobQueue] Job {job_id[:8]} cancel requested")
+                task.cancel()
+                return
+
+    async def _execute(self, job_id: str, job_type: str, payload: dict, attempt: int):
+        handler = self._handlers.get(job_type)
+        if not handler:
+            await asyncio.to_thread(self._finish, job_id, JOB_FAILED, error=f"No handler for job type: {job_type}")
+            return
+
+        ctx = JobContext(self, job_id, job_type, payload, attempt)
+        task = asyncio.create_task(handler(ctx))
+        self._running[job_id] = task
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+        logger.info(f"[JobQueue] Running {job_type} job={job_id[:8]} attempt={attempt}")
+        try:
+            result = await task
+            await asyncio.to_thread(self._finish, job_id, JOB_SUCCEEDED, result=result)
+        except asyncio.CancelledError:
+            if self._stopping:
+                await asyncio.to_thread(self._release, job_id)
+            else:
+                await asyncio.to_thread(self._finish, job_id, JOB_CANCELLED, error="Cancelled")
+        except Exception as e:
+            await asyncio.to_thread(self._retry_or_fail, job_id, f"{type(e).__name__}: {e}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+
+    def _release(self, job_id: str):
+        """进程退出时归还未完成的任务，不计入尝试次数"""
+        with SessionLocal() as db:
+            job = db.query(ValidationJob).filter(ValidationJob.job_id == job_id).first()
+            if job and job.status == JOB_RUNNING:
+                job.status = JOB_QUEUED
+                job.attempts = max(0, (job.attempts or 1) - 1)
+                job.lease_owner = None
+                job.lease_expires_at = None
+                job.run_after = datetime.utcnow()
+                db.commit()
+
+    async def _worker_loop(self, slot: int):
+        while not self._stopping:
+            try:
+                if slot == 0:
+                    await asyncio.to_thread(self.requeue_expired)
+                claimed = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.error(f"[JobQueue] Claim failed: {e}")
+                claimed = None
+
+            if not claimed:
+                await asyncio.sleep(settings.JOB_QUEUE_POLL_INTERVAL)
+                continue
+
+            await self._execute(*claimed)
+
+    async def start(self):
+        if self._workers:
+            return
+        self._stopping = False
+        self._workers = [
+            asyncio.create_task(self._worker_loop(slot))
+            for slot in range(settings.JOB_QUEUE_WORKER_SLOTS)
+        ]
+        logger.info(f"[JobQueue] Started {len(self._workers)} worker slots as {self.worker_id}")
+
+    async def stop(self):
+        self._stopping = True
+        for task in list(self._running.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("[JobQueue] Stopped")
+
+
+def _job_to_dict(job: ValidationJob) -> dict:
+    return {
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "payload": job.payload,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": job.progress,
+        "progress_message": job.progress_message,
+        "cancel_requested": bool(job.cancel_requested),
+        "result": job.result,
+        "error": job.error,
+        "lease_owner": job.lease_owner,
+        "created_by": job.created_by,
+        "created_at": str(job.created_at) if job.created_at else None,
+        "started_at": str(job.started_at) if job.started_at else None,
+        "finished_at": str(job.finished_at) if job.finished_at else None,
+    }
+
+
+_job_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,310 @@
+"""LLM 网关：共享 HTTP 连接池 + 单模型并发/速率限制 + 抖动重试
+
+所有 ChatOpenAI 实例都通过 `create_chat_model` 构建：
+- 同一 provider（base_url）共享一组调优过的 httpx 连接池
+- 每个模型一个 ModelGate：并发信号量 + 令牌桶限速 + 排队等待统计
+- 可重试错误（429 / 连接错误 / 超时 / 5xx）按指数退避 + 全抖动重试，退避期间释放并发槽
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+from src.utils.get_logger import get_logger
+from src.utils.metrics import LLM_CALL_SECONDS, LLM_QUEUE_WAIT_SECONDS
+
+logger = get_logger("llm-gateway")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+HEALTH_WINDOW = 100  # 滚动窗口内保留的调用样本数
+
+
+class TokenBucket:
+    """令牌桶限速器（rate 个/秒，容量 capacity）"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> float:
+        """尝试取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self._try_take()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class ModelGate:
+    """单模型的并发闸门与排队统计"""
+
+    def __init__(self, name: str, max_concurrency: int, rate_limit: float, rate_burst: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(rate_limit, rate_burst) if rate_limit > 0 else None
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_calls = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.retries = 0
+        self.errors = 0
+        self._samples: deque[tuple[float, bool]] = deque(maxlen=HEALTH_WINDOW)
+
+    def record(self, latency: float, ok: bool):
+        """记录一次调用结果（耗时不含排队）"""
+        self._samples.append((latency, ok))
+        LLM_CALL_SECONDS.observe(latency, model=self.name, outcome="ok" if ok else "error")
+
+    def health(self) -> dict:
+        """滚动窗口内的 p50/p95 耗时与错误率"""
+        if not self._samples:
+            return {"samples": 0, "p50_ms": None, "p95_ms": None, "error_rate": 0.0}
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        failures = sum(1 for _, ok in self._samples if not ok)
+
+        def percentile(q: float) -> float | None:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 1)
+
+        return {
+            "samples": len(self._samples),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "error_rate": round(failures / len(self._samples), 3),
+        }
+
+    @property
+    def saturated(self) -> bool:
+        """并发槽已满或有请求在排队"""
+        return self.waiting > 0 or self.in_flight >= self.max_concurrency
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """占用一个并发槽（含限速），yield 排队等待时间"""
+        start = time.monotonic()
+        self.waiting += 1
+        acquired = False
+        try:
+            await self._semaphore.acquire()
+            acquired = True
+            if self._bucket:
+                await self._bucket.acquire()
+        except BaseException:
+            if acquired:
+                self._semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        wait = time.monotonic() - start
+        self.total_calls += 1
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        LLM_QUEUE_WAIT_SECONDS.observe(wait, model=self.name)
+        if wait > 1:
+            logger.info(f"[LLMGateway] {self.name} queued {wait:.2f}s (in_flight={self.in_flight})")
+
+        self.in_flight += 1
+        try:
+            yield wait
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "total_calls": self.total_calls,
+            "avg_queue_wait_ms": round(self.total_wait_seconds / self.total_calls * 1000, 1) if self.total_calls else 0.0,
+            "max_queue_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            "retries": self.retries,
+            "errors": self.errors,
+            **self.health(),
+        }
+
+
+_gates: dict[str, ModelGate] = {}
+_http_clients: dict[str, tuple[httpx.Client, httpx.AsyncClient]] = {}
+
+
+def get_gate(name: str) -> ModelGate:
+    """获取模型闸门（未注册时按默认配置创建）"""
+    if name not in _gates:
+        from src.config import settings
+        _gates[name] = ModelGate(
+            name,
+            max_concurrency=settings.LLM_MODEL_CONCURRENCY.get(name, settings.LLM_MAX_CONCURRENCY),
+            rate_limit=settings.LLM_RATE_LIMIT_PER_SECOND,
+            rate_burst=settings.LLM_RATE_LIMIT_BURST,
+        )
+    return _gates[name]
+
+
+def get_http_clients(base_url: str) -> tuple[httpx.Client, httpx.AsyncClient]:
+    """同一 provider 共享一组 httpx 连接池"""
+    if base_url not in _http_clients:
+        from src.config import settings
+        limits = httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=30,
+        )
+        timeout = httpx.Timeout(settings.LLM_TIMEOUT, connect=10)
+        _http_clients[base_url] = (
+            httpx.Client(limits=limits, timeout=timeout),
+            httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+        logger.info(f"[LLMGateway] HTTP pool created for {base_url} (max_connections={settings.LLM_MAX_CONNECTIONS})")
+    return _http_clients[base_url]
+
+
+def backoff_delay(attempt: int) -> float:
+    """指数退避 + 全抖动"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+class GatedChatOpenAI(ChatOpenAI):
+    """经过 ModelGate 的 ChatOpenAI
+
+    异步调用（ainvoke / astream，Agent 与验证均走异步）受并发与速率限制；
+    同步调用只做重试，不占用并发槽。
+    """
+
+    gate_name: str = ""
+    gateway_max_retries: int = 3
+
+    @property
+    def gate(self) -> ModelGate:
+        return get_gate(self.gate_name or self.model_name)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        gate = self.gate
+        attempt = 0
+        while True:
+            try:
+                async with gate.slot():
+                    start = time.monotonic()
+                    try:
+                        result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                    except Exception:
+                        gate.record(time.monotonic() - start, ok=False)
+                        raise
+                    gate.record(time.monotonic() - start, ok=True)
+                    return result
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.gateway_max_retries:
+                    gate.errors += 1
+                    raise
+                attempt += 1
+                gate.retries += 1
+                delay = backoff_delay(attempt)
+                logger.warning(f"[LLMGateway] {gate.name} {type(e).__name__}, retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        gate = self.gate
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with gate.slot():
+                    start = time.monotonic()
+                    try:
+                        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                            started = True
+                            yield chunk
+                    except Exception:
+                        gate.record(time.monotonic() - start, ok=False)
+                        raise
+                    gate.record(time.monotonic() - start, ok=True)
+                return
+            except RETRYABLE_ERRORS as e:
+                # 已经向下游输出过 token 时不能重放
+                if started or attempt >= self.gateway_max_retries:
+                    gate.errors += 1
+                    raise
+                attempt += 1
+                gate.retries += 1
+                delay = backoff_delay(attempt)
+                logger.warning(f"[LLMGateway] {gate.name} stream {type(e).__name__}, retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        attempt = 0
+        while True:
+            try:
+                return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except RETRYABLE_ERRORS:
+                if attempt >= self.gateway_max_retries:
+                    self.gate.errors += 1
+                    raise
+                attempt += 1
+                self.gate.retries += 1
+                time.sleep(backoff_delay(attempt))
+
+
+def create_chat_model(model: str, base_url: str, api_key: str, **kwargs: Any) -> GatedChatOpenAI:
+    """构建共享连接池、受网关管控的 ChatOpenAI"""
+    from src.config import settings
+
+    http_client, http_async_client = get_http_clients(base_url)
+    get_gate(model)
+
+    return GatedChatOpenAI(
+        model=model,
+        base_url=base_url,
+        api_key=api_key,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        max_retries=0,
+        gate_name=model,
+        gateway_max_retries=settings.LLM_MAX_RETRIES,
+        **kwargs,
+    )
+
+
+def get_gateway_stats() -> list[dict]:
+    """所有模型闸门的统计信息"""
+    return [gate.stats() for gate in _gates.values()]
+
+
+async def close_http_clients():
+    """关闭所有共享连接池"""
+    for client, async_client in _http_clients.values():
+        client.close()
+        await async_client.aclose()
+    _http_clients.clear()
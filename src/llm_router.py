@@ -0,0 +1,130 @@
+"""LLM 路由：基于滚动延迟/错误率的故障转移与对冲请求
+
+仅用于非 Agent 调用（标题、报告、额外任务生成等一次性请求）。
+Agent 本身绑定固定模型，但其调用同样计入 ModelGate 的健康统计。
+"""
+import asyncio
+from typing import Any
+
+from src.llm_gateway import GatedChatOpenAI
+from src.utils.get_logger import get_logger
+
+logger = get_logger("llm-router")
+
+MIN_HEALTH_SAMPLES = 3
+
+
+class LLMRouter:
+    """按配置顺序 + 健康度排序的模型路由器"""
+
+    def __init__(self, name: str, models: list[GatedChatOpenAI]):
+        self.name = name
+        self.models = models
+
+    def _is_degraded(self, model: GatedChatOpenAI) -> bool:
+        from src.config import settings
+
+        health = model.gate.health()
+        if health["samples"] < MIN_HEALTH_SAMPLES:
+            return False
+        if health["error_rate"] >= settings.LLM_ROUTER_ERROR_THRESHOLD:
+            return True
+        p95 = health["p95_ms"]
+        return p95 is not None and p95 > settings.LLM_ROUTER_MAX_P95_MS
+
+    def rank(self) -> list[GatedChatOpenAI]:
+        """健康且未饱和的模型优先，其余保持配置顺序"""
+        def key(item: tuple[int, GatedChatOpenAI]):
+            index, model = item
+            return (self._is_degraded(model), model.gate.saturated, index)
+
+        return [model for _, model in sorted(enumerate(self.models), key=key)]
+
+    @property
+    def saturated(self) -> bool:
+        """首选模型已满载（调用方可据此延后非紧急请求）"""
+        return self.rank()[0].gate.saturated
+
+    def _hedge_delay(self, model: GatedChatOpenAI) -> float:
+        """对冲延迟：取主模型 p95，无样本时用默认值"""
+        from src.config import settings
+
+        p95 = model.gate.health()["p95_ms"]
+        if p95 is None:
+            return settings.LLM_ROUTER_HEDGE_DELAY
+        return max(settings.LLM_ROUTER_HEDGE_DELAY, p95 / 1000)
+
+    async def _hedged(
+        self,
+        primary: GatedChatOpenAI,
+        backup: GatedChatOpenAI,
+        input: Any,
+        hedged: set[int],
+        **kwargs: Any,
+    ):
+        """主模型超过对冲延迟未返回时并发请求备用模型，取先成功者
+
+        实际发出对冲请求时把备用模型记入 hedged；被取消（如外层超时）时取消所有未完成的请求，
+        避免遗留请求继续占用 ModelGate 名额。
+        """
+        owners: dict[asyncio.Task, GatedChatOpenAI] = {}
+        try:
+            primary_task = asyncio.create_task(primary.ainvoke(input, **kwargs))
+            owners[primary_task] = primary
+            delay = self._hedge_delay(primary)
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done:
+                return primary_task.result(), primary
+
+            logger.info(f"[LLMRouter] {self.name}: {primary.gate_name} slower than {delay:.1f}s, hedging to {backup.gate_name}")
+            hedged.add(id(backup))
+            owners[asyncio.create_task(backup.ainvoke(input, **kwargs))] = backup
+            pending = set(owners)
+            last_error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), owners[task]
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in owners:
+                if not task.done():
+                    task.cancel()
+
+    async def ainvoke(self, input: Any, hedge: bool = True, **kwargs: Any):
+        """按排序依次尝试，失败时故障转移（已作为对冲备用请求过的模型不再重试）"""
+        from src.config import settings
+
+        candidates = self.rank()
+        if candidates[0] is not self.models[0]:
+            logger.info(f"[LLMRouter] {self.name}: {self.models[0].gate_name} degraded or saturated, routing to {candidates[0].gate_name}")
+
+        last_error: Exception | None = None
+        hedged: set[int] = set()
+        for index, model in enumerate(candidates):
+            if id(model) in hedged:
+                continue
+            backup = candidates[index + 1] if hedge and index + 1 < len(candidates) else None
+            try:
+                if backup:
+                    result, served_by = await asyncio.wait_for(
+                        self._hedged(model, backup, input, hedged, **kwargs), timeout=settings.LLM_ROUTER_TIMEOUT
+                    )
+                else:
+                    result = await asyncio.wait_for(model.ainvoke(input, **kwargs), timeout=settings.LLM_ROUTER_TIMEOUT)
+                    served_by = model
+                logger.debug(f"[LLMRouter] {self.name}: served by {served_by.gate_name}")
+                return result
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[LLMRouter] {self.name}: {model.gate_name} failed ({type(e).__name__}: {e}), failing over")
+        raise last_error
+
+    def stats(self) -> dict:
+        return {
+            "router": self.name,
+            "order": [model.gate_name for model in self.rank()],
+            "degraded": [model.gate_name for model in self.models if self._is_degraded(model)],
+        }
@@ -0,0 +1,426 @@
+"""沙箱 Provider
+
+SANDBOX_PROVIDER 选择沙箱后端：
+- daytona（默认）：Daytona SDK，需要可用的 Daytona API
+- local：进程内实现，每个沙箱是 LOCAL_SANDBOX_ROOT 下的一个目录，命令经 subprocess 执行，
+  快照为目录拷贝。用于在本机对同步、快照、验证流程做性能分析和回归测试
+
+两者暴露同一组接口（即业务代码使用的 Daytona SDK 子集，见 SandboxProvider），
+DaytonaClient 及 snapshot_manager / skill_validator / workspace_sync 无需区分后端。
+
+local 后端不做隔离：命令以当前用户身份在宿主机运行，命令中的沙箱绝对路径
+（/home/daytona、/skills、/tmp 等）会被改写到沙箱目录下；network_block_all
+通过指向不可达代理的 *_proxy 环境变量模拟。仅用于开发与测试。
+"""
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Protocol
+
+from src.config import settings
+from src.utils.get_logger import get_logger
+
+logger = get_logger("sandbox-provider")
+
+# 沙箱内会被映射到沙箱目录的绝对路径前缀
+VIRTUAL_ROOTS = ("/home/daytona", "/skills", "/workspace", "/tmp")
+SANDBOX_HOME = "/home/daytona"
+# network_block_all 时注入的代理：discard 端口，连接立即失败
+BLOCKED_PROXY = "http://127.0.0.1:9"
+
+
+class SandboxProvider(Protocol):
+    """沙箱后端接口（Daytona SDK 子集）"""
+
+    def create(self, params: Any = None, timeout: float = 60) -> Any: ...
+
+    def find_one(self, labels: dict | None = None) -> Any: ...
+
+    def delete(self, sandbox: Any) -> None: ...
+
+    def create_snapshot(self, sandbox_id: str, name: str) -> Any: ...
+
+    def list_snapshots(self) -> list: ...
+
+    def delete_snapshot(self, snapshot_id: str) -> None: ...
+
+
+class LocalSandboxError(Exception):
+    """local 后端的操作失败（包括注入的故障）"""
+
+
+class _FaultInjector:
+    """按配置为每次操作注入延迟与随机失败"""
+
+    def __init__(self, latency: float, failure_rate: float, seed: int | None = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, operation: str):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if self.failure_rate > 0:
+            with self._lock:
+                failed = self._random.random() < self.failure_rate
+            if failed:
+                raise LocalSandboxError(f"Injected failure in {operation}")
+
+
+class LocalFileSystem:
+    """sandbox.fs：沙箱路径映射到沙箱目录"""
+
+    def __init__(self, sandbox: "LocalSandbox"):
+        self._sandbox = sandbox
+
+    def _local(self, path: str) -> Path:
+        return self._sandbox.resolve(path)
+
+    def upload_file(self, file: bytes | str, remote_path: str, timeout: float | None = None):
+        self._sandbox.fault("upload_file")
+        target = self._local(remote_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(file, (bytes, bytearray)):
+            target.write_bytes(file)
+        else:
+            shutil.copyfile(file, target)
+
+    def upload_files(self, files: list, timeout: float | None = None):
+        self._sandbox.fault("upload_files")
+        for item in files:
+            target = self._local(item.destination)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(item.source, (bytes, bytearray)):
+                target.write_bytes(item.source)
+            else:
+                shutil.copyfile(item.source, target)
+
+    def download_file(self, remote_path: str, timeout: float | None = None) -> bytes:
+        self._sandbox.fault("download_file")
+        source = self._local(remote_path)
+        if not source.is_file():
+            raise LocalSandboxError(f"File not found: {remote_path}")
+        return source.read_bytes()
+
+    def download_files(self, files: list, timeout: float | None = None) -> list:
+        self._sandbox.fault("download_files")
+        responses = []
+        for request in files:
+            source = self._local(request.source)
+            if source.is_file():
+                responses.append(SimpleNamespace(source=request.source, result=source.read_bytes(), error=None))
+            else:
+                responses.append(SimpleNamespace(source=request.source, result=None, error="file_not_found"))
+        return responses
+
+    def list_files(self, path: str) -> list:
+        self._sandbox.fault("list_files")
+        directory = self._local(path)
+        if not directory.is_dir():
+            raise LocalSandboxError(f"Directory not found: {path}")
+        entries = []
+        for entry in directory.iterdir():
+            stat = entry.stat()
+            entries.append(SimpleNamespace(
+                name=entry.name,
+                is_dir=entry.is_dir(),
+                size=stat.st_size,
+                mod_time=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat(),
+            ))
+        return entries
+
+    def create_folder(self, path: str, mode: str = "755"):
+        self._sandbox.fault("create_folder")
+        self._local(path).mkdir(parents=True, exist_ok=True)
+
+    def delete_file(self, path: str, recursive: bool = False):
+        self._sandbox.fault("delete_file")
+        target = self._local(path)
+        if target.is_dir():
+            if not recursive and any(target.iterdir()):
+                raise LocalSandboxError(f"Directory not empty: {path}")
+            shutil.rmtree(target)
+        elif target.exists():
+            target.unlink()
+        else:
+            raise LocalSandboxError(f"File not found: {path}")
+
+
+class LocalProcess:
+    """sandbox.process：subprocess 执行器（同时支持 exec 与 session 两套接口）"""
+
+    def __init__(self, sandbox: "LocalSandbox"):
+        self._sandbox = sandbox
+        self._sessions: dict[str, dict[str, SimpleNamespace]] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, command: str, cwd: str | None, timeout: float | None, env: dict | None = None) -> tuple[int, str, str]:
+        sandbox = self._sandbox
+        workdir = sandbox.resolve(cwd or SANDBOX_HOME)
+        workdir.mkdir(parents=True, exist_ok=True)
+        try:
+            completed = subprocess.run(
+                sandbox.translate(command),
+                shell=True,
+                cwd=workdir,
+                env={**sandbox.environment(), **(env or {})},
+                capture_output=True,
+                timeout=timeout or None,
+            )
+        except subprocess.TimeoutExpired:
+            return 124, "", f"Command timed out after {timeout} seconds"
+        decode = lambda data: sandbox.untranslate(data.decode("utf-8", errors="replace"))
+        return completed.returncode, decode(completed.stdout), decode(completed.stderr)
+
+    def exec(self, command: str, cwd: str | None = None, env: dict | None = None, timeout: float | None = None):
+        self._sandbox.fault("exec")
+        exit_code, stdout, stderr = self._run(command, cwd, timeout, env)
+        return SimpleNamespace(exit_code=exit_code, result=stdout + stderr, artifacts=None)
+
+    def create_session(self, session_id: str):
+        self._sandbox.fault("create_session")
+        with self._lock:
+            self._sessions[session_id] = {}
+
+    def execute_session_command(self, session_id: str, req: Any, timeout: float | None = None):
+        """同步执行；run_async 请求同样在返回前完成，随后的轮询立即拿到结果"""
+        self._sandbox.fault("execute_session_command")
+        with self._lock:
+            commands = self._sessions.get(session_id)
+        if commands is None:
+            raise LocalSandboxError(f"Session not found: {session_id}")
+        exit_code, stdout, stderr = self._run(req.command, None, timeout)
+        cmd_id = uuid.uuid4().hex
+        commands[cmd_id] = SimpleNamespace(
+            id=cmd_id, command=req.command, exit_code=exit_code, stdout=stdout, stderr=stderr
+        )
+        return SimpleNamespace(cmd_id=cmd_id, exit_code=exit_code, output=stdout + stderr, stdout=stdout, stderr=stderr)
+
+    def _command(self, session_id: str, command_id: str) -> SimpleNamespace:
+        with self._lock:
+            command = self._sessions.get(session_id, {}).get(command_id)
+        if command is None:
+            raise LocalSandboxError(f"Command not found: {session_id}/{command_id}")
+        return command
+
+    def get_session_command(self, session_id: str, command_id: str):
+        command = self._command(session_id, command_id)
+        return SimpleNamespace(id=command.id, command=command.command, exit_code=command.exit_code)
+
+    def get_session_command_logs(self, session_id: str, command_id: str):
+        command = self._command(session_id, command_id)
+        return SimpleNamespace(output=command.stdout + command.stderr, stdout=command.stdout, stderr=command.stderr)
+
+    def delete_session(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class LocalSandbox:
+    """本地目录沙箱：{root}/sandboxes/{id}/ 对应沙箱内的根目录"""
+
+    def __init__(self, provider: "LocalSandboxProvider", sandbox_id: str, root: Path, meta: dict):
+        self.id = sandbox_id
+        self.root = root
+        self.labels = meta.get("labels") or {}
+        self.network_block_all = bool(meta.get("network_block_all"))
+        self.snapshot = meta.get("snapshot")
+        self.created_at = meta.get("created_at")
+        self.fault = provider.fault
+        self.fs = LocalFileSystem(self)
+        self.process = LocalProcess(self)
+        self._pattern = re.compile(
+            r"(?<![\w./-])(" + "|".join(re.escape(prefix) for prefix in VIRTUAL_ROOTS) + r")(?=/|\b|$)"
+        )
+
+    def resolve(self, path: str) -> Path:
+        """沙箱路径 → 本地路径（相对路径按沙箱 home 解析，禁止越出沙箱目录）"""
+        virtual = path if path.startswith("/") else f"{SANDBOX_HOME}/{path}"
+        target = (self.root / virtual.lstrip("/")).resolve()
+        if not target.is_relative_to(self.root.resolve()):
+            raise LocalSandboxError(f"Path escapes sandbox: {path}")
+        return target
+
+    def translate(self, command: str) -> str:
+        """将命令中的沙箱绝对路径改写为本地路径"""
+        root = self.root.as_posix()
+        return self._pattern.sub(lambda m: root + m.group(1), command)
+
+    def untranslate(self, output: str) -> str:
+        """输出中的本地路径还原为沙箱路径，与 Daytona 行为保持一致"""
+        return output.replace(self.root.as_posix(), "")
+
+    def environment(self) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "HOME": str(self.resolve(SANDBOX_HOME)),
+            "TMPDIR": str(self.resolve("/tmp")),
+            "SANDBOX_ID": self.id,
+        })
+        if self.network_block_all:
+            for key in ("http_proxy", "https_proxy", "all_proxy", "HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY"):
+                env[key] = BLOCKED_PROXY
+            env.pop("no_proxy", None)
+            env.pop("NO_PROXY", None)
+        return env
+
+
+class LocalSandboxProvider:
+    """进程内沙箱后端
+
+    目录结构：
+        {root}/sandboxes/{id}/         沙箱文件系统
+        {root}/sandboxes/{id}.json     沙箱元数据（labels、来源快照等）
+        {root}/snapshots/{id}/         快照内容（创建沙箱时整体拷贝）
+        {root}/snapshots/{id}.json     快照元数据
+    元数据落盘，服务重启后 find_one 仍能找回沙箱，与 Daytona 的会话恢复语义一致。
+    """
+
+    def __init__(self, root: str | Path, latency: float = 0.0, failure_rate: float = 0.0, seed: int | None = None):
+        self.root = Path(root)
+        self._sandboxes_dir = self.root / "sandboxes"
+        self._snapshots_dir = self.root / "snapshots"
+        self._sandboxes_dir.mkdir(parents=True, exist_ok=True)
+        self._snapshots_dir.mkdir(parents=True, exist_ok=True)
+        self.fault = _FaultInjector(latency, failure_rate, seed)
+        self._lock = threading.Lock()
+        logger.info(f"[LocalSandboxProvider] Root {self.root} (latency={latency}s, failure_rate={failure_rate})")
+
+    @staticmethod
+    def _read_meta(path: Path) -> dict | None:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(path: Path, meta: dict):
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    def _sandbox(self, sandbox_id: str) -> LocalSandbox:
+        meta = self._read_meta(self._sandboxes_dir / f"{sandbox_id}.json")
+        if meta is None:
+            raise LocalSandboxError(f"Sandbox not found: {sandbox_id}")
+        return LocalSandbox(self, sandbox_id, self._sandboxes_dir / sandbox_id, meta)
+
+    def create(self, params: Any = None, timeout: float = 60) -> LocalSandbox:
+        """创建沙箱；params.snapshot 指定时拷贝快照内容"""
+        self.fault("create")
+        snapshot_id = getattr(params, "snapshot", None)
+        sandbox_id = uuid.uuid4().hex
+        root = self._sandboxes_dir / sandbox_id
+
+        if snapshot_id:
+            snapshot_root = self._snapshots_dir / snapshot_id
+            if not snapshot_root.is_dir():
+                raise LocalSandboxError(f"Snapshot not found: {snapshot_id}")
+            shutil.copytree(snapshot_root, root, symlinks=True)
+        for path in (SANDBOX_HOME, "/tmp"):
+            (root / path.lstrip("/")).mkdir(parents=True, exist_ok=True)
+
+        meta = {
+            "labels": dict(getattr(params, "labels", None) or {}),
+            "snapshot": snapshot_id,
+            "network_block_all": bool(getattr(params, "network_block_all", False)),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._write_meta(self._sandboxes_dir / f"{sandbox_id}.json", meta)
+        logger.debug(f"[LocalSandboxProvider] Created sandbox {sandbox_id} from {snapshot_id or 'empty image'}")
+        return LocalSandbox(self, sandbox_id, root, meta)
+
+    def get(self, sandbox_id: str) -> LocalSandbox:
+        self.fault("get")
+        return self._sandbox(sandbox_id)
+
+    def _list(self, labels: dict | None = None) -> list[LocalSandbox]:
+        self.fault("list")
+        sandboxes = []
+        for meta_path in sorted(self._sandboxes_dir.glob("*.json")):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                continue
+            if labels and any(meta.get("labels", {}).get(key) != value for key, value in labels.items()):
+                continue
+            sandbox_id = meta_path.stem
+            sandboxes.append(LocalSandbox(self, sandbox_id, self._sandboxes_dir / sandbox_id, meta))
+        return sandboxes
+
+    def find_one(self, sandbox_id: str | None = None, labels: dict | None = None) -> LocalSandbox:
+        """按 id 或标签查找，未找到时抛出异常（与 SDK 一致）"""
+        if sandbox_id:
+            return self.get(sandbox_id)
+        matches = self._list(labels)
+        if not matches:
+            raise LocalSandboxError(f"No sandbox found with labels {labels}")
+        return max(matches, key=lambda sandbox: sandbox.created_at or "")
+
+    def delete(self, sandbox: Any, timeout: float = 60):
+        self.fault("delete")
+        sandbox_id = sandbox if isinstance(sandbox, str) else sandbox.id
+        meta_path = self._sandboxes_dir / f"{sandbox_id}.json"
+        if not meta_path.exists():
+            raise LocalSandboxError(f"Sandbox not found: {sandbox_id}")
+        meta_path.unlink()
+        shutil.rmtree(self._sandboxes_dir / sandbox_id, ignore_errors=True)
+
+    def create_snapshot(self, sandbox_id: str, name: str) -> SimpleNamespace:
+        """拷贝沙箱当前文件系统为快照（先写临时目录再改名，失败不留半成品）"""
+        self.fault("create_snapshot")
+        source = self._sandbox(sandbox_id).root
+        snapshot_id = uuid.uuid4().hex
+        tmp = self._snapshots_dir / f".{snapshot_id}.tmp"
+        shutil.copytree(source, tmp, symlinks=True)
+        tmp.rename(self._snapshots_dir / snapshot_id)
+        meta = {"id": snapshot_id, "name": name, "created_at": datetime.now(timezone.utc).isoformat()}
+        self._write_meta(self._snapshots_dir / f"{snapshot_id}.json", meta)
+        return SimpleNamespace(**meta)
+
+    def list_snapshots(self) -> list[SimpleNamespace]:
+        self.fault("list_snapshots")
+        snapshots = []
+        for meta_path in self._snapshots_dir.glob("*.json"):
+            meta = self._read_meta(meta_path)
+            if meta is not None:
+                snapshots.append(SimpleNamespace(**meta))
+        return sorted(snapshots, key=lambda snapshot: snapshot.created_at)
+
+    def delete_snapshot(self, snapshot_id: str):
+        self.fault("delete_snapshot")
+        meta_path = self._snapshots_dir / f"{snapshot_id}.json"
+        if not meta_path.exists():
+            raise LocalSandboxError(f"Snapshot not found: {snapshot_id}")
+        meta_path.unlink()
+        shutil.rmtree(self._snapshots_dir / snapshot_id, ignore_errors=True)
+
+
+def create_sandbox_provider() -> SandboxProvider:
+    """按 SANDBOX_PROVIDER 创建沙箱后端"""
+    provider = settings.SANDBOX_PROVIDER.lower()
+    if provider == "local":
+        root = settings.LOCAL_SANDBOX_ROOT or str(Path(settings.WORKSPACE_ROOT) / ".sandboxes")
+        return LocalSandboxProvider(
+            root,
+            latency=settings.LOCAL_SANDBOX_LATENCY,
+            failure_rate=settings.LOCAL_SANDBOX_FAILURE_RATE,
+            seed=settings.LOCAL_SANDBOX_SEED,
+        )
+    if provider == "daytona":
+        from daytona import Daytona, DaytonaConfig
+
+        return Daytona(DaytonaConfig(
+            api_key=settings.DAYTONA_API_KEY,
+            api_url=settings.DAYTONA_API_URL,
+        ))
+    raise ValueError(f"Unknown SANDBOX_PROVIDER: {settings.SANDBOX_PROVIDER}")
@@ -1,111 +1,447 @@
-"""Skills 快照管理服务"""
+"""Skills 快照管理服务
+
+快照以增量方式重建：基于当前快照创建临时沙箱，读取快照内的 manifest
+（{skill_name: content_hash}），只上传新增/变更的 Skill（每个 Skill 一个 tar.gz），
+并删除已下架的 Skill。无可用基础快照时退化为全量构建。
+
+重建请求通过 request_rebuild 异步入队：防抖窗口内的请求合并为一次构建，
+同一时刻只有一个构建在执行，构建状态与历史持久化在 snapshot_builds 表。
+
+快照版本记录在 image_versions 表（is_current 标记当前版本），各 worker 经短 TTL
+缓存读取当前指针，重启或多进程部署都会收敛到最新快照；回滚即切换指针。
+切换指针时经 NOTIFY 广播，其他 worker 立即更新缓存（TTL 仅作为通知丢失时的兜底）。
+
+多 worker / 多节点部署时，构建由持有 snapshot-build advisory lock 的进程独占执行，
+其他进程的构建请求只入队，由锁持有者统一处理。
+"""
+import asyncio
+import io
+import json
+import shlex
+import tarfile
+import threading
+import time
+import uuid
 from datetime import datetime
 from pathlib import Path
 
 from src.config import settings
+from src.coordination import get_cluster_events, get_cluster_locks, lock_key
 from src.daytona_client import get_daytona_client
-from src.database import SessionLocal, Skill
+from src.database import SessionLocal, Skill, SnapshotBuild, ImageVersion
+from src.agent_skills.skill_hash import compute_skill_hash
+from src.agent_skills.skill_index import build_skills_index
+from src.agent_skills.skill_retrieval import get_skill_retriever
 from src.utils.get_logger import get_logger
+from src.utils.ttl_cache import TTLCache
 
 logger = get_logger("snapshot-manager")
 
+SKILLS_ROOT = "/skills"
+MANIFEST_PATH = f"{SKILLS_ROOT}/.manifest.json"
+INDEX_PATH = f"{SKILLS_ROOT}/.index.json"
+CURRENT_KEY = "current"
+POINTER_CHANNEL = "snapshot_pointer"
+BUILD_LOCK_KEY = lock_key("snapshot-build")
+
+BUILD_QUEUED = "queued"
+BUILD_RUNNING = "running"
+BUILD_SUCCEEDED = "succeeded"
+BUILD_FAILED = "failed"
+
 
 class SnapshotManager:
     """管理全局 Skills 快照"""
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._current_snapshot_id: str | None = None
+            cls._instance._pointer_cache = TTLCache(maxsize=1, ttl=settings.SNAPSHOT_POINTER_CACHE_TTL)
+            cls._instance._pointer_lock = threading.Lock()
+            cls._instance._build_lock = asyncio.Lock()
+            cls._instance._worker: asyncio.Task | None = None
+            cls._instance._last_request_at = 0.0
+            get_cluster_events().subscribe(POINTER_CHANNEL, cls._instance._on_pointer_changed)
             logger.info("[SnapshotManager] Initialized")
         return cls._instance
-    
+
     def get_current_snapshot_id(self) -> str | None:
-        """获取当前快照 ID"""
-        if self._current_snapshot_id:
-            return self._current_snapshot_id
-        if settings.DAYTONA_SKILLS_SNAPSHOT_ID:
-            self._current_snapshot_id = settings.DAYTONA_SKILLS_SNAPSHOT_ID
-            logger.info(f"[SnapshotManager] Using snapshot from config: {self._current_snapshot_id[:8]}...")
-        return self._current_snapshot_id
-    
+        """获取当前快照 ID（image_versions.is_current，短 TTL 缓存，无记录时回退到配置）"""
+        snapshot_id = self._pointer_cache.get(CURRENT_KEY)
+        if snapshot_id is not None:
+            return snapshot_id or None
+
+        try:
+            with SessionLocal() as db:
+                current = db.query(ImageVersion.version).filter(
+                    ImageVersion.is_current == True
+                ).order_by(ImageVersion.created_at.desc(), ImageVersion.id.desc()).first()
+            snapshot_id = current.version if current else settings.DAYTONA_SKILLS_SNAPSHOT_ID
+        except Exception as e:
+            logger.warning(f"[SnapshotManager] Failed to read current snapshot: {e}")
+            return settings.DAYTONA_SKILLS_SNAPSHOT_ID or None
+
+        self._pointer_cache.set(CURRENT_KEY, snapshot_id or "")
+        return snapshot_id or None
+
+    def _on_pointer_changed(self, payload: dict):
+        """其他 worker 切换了当前快照"""
+        version = payload.get("version")
+        if version:
+            self._pointer_cache.set(CURRENT_KEY, version)
+            logger.info(f"[SnapshotManager] Current snapshot changed to {version[:8]} by another worker")
+
+    def _publish_snapshot(self, snapshot_id: str, snapshot_name: str, manifest: dict, build_id: str | None):
+        """记录新快照版本并原子切换为当前版本"""
+        with self._pointer_lock, SessionLocal() as db:
+            db.query(ImageVersion).filter(ImageVersion.is_current == True).update({"is_current": False})
+            db.add(ImageVersion(
+                version=snapshot_id,
+                snapshot_name=snapshot_name,
+                skills_manifest=manifest,
+                build_id=build_id,
+                is_current=True,
+            ))
+            db.commit()
+            self._pointer_cache.set(CURRENT_KEY, snapshot_id)
+        get_cluster_events().publish(POINTER_CHANNEL, {"version": snapshot_id})
+        logger.info(f"[SnapshotManager] Published snapshot {snapshot_id[:8]} ({len(manifest)} skills)")
+
+    def set_current_version(self, version: str) -> bool:
+        """回滚/切换当前快照：只修改 is_current 指针，不重建"""
+        with self._pointer_lock, SessionLocal() as db:
+            target = db.query(ImageVersion).filter(ImageVersion.version == version).first()
+            if not target:
+                return False
+            db.query(ImageVersion).filter(
+                ImageVersion.is_current == True, ImageVersion.id != target.id
+            ).update({"is_current": False})
+            target.is_current = True
+            db.commit()
+            self._pointer_cache.set(CURRENT_KEY, version)
+        get_cluster_events().publish(POINTER_CHANNEL, {"version": version})
+        logger.info(f"[SnapshotManager] Current snapshot switched to {version[:8]}")
+        return True
+
+    # ---------------------------------------------------------------- build queue
+
+    def request_rebuild(self, reason: str, requested_by: str | None = None) -> str:
+        """请求重建快照（非阻塞）
+
+        防抖窗口内已有排队中的构建时合并到该构建，返回 build_id。
+        """
+        with SessionLocal() as db:
+            build = db.query(SnapshotBuild).filter(SnapshotBuild.status == BUILD_QUEUED).first()
+            if build:
+                build.request_count = (build.request_count or 1) + 1
+                build.reason = f"{build.reason}; {reason}"[:255]
+            else:
+                build = SnapshotBuild(
+                    build_id=str(uuid.uuid4()),
+                    status=BUILD_QUEUED,
+                    reason=reason[:255],
+                    requested_by=requested_by,
+                    request_count=1,
+                )
+                db.add(build)
+            db.commit()
+            build_id = build.build_id
+
+        logger.info(f"[SnapshotManager] Rebuild requested build={build_id[:8]} reason={reason}")
+        self._last_request_at = time.monotonic()
+        self._ensure_worker()
+        return build_id
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._build_worker())
+            self._worker.add_done_callback(_log_worker_exit)
+
+    def _has_queued_builds(self) -> bool:
+        with SessionLocal() as db:
+            return db.query(SnapshotBuild).filter(SnapshotBuild.status == BUILD_QUEUED).count() > 0
+
+    async def _build_worker(self):
+        """成为集群内唯一的构建者后执行排队中的构建
+
+        锁被其他 worker 持有时等待：持有者会处理包括本进程请求在内的排队构建，
+        若它退出时仍有排队（竞态），本 worker 接手。
+        """
+        locks = get_cluster_locks()
+        while not await asyncio.to_thread(locks.try_acquire, BUILD_LOCK_KEY):
+            await asyncio.sleep(settings.SNAPSHOT_BUILD_DEBOUNCE_SECONDS)
+            if not await asyncio.to_thread(self._has_queued_builds):
+                return
+        try:
+            await self._run_queued_builds()
+        finally:
+            await asyncio.to_thread(locks.release, BUILD_LOCK_KEY)
+
+    async def _run_queued_builds(self):
+        """防抖后依次执行排队中的构建，同一时刻只运行一个"""
+        while True:
+            remaining = self._last_request_at + settings.SNAPSHOT_BUILD_DEBOUNCE_SECONDS - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+
+            with SessionLocal() as db:
+                build = db.query(SnapshotBuild).filter(
+                    SnapshotBuild.status == BUILD_QUEUED
+                ).order_by(SnapshotBuild.created_at).first()
+                if not build:
+                    return
+                build.status = BUILD_RUNNING
+                build.started_at = datetime.utcnow()
+                build.base_snapshot_id = self.get_current_snapshot_id()
+                db.commit()
+                build_id = build.build_id
+
+            async with self._build_lock:
+                logger.info(f"[SnapshotManager] Build {build_id[:8]} started")
+                try:
+                    result = await asyncio.to_thread(self._build, build_id)
+                except Exception as e:
+                    # _build 已兜住构建过程的异常，这里兜底防止构建记录停留在 running、后续排队构建无人处理
+                    logger.error(f"[SnapshotManager] Build {build_id[:8]} crashed: {e}")
+                    result = {"snapshot_id": None, "error": f"{type(e).__name__}: {e}"}
+
+            status = BUILD_SUCCEEDED if result.get("snapshot_id") else BUILD_FAILED
+            try:
+                with SessionLocal() as db:
+                    build = db.query(SnapshotBuild).filter(SnapshotBuild.build_id == build_id).first()
+                    build.status = status
+                    build.snapshot_id = result.get("snapshot_id")
+                    build.stats = result.get("stats")
+                    build.error = result.get("error")
+                    build.finished_at = datetime.utcnow()
+                    db.commit()
+            except Exception as e:
+                logger.error(f"[SnapshotManager] Failed to record build {build_id[:8]} result: {e}")
+            logger.info(f"[SnapshotManager] Build {build_id[:8]} finished status={status}")
+
+    async def resume_pending_builds(self):
+        """启动时恢复：中断的构建标记为失败，排队中的构建重新调度
+
+        其他 worker 正持有构建锁时，运行中的构建属于它，不做处理。
+        """
+        if await asyncio.to_thread(self._recover_builds):
+            self._ensure_worker()
+
+    def _recover_builds(self) -> bool:
+        """标记中断的构建，返回是否仍有排队中的构建"""
+        locks = get_cluster_locks()
+        if locks.holds(BUILD_LOCK_KEY):
+            return False
+        if not locks.try_acquire(BUILD_LOCK_KEY):
+            logger.info("[SnapshotManager] Another worker owns the build queue")
+            return False
+        try:
+            self._fail_interrupted_builds()
+        finally:
+            locks.release(BUILD_LOCK_KEY)
+        return self._has_queued_builds()
+
+    def _fail_interrupted_builds(self):
+        with SessionLocal() as db:
+            interrupted = db.query(SnapshotBuild).filter(SnapshotBuild.status == BUILD_RUNNING).all()
+            for build in interrupted:
+                build.status = BUILD_FAILED
+                build.error = "Interrupted by restart"
+                build.finished_at = datetime.utcnow()
+            db.commit()
+
+    def get_build(self, build_id: str) -> dict | None:
+        with SessionLocal() as db:
+            build = db.query(SnapshotBuild).filter(SnapshotBuild.build_id == build_id).first()
+            return _build_to_dict(build) if build else None
+
+    def list_builds(self, limit: int = 20) -> list[dict]:
+        with SessionLocal() as db:
+            builds = db.query(SnapshotBuild).order_by(SnapshotBuild.created_at.desc()).limit(limit).all()
+            return [_build_to_dict(b) for b in builds]
+
+    # ---------------------------------------------------------------- build
+
+    def _collect_desired_manifest(self) -> dict[str, str]:
+        """已入库 Skills 的 {name: content_hash}，缺失哈希时从磁盘补算并回写"""
+        skills_dir = Path(settings.SHARED_DIR) / "skills"
+        manifest = {}
+
+        with SessionLocal() as db:
+            approved_skills = db.query(Skill).filter(Skill.status == "approved").all()
+            for skill in approved_skills:
+                skill_path = skills_dir / skill.name
+                if not skill_path.exists():
+                    logger.warning(f"[SnapshotManager] Skill path not found: {skill_path}")
+                    continue
+                if not skill.content_hash:
+                    skill.content_hash = compute_skill_hash(skill_path)
+                manifest[skill.name] = skill.content_hash
+            db.commit()
+
+        return manifest
+
+    def _create_build_sandbox(self, client, base_snapshot_id: str | None):
+        """创建构建沙箱，优先基于当前快照；返回 (sandbox, 基础 manifest)"""
+        from daytona import CreateSandboxFromSnapshotParams
+
+        if base_snapshot_id:
+            try:
+                sandbox = client.create(CreateSandboxFromSnapshotParams(snapshot=base_snapshot_id))
+                try:
+                    base_manifest = json.loads(sandbox.fs.download_file(MANIFEST_PATH))
+                    logger.info(f"[SnapshotManager] Incremental build from {base_snapshot_id[:8]} ({len(base_manifest)} skills)")
+                    return sandbox, base_manifest
+                except Exception as e:
+                    logger.warning(f"[SnapshotManager] No manifest in base snapshot, full rebuild: {e}")
+                    client.delete(sandbox)
+            except Exception as e:
+                logger.warning(f"[SnapshotManager] Failed to create sandbox from base snapshot: {e}")
+
+        return client.create(), {}
+
     def rebuild_skills_snapshot(self) -> str | None:
-        """重建包含所有已验证 Skills 的快照"""
+        """同步重建快照（阻塞），返回快照 ID；请求路径中请使用 request_rebuild"""
+        return self._build().get("snapshot_id")
+
+    def _build(self, build_id: str | None = None) -> dict:
+        """重建包含所有已验证 Skills 的快照（增量），返回 {snapshot_id, stats, error}"""
         client = get_daytona_client().client
-        
-        with SessionLocal() as db:
-            approved_skills = db.query(Skill).filter(
-                Skill.status == "approved"
-            ).all()
-        
-        if not approved_skills:
-            logger.warning("[SnapshotManager] No approved skills, skipping snapshot rebuild")
-            return None
-        
+
         skills_dir = Path(settings.SHARED_DIR) / "skills"
         if not skills_dir.exists():
             logger.warning(f"[SnapshotManager] Skills directory not found: {skills_dir}")
-            return None
-        
-        logger.info(f"[SnapshotManager] Rebuilding snapshot with {len(approved_skills)} skills...")
-        
-        sandbox = client.create()
-        logger.info(f"[SnapshotManager] Created temp sandbox {sandbox.id}")
-        
+            return {"snapshot_id": None, "error": f"Skills directory not found: {skills_dir}"}
+
+        sandbox = None
         try:
-            for skill in approved_skills:
-                skill_path = skills_dir / skill.name
-                if skill_path.exists():
-                    self._upload_skill(sandbox, skill_path, skill.name)
-                    logger.info(f"[SnapshotManager] Uploaded skill: {skill.name}")
-                else:
-                    logger.warning(f"[SnapshotManager] Skill path not found: {skill_path}")
-            
+            desired = self._collect_desired_manifest()
+            base_snapshot_id = self.get_current_snapshot_id()
+
+            if not desired and not base_snapshot_id:
+                logger.warning("[SnapshotManager] No approved skills, skipping snapshot rebuild")
+                return {"snapshot_id": None, "error": "No approved skills"}
+
+            sandbox, base_manifest = self._create_build_sandbox(client, base_snapshot_id)
+            logger.info(f"[SnapshotManager] Created temp sandbox {sandbox.id}")
+
+            changed = [name for name, content_hash in desired.items() if base_manifest.get(name) != content_hash]
+            removed = [name for name in base_manifest if name not in desired]
+            stats = {"changed": changed, "removed": removed, "reused": len(desired) - len(changed)}
+
+            if base_manifest and not changed and not removed:
+                logger.info("[SnapshotManager] Snapshot already up to date")
+                return {"snapshot_id": base_snapshot_id, "stats": stats}
+
+            logger.info(
+                f"[SnapshotManager] Rebuilding snapshot: {len(changed)} changed, "
+                f"{len(removed)} removed, {len(desired) - len(changed)} reused"
+            )
+
+            for name in changed:
+                self._upload_skill(sandbox, skills_dir / name, name)
+                logger.info(f"[SnapshotManager] Uploaded skill: {name}")
+
+            for name in removed:
+                self._exec(sandbox, f"rm -rf {shlex.quote(f'{SKILLS_ROOT}/{name}')}")
+                logger.info(f"[SnapshotManager] Removed skill: {name}")
+
+            index = build_skills_index(skills_dir, list(desired))
+            sandbox.fs.upload_file(json.dumps(index, ensure_ascii=False).encode("utf-8"), INDEX_PATH)
+            sandbox.fs.upload_file(json.dumps(desired, ensure_ascii=False).encode("utf-8"), MANIFEST_PATH)
+
             snapshot_name = f"skills-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
             snapshot = client.create_snapshot(sandbox.id, name=snapshot_name)
             logger.info(f"[SnapshotManager] Created snapshot: {snapshot.id}")
-            
-            old_snapshot_id = self._current_snapshot_id
-            self._current_snapshot_id = snapshot.id
-            
-            self._cleanup_old_snapshots(keep=3)
-            
-            return snapshot.id
-            
+
+            self._publish_snapshot(snapshot.id, snapshot_name, desired, build_id)
+            get_skill_retriever().rebuild(snapshot.id, index)
+
+            self._cleanup_old_snapshots(keep=settings.SKILL_IMAGE_VERSIONS_TO_KEEP)
+
+            return {"snapshot_id": snapshot.id, "stats": stats}
+
         except Exception as e:
             logger.error(f"[SnapshotManager] Failed to rebuild snapshot: {e}")
-            return None
+            return {"snapshot_id": None, "error": str(e)}
         finally:
-            try:
-                client.delete(sandbox)
-                logger.info(f"[SnapshotManager] Cleaned up temp sandbox")
-            except Exception:
-                pass
-    
+            if sandbox is not None:
+                try:
+                    client.delete(sandbox)
+                    logger.info(f"[SnapshotManager] Cleaned up temp sandbox")
+                except Exception:
+                    pass
+
+    def _exec(self, sandbox, command: str):
+        """在沙箱内执行命令，失败时抛出异常"""
+        response = sandbox.process.exec(command)
+        if response.exit_code != 0:
+            raise RuntimeError(f"Command failed ({response.exit_code}): {command}: {response.result}")
+        return response
+
     def _upload_skill(self, sandbox, skill_path: Path, skill_name: str):
-        """上传单个 Skill 到 /skills/ 目录"""
-        for file_path in skill_path.rglob("*"):
-            if file_path.is_file():
-                relative = file_path.relative_to(skill_path)
-                sandbox_path = f"/skills/{skill_name}/{relative}"
-                content = file_path.read_bytes()
-                sandbox.fs.upload_file(content, sandbox_path)
-    
-    def _cleanup_old_snapshots(self, keep: int = 3):
-        """清理旧快照"""
+        """将单个 Skill 打包为 tar.gz 上传并解压到 /skills/{name}（替换旧版本）"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            for file_path in sorted(skill_path.rglob("*")):
+                if file_path.is_file():
+                    tar.add(file_path, arcname=file_path.relative_to(skill_path).as_posix())
+
+        archive_path = f"/tmp/skill-{skill_name}.tar.gz"
+        target = f"{SKILLS_ROOT}/{skill_name}"
+        sandbox.fs.upload_file(buffer.getvalue(), archive_path)
+        self._exec(
+            sandbox,
+            f"rm -rf {shlex.quote(target)} && mkdir -p {shlex.quote(target)} "
+            f"&& tar -xzf {shlex.quote(archive_path)} -C {shlex.quote(target)} && rm -f {shlex.quote(archive_path)}"
+        )
+
+    def _cleanup_old_snapshots(self, keep: int = 5):
+        """清理旧快照：保留最近 keep 个版本及当前版本，其余 Daytona 快照与版本记录一并删除"""
         try:
+            with SessionLocal() as db:
+                versions = db.query(ImageVersion).order_by(
+                    ImageVersion.created_at.desc(), ImageVersion.id.desc()
+                ).all()
+                kept = {v.version for v in versions[:keep]} | {v.version for v in versions if v.is_current}
+                kept.add(settings.DAYTONA_SKILLS_SNAPSHOT_ID)
+                for version in versions:
+                    if version.version not in kept:
+                        db.delete(version)
+                db.commit()
+
             client = get_daytona_client().client
-            snapshots = client.list_snapshots()
-            skills_snapshots = [s for s in snapshots if s.name.startswith("skills-")]
-            skills_snapshots.sort(key=lambda x: x.created_at, reverse=True)
-            
-            for snapshot in skills_snapshots[keep:]:
-                client.delete_snapshot(snapshot.id)
-                logger.info(f"[SnapshotManager] Deleted old snapshot: {snapshot.id}")
+            for snapshot in client.list_snapshots():
+                if snapshot.name.startswith("skills-") and snapshot.id not in kept:
+                    client.delete_snapshot(snapshot.id)
+                    logger.info(f"[SnapshotManager] Deleted old snapshot: {snapshot.id}")
         except Exception as e:
             logger.warning(f"[SnapshotManager] Failed to cleanup old snapshots: {e}")
 
 
+def _log_worker_exit(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logger.error(f"[SnapshotManager] Build worker crashed: {task.exception()!r}")
+
+
+def _build_to_dict(build: SnapshotBuild) -> dict:
+    return {
+        "build_id": build.build_id,
+        "status": build.status,
+        "reason": build.reason,
+        "requested_by": build.requested_by,
+        "request_count": build.request_count,
+        "base_snapshot_id": build.base_snapshot_id,
+        "snapshot_id": build.snapshot_id,
+        "stats": build.stats,
+        "error": build.error,
+        "created_at": str(build.created_at) if build.created_at else None,
+        "started_at": str(build.started_at) if build.started_at else None,
+        "finished_at": str(build.finished_at) if build.finished_at else None,
+    }
+
+
 def get_snapshot_manager() -> SnapshotManager:
     return SnapshotManager()
@@ -0,0 +1,226 @@
+"""线程亲和：按一致性哈希把每个 thread 固定到一个 worker
+
+SSE 缓冲、沙箱句柄缓存等进程内状态只有在同一 worker 持续处理同一 thread 时才有效。
+开启 THREAD_AFFINITY_ENABLED 后：
+
+- 每个 worker 以 WORKER_ADVERTISE_URL 登记到 worker_members 表并定期心跳，
+  超过 WORKER_TTL_SECONDS 未心跳的 worker 移出哈希环
+- thread_id 经哈希环（每个 worker HASH_RING_VNODES 个虚拟节点）映射到属主 worker；
+  增减 worker 时只有约 1/N 的 thread 迁移，其余 thread 的缓存继续命中
+- 非属主收到 /chat、/resume、/status 时转发给属主（proxy）或 307 重定向（redirect）；
+  转发请求带 X-Affinity-Forwarded 头，属主不再二次转发，避免成员视图短暂不一致时循环
+- worker 加入 / 退出时经 ClusterEvents 通知，其他 worker 立即重建哈希环
+
+亲和只是性能优化：会话状态以 Postgres checkpoint 为准，属主不可达时本地直接处理。
+"""
+import asyncio
+import bisect
+import hashlib
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from src.config import settings
+from src.coordination import get_cluster_events
+from src.database import SessionLocal, WorkerMember
+from src.utils.get_logger import get_logger
+from src.utils.metrics import HASH_RING_MEMBERS, THREAD_ROUTING
+
+if TYPE_CHECKING:
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+logger = get_logger("thread-affinity")
+
+MEMBERSHIP_CHANNEL = "worker_membership"
+FORWARDED_HEADER = "X-Affinity-Forwarded"
+FORWARD_REQUEST_HEADERS = ("authorization", "content-type", "accept", "last-event-id")
+FORWARD_RESPONSE_HEADERS = ("content-type", "x-run-id", "cache-control")
+STALE_MEMBER_FACTOR = 10  # 超过 TTL 的该倍数仍未心跳的登记行直接删除
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """一致性哈希环（节点为 worker 地址）"""
+
+    def __init__(self, nodes: list[str] | tuple[str, ...] = (), vnodes: int = 128):
+        self.nodes = tuple(sorted(set(nodes)))
+        self.vnodes = vnodes
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str | None:
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+class ThreadAffinity:
+    """本 worker 的成员登记、心跳与 thread 路由"""
+
+    def __init__(self, url: str, vnodes: int = 128):
+        self.url = url.rstrip("/")
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.vnodes = vnodes
+        self.ring = HashRing((), vnodes)
+        self._lock = threading.Lock()
+        self._heartbeat: asyncio.Task | None = None
+        self._http = None
+
+    # ---------------------------------------------------------------- membership
+
+    def _beat(self):
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            member = db.query(WorkerMember).filter(WorkerMember.worker_id == self.worker_id).first()
+            if member is None:
+                db.add(WorkerMember(worker_id=self.worker_id, url=self.url, heartbeat_at=now))
+            else:
+                member.heartbeat_at = now
+            db.query(WorkerMember).filter(
+                WorkerMember.heartbeat_at < now - timedelta(seconds=settings.WORKER_TTL_SECONDS * STALE_MEMBER_FACTOR)
+            ).delete(synchronize_session=False)
+            db.commit()
+
+    def refresh(self) -> HashRing:
+        """按存活成员重建哈希环（成员未变化时保持原环）"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.WORKER_TTL_SECONDS)
+        with SessionLocal() as db:
+            urls = [row.url for row in db.query(WorkerMember.url).filter(WorkerMember.heartbeat_at >= cutoff).all()]
+        ring = HashRing(urls, self.vnodes)
+        with self._lock:
+            if ring.nodes != self.ring.nodes:
+                joined = set(ring.nodes) - set(self.ring.nodes)
+                left = set(self.ring.nodes) - set(ring.nodes)
+                logger.info(f"[ThreadAffinity] Ring now {len(ring)} workers (+{sorted(joined)} -{sorted(left)})")
+                self.ring = ring
+                HASH_RING_MEMBERS.set(len(ring))
+            return self.ring
+
+    def _on_membership(self, payload: dict):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"[ThreadAffinity] Membership refresh failed: {e}")
+
+    async def start(self):
+        await asyncio.to_thread(self._beat)
+        await asyncio.to_thread(self.refresh)
+        get_cluster_events().subscribe(MEMBERSHIP_CHANNEL, self._on_membership)
+        get_cluster_events().publish(MEMBERSHIP_CHANNEL, {"joined": self.url})
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"[ThreadAffinity] Joined as {self.url} ({self.worker_id})")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.WORKER_HEARTBEAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self._beat)
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"[ThreadAffinity] Heartbeat failed: {e}")
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        try:
+            await asyncio.to_thread(self._leave)
+            get_cluster_events().publish(MEMBERSHIP_CHANNEL, {"left": self.url})
+        except Exception as e:
+            logger.warning(f"[ThreadAffinity] Leave failed: {e}")
+        if self._http is not None:
+            await self._http.aclose()
+        logger.info(f"[ThreadAffinity] Left ring as {self.url}")
+
+    def _leave(self):
+        with SessionLocal() as db:
+            db.query(WorkerMember).filter(WorkerMember.worker_id == self.worker_id).delete()
+            db.commit()
+
+    # ---------------------------------------------------------------- routing
+
+    def owner_of(self, thread_id: str) -> str | None:
+        return self.ring.owner(thread_id)
+
+    async def route(self, request: "Request", thread_id: str) -> "Response | None":
+        """非属主时返回转发 / 重定向响应；由本 worker 处理时返回 None"""
+        owner = self.owner_of(thread_id)
+        if owner is None or owner == self.url or request.headers.get(FORWARDED_HEADER):
+            THREAD_ROUTING.inc(decision="local")
+            return None
+
+        if settings.THREAD_AFFINITY_MODE == "redirect":
+            from starlette.responses import RedirectResponse
+
+            THREAD_ROUTING.inc(decision="redirect")
+            return RedirectResponse(self._target(owner, request), status_code=307)
+
+        try:
+            response = await self._proxy(owner, request)
+        except Exception as e:
+            logger.warning(f"[ThreadAffinity] Owner {owner} unreachable for {thread_id}, serving locally: {e}")
+            THREAD_ROUTING.inc(decision="fallback")
+            return None
+        THREAD_ROUTING.inc(decision="proxy")
+        return response
+
+    @staticmethod
+    def _target(owner: str, request: "Request") -> str:
+        query = f"?{request.url.query}" if request.url.query else ""
+        return f"{owner}{request.url.path}{query}"
+
+    async def _proxy(self, owner: str, request: "Request") -> "Response":
+        """流式转发到属主（SSE 逐块透传）"""
+        import httpx
+        from starlette.background import BackgroundTask
+        from starlette.responses import StreamingResponse
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=3))
+
+        headers = {key: value for key, value in request.headers.items() if key.lower() in FORWARD_REQUEST_HEADERS}
+        headers[FORWARDED_HEADER] = self.url
+        upstream = await self._http.send(
+            self._http.build_request(
+                request.method, self._target(owner, request), headers=headers, content=await request.body()
+            ),
+            stream=True,
+        )
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers={key: value for key, value in upstream.headers.items() if key.lower() in FORWARD_RESPONSE_HEADERS},
+            background=BackgroundTask(upstream.aclose),
+        )
+
+
+_affinity: ThreadAffinity | None = None
+
+
+def get_thread_affinity() -> ThreadAffinity | None:
+    """未开启线程亲和时返回 None"""
+    global _affinity
+    if _affinity is None and settings.THREAD_AFFINITY_ENABLED:
+        if not settings.WORKER_ADVERTISE_URL:
+            raise ValueError("THREAD_AFFINITY_ENABLED requires WORKER_ADVERTISE_URL")
+        _affinity = ThreadAffinity(settings.WORKER_ADVERTISE_URL, settings.HASH_RING_VNODES)
+    return _affinity
+
+
+async def route_thread_request(request: "Request", thread_id: str) -> "Response | None":
+    """thread 级接口入口调用：需要转发时返回响应，否则返回 None 由本 worker 处理"""
+    affinity = get_thread_affinity()
+    if affinity is None:
+        return None
+    return await affinity.route(request, thread_id)
@@ -1,9 +1,236 @@
+"""日志：QueueHandler 入队 + 后台 QueueListener 写文件
+
+调用方只做消息格式化并入队，文件写入与按天轮转都在监听线程完成，
+磁盘延迟不再落在事件循环 / 请求路径上。
+
+- 每个 logger 名写入 logs/{name}.log（按天轮转，保留 30 天）
+- 默认输出 JSON 行，自动携带 log_context 绑定的 thread_id / user_id / run_id；LOG_FORMAT=text 为纯文本
+- 带 extra={"sample_key": ...} 的高频记录（如逐文件同步日志）每 LOG_SAMPLE_EVERY 条保留 1 条
+- 模块级别可在运行时调整（set_log_level，管理端 /api/admin/logging/levels）
+"""
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Iterator
 
 from src.utils.get_root_path import get_project_root
 
+CONTEXT_FIELDS = ("thread_id", "user_id", "run_id")
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
+
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_lock = threading.Lock()
+_listener: QueueListener | None = None
+# 入队与监听线程启停互斥：停止期间不会有记录落在停止哨兵之后，也不会启动第二个监听线程
+_listener_lock = threading.Lock()
+_loggers: set[str] = set()
+_levels: dict[str, int] = {}
+_sample_counts: dict[tuple[str, str], int] = {}
+_config = {"format": "json", "level": logging.INFO, "sample_every": 100}
+
+
+# ---------------------------------------------------------------- 上下文
+
+def bind_log_context(**fields):
+    """在当前上下文（asyncio task / 线程）绑定日志字段，返回用于还原的 token"""
+    return _log_context.set({**_log_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+
+def reset_log_context(token):
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """with 块内的日志自动携带给定字段"""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def get_log_context() -> dict:
+    return dict(_log_context.get())
+
+
+# ---------------------------------------------------------------- 调用方：过滤 + 入队
+
+class _ContextFilter(logging.Filter):
+    """附加上下文字段；对带 sample_key 的记录按计数采样"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+
+        sample_key = getattr(record, "sample_key", None)
+        every = _config["sample_every"]
+        if sample_key is not None and every > 1:
+            counter = (record.name, str(sample_key))
+            with _lock:
+                count = _sample_counts.get(counter, 0)
+                _sample_counts[counter] = count + 1
+            if count % every:
+                return False
+            record.sampled = every
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """入队前只合并消息与异常文本，保留记录上的结构化字段"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        with _listener_lock:
+            _ensure_listener()
+            super().enqueue(record)
+
+
+# ---------------------------------------------------------------- 监听线程：格式化 + 写文件
+
+class JsonFormatter(logging.Formatter):
+    """单行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        sampled = getattr(record, "sampled", None)
+        if sampled:
+            data["sampled"] = f"1/{sampled}"
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _RoutingHandler(logging.Handler):
+    """按 logger 名分发到各自的轮转文件"""
+
+    def __init__(self):
+        super().__init__()
+        self._files: dict[str, TimedRotatingFileHandler] = {}
+        self._json = JsonFormatter()
+        self._text = logging.Formatter(TEXT_FORMAT)
+
+    def _file(self, name: str) -> TimedRotatingFileHandler:
+        handler = self._files.get(name)
+        if handler is None:
+            log_dir = os.path.join(get_project_root(), "logs")
+            os.makedirs(log_dir, exist_ok=True)
+            handler = TimedRotatingFileHandler(
+                os.path.join(log_dir, f"{name}.log"),
+                when="midnight",
+                interval=1,
+                backupCount=30,
+                encoding="utf-8",
+            )
+            handler.suffix = "%Y-%m-%d"
+            self._files[name] = handler
+        return handler
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            handler = self._file(record.name)
+            handler.setFormatter(self._json if _config["format"] == "json" else self._text)
+            handler.emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is None:
+        _listener = QueueListener(_queue, _RoutingHandler())
+        _listener.start()
+
+
+def shutdown_logging():
+    """停止监听线程并写完队列中剩余的记录（之后再有日志会重新启动监听线程）"""
+    global _listener
+    with _listener_lock:
+        listener = _listener
+        if listener is None:
+            return
+        listener.stop()
+        _listener = None
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+# ---------------------------------------------------------------- 配置
+
+def _to_level(level: str | int) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return value
+
+
+def configure_logging(
+    fmt: str | None = None,
+    level: str | int | None = None,
+    levels: dict[str, str | int] | None = None,
+    sample_every: int | None = None,
+):
+    """应用日志配置（启动时由 settings 调用，已创建的 logger 同样生效）"""
+    if fmt is not None:
+        _config["format"] = fmt.lower()
+    if sample_every is not None:
+        _config["sample_every"] = max(1, int(sample_every))
+    if level is not None:
+        _config["level"] = _to_level(level)
+    for name, value in (levels or {}).items():
+        _levels[name] = _to_level(value)
+    for name in list(_loggers):
+        logging.getLogger(name).setLevel(_levels.get(name, _config["level"]))
+
+
+def set_log_level(name: str, level: str | int):
+    """运行时调整单个模块的级别（仅当前进程）"""
+    _levels[name] = _to_level(level)
+    logging.getLogger(name).setLevel(_levels[name])
+
+
+def get_log_levels() -> dict[str, str]:
+    return {name: logging.getLevelName(logging.getLogger(name).level) for name in sorted(_loggers)}
+
 
 def get_logger(name="deepagent_stream"):
     logger = logging.getLogger(name)
@@ -11,25 +238,14 @@ def get_logger(name="deepagent_stream"):
     if logger.handlers:
         return logger
 
-    logger.setLevel(logging.INFO)
+    logger.setLevel(_levels.get(name, _config["level"]))
     logger.propagate = False
 
-    project_root = get_project_root()
-    log_dir = os.path.join(project_root, "logs")
-    os.makedirs(log_dir, exist_ok=True)
-
-    log_path = os.path.join(log_dir, f"{name}.log")
-
-    handler = TimedRotatingFileHandler(
-        log_path,
-        when="midnight",
-        interval=1,
-        backupCount=30,
-        encoding="utf-8",
-    )
-    handler.suffix = "%Y-%m-%d"
-    handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
-
+    handler = _QueueHandler(_queue)
+    handler.addFilter(_ContextFilter())
     logger.addHandler(handler)
 
+    with _lock:
+        _loggers.add(name)
+
     return logger
@@ -24,7 +24,16 @@ def _init_langfuse_singleton(
         flush_at=flush_at,
         flush_interval=flush_interval,
     )
-    return get_client()
+    client = get_client()
+    # 与客户端同生命周期，只注册一次
+    atexit.register(client.flush)
+    return client
+
+
+@lru_cache(maxsize=1)
+def _get_callback_handler() -> CallbackHandler:
+    """CallbackHandler 按 LangChain run_id 区分调用，可在并发运行间共享"""
+    return CallbackHandler()
 
 
 def init_langfuse(
@@ -46,8 +55,7 @@ def init_langfuse(
         flush_interval,
     )
 
-    if auto_flush:
-        atexit.register(client.flush)
+    if not auto_flush:
+        return None, client
 
-    handler = CallbackHandler()
-    return handler, client
+    return _get_callback_handler(), client
@@ -0,0 +1,278 @@
+"""进程内指标注册表（Prometheus 文本格式）
+
+提供 Counter / Gauge / Histogram 三种指标，线程安全，无外部依赖；
+GET /metrics 调用 render() 输出。需要在抓取时才读取的数据（如连接池状态）
+通过 add_collector 注册回调，在 render 前刷新对应 Gauge。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from src.utils.get_logger import get_logger
+
+logger = get_logger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 16 * 1024, 256 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type_name}\n"
+        return header + "".join(line + "\n" for line in self._samples())
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        """进入时 +1，退出时 -1"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """分桶直方图（累计桶 + sum + count）"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            totals[0] += value
+            totals[1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """记录代码块耗时（秒），异常时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        item = self._values.get(self._key(labels))
+        return int(item[1][1]) if item else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(counts), list(totals)) for key, (counts, totals) in self._values.items()]
+        lines = []
+        for key, counts, (total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {int(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表：同名指标只注册一次"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """注册抓取时执行的回调（用于刷新 Gauge）"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"[Metrics] Collector failed: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+registry = MetricsRegistry()
+
+# ---------------------------------------------------------------- Agent 对话
+SSE_TTFT_SECONDS = registry.histogram(
+    "agent_sse_time_to_first_token_seconds", "Time from request to the first streamed token", ("mode",), LATENCY_BUCKETS
+)
+SSE_TOKENS_PER_SECOND = registry.histogram(
+    "agent_sse_tokens_per_second", "Streamed token chunks per second for each run", ("mode",), RATE_BUCKETS
+)
+SSE_TOKENS = registry.counter("agent_sse_tokens_total", "Streamed token chunks", ("mode",))
+AGENT_STEP_SECONDS = registry.histogram(
+    "agent_step_duration_seconds", "Duration of each astream step (graph node update)", ("node",), LATENCY_BUCKETS
+)
+ACTIVE_RUNS = registry.gauge("agent_active_runs", "Agent runs currently executing")
+ACTIVE_STREAMS = registry.gauge("sse_active_streams", "Open SSE streams", ("kind",))
+
+# ---------------------------------------------------------------- Daytona
+DAYTONA_OP_SECONDS = registry.histogram(
+    "daytona_operation_seconds", "Latency of Daytona SDK operations", ("operation", "outcome"), LATENCY_BUCKETS
+)
+
+# ---------------------------------------------------------------- 文件同步 / 上传
+SYNC_BYTES = registry.counter("workspace_sync_bytes_total", "Bytes synced between workspace and sandbox", ("direction",))
+SYNC_LAG_SECONDS = registry.histogram(
+    "workspace_sync_lag_seconds", "Delay between a sandbox file change and its local copy", (), LATENCY_BUCKETS
+)
+CHUNK_UPLOAD_BYTES = registry.counter("chunk_upload_bytes_total", "Bytes received by chunked uploads")
+CHUNK_UPLOAD_SECONDS = registry.histogram(
+    "chunk_upload_chunk_seconds", "Time to persist one upload chunk", (), DEFAULT_BUCKETS
+)
+CHUNK_UPLOAD_THROUGHPUT = registry.histogram(
+    "chunk_upload_throughput_bytes_per_second", "Average throughput of completed chunked uploads", (),
+    (64 * 1024, 256 * 1024, 1024 ** 2, 5 * 1024 ** 2, 20 * 1024 ** 2, 100 * 1024 ** 2),
+)
+
+# ---------------------------------------------------------------- LLM
+LLM_CALL_SECONDS = registry.histogram(
+    "llm_call_duration_seconds", "LLM call latency excluding queue wait", ("model", "outcome"), LATENCY_BUCKETS
+)
+LLM_QUEUE_WAIT_SECONDS = registry.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a model gate slot", ("model",), DEFAULT_BUCKETS
+)
+
+# ---------------------------------------------------------------- 数据库连接池
+DB_POOL_SIZE = registry.gauge("db_pool_size", "Connections in the async checkpoint pool", ("pool",))
+DB_POOL_AVAILABLE = registry.gauge("db_pool_available", "Idle connections in the pool", ("pool",))
+DB_POOL_WAITING = registry.gauge("db_pool_requests_waiting", "Requests currently waiting for a connection", ("pool",))
+DB_POOL_WAIT_SECONDS = registry.gauge(
+    "db_pool_requests_wait_seconds", "Cumulative time requests waited for a connection", ("pool",)
+)
+DB_POOL_REQUESTS = registry.gauge("db_pool_requests", "Cumulative connection requests", ("pool",))
+
+# ---------------------------------------------------------------- 线程亲和
+THREAD_ROUTING = registry.counter("thread_routing_total", "Thread-scoped requests by routing decision", ("decision",))
+HASH_RING_MEMBERS = registry.gauge("hash_ring_members", "Workers currently in the thread-affinity hash ring")
+SANDBOX_HANDLE_CACHE = registry.counter(
+    "sandbox_handle_cache_total", "Per-thread sandbox handle lookups by result", ("result",)
+)
+
+# ---------------------------------------------------------------- 启动
+STARTUP_SECONDS = registry.gauge("process_startup_seconds", "Seconds from process start to each startup phase", ("phase",))
+
+
+def get_registry() -> MetricsRegistry:
+    return registry
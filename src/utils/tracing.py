@@ -0,0 +1,302 @@
+"""轻量级运行追踪（每轮对话一棵 span 树）
+
+stream_chat / resume 为每次运行创建 Trace 并设为当前上下文，之后：
+- LLM / 工具调用经 TracingCallbackHandler（LangChain 回调）记录
+- 沙箱操作、checkpoint 写入、文件同步等在各自代码处用 trace_span() 记录，无当前 Trace 时为空操作
+
+运行结束后 Trace 进入进程内环形缓冲（TRACE_BUFFER_SIZE 条），
+GET /api/runs/{run_id}/timing 读取耗时分解；启用 Langfuse 时另外上报一条 run-timing 事件
+（LLM / 工具明细已由 Langfuse CallbackHandler 记录）。
+"""
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterator
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.config import settings
+from src.utils.get_logger import get_logger
+
+logger = get_logger("tracing")
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """一段计时（时间为相对 Trace 开始的秒数）"""
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, start: float, parent_id: int | None, attributes: dict):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end: float | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self) -> dict:
+        data = {
+            "id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round(self.start * 1000, 1),
+            "duration_ms": None if self.end is None else round((self.end - self.start) * 1000, 1),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class Trace:
+    """一次运行的 span 集合，根 span 覆盖整个运行"""
+
+    def __init__(self, run_id: str, name: str, thread_id: str, user_id: str, max_spans: int = 2000):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.user_id = user_id
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._max_spans = max_spans
+        self.dropped = 0
+        self.root = Span(name, "run", 0.0, None, {})
+        self.spans: list[Span] = [self.root]
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def start_span(self, name: str, kind: str, parent: Span | None = None, **attributes) -> Span:
+        span = Span(name, kind, self._now(), (parent or self.root).span_id, attributes)
+        with self._lock:
+            if len(self.spans) < self._max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+        return span
+
+    def end_span(self, span: Span, error: str | None = None):
+        span.end = self._now()
+        if error:
+            span.error = error[:500]
+
+    def set_error(self, error: str):
+        self.root.error = error[:500]
+
+    def finish(self, error: str | None = None):
+        if self.root.end is None:
+            self.end_span(self.root, error or self.root.error)
+
+    @property
+    def finished(self) -> bool:
+        return self.root.end is not None
+
+    def breakdown(self) -> dict[str, dict]:
+        """按 kind 汇总：次数、总耗时、最大单次耗时（嵌套 span 各自计入所属 kind）"""
+        with self._lock:
+            spans = list(self.spans[1:])
+        result: dict[str, dict] = {}
+        for span in spans:
+            duration = span.duration if span.duration is not None else self._now() - span.start
+            item = result.setdefault(span.kind, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            item["count"] += 1
+            item["total_ms"] += duration * 1000
+            item["max_ms"] = max(item["max_ms"], duration * 1000)
+        for item in result.values():
+            item["total_ms"] = round(item["total_ms"], 1)
+            item["max_ms"] = round(item["max_ms"], 1)
+        return result
+
+    def to_dict(self, include_spans: bool = True) -> dict:
+        duration = self.root.duration if self.finished else self._now()
+        data = {
+            "run_id": self.run_id,
+            "thread_id": self.thread_id,
+            "name": self.root.name,
+            "started_at": self.started_at.isoformat(),
+            "finished": self.finished,
+            "duration_ms": round(duration * 1000, 1),
+            "breakdown": self.breakdown(),
+        }
+        if self.root.error:
+            data["error"] = self.root.error
+        if include_spans:
+            with self._lock:
+                data["spans"] = [span.to_dict() for span in self.spans]
+            data["dropped_spans"] = self.dropped
+        return data
+
+
+class TraceStore:
+    """最近运行的环形缓冲（按 run_id 索引）"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._traces: OrderedDict[str, Trace] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces[trace.run_id] = trace
+            self._traces.move_to_end(trace.run_id)
+            while len(self._traces) > self.maxsize:
+                self._traces.popitem(last=False)
+
+    def get(self, run_id: str) -> Trace | None:
+        with self._lock:
+            return self._traces.get(run_id)
+
+    def recent(self, thread_id: str | None = None, limit: int = 20) -> list[Trace]:
+        with self._lock:
+            traces = list(reversed(self._traces.values()))
+        if thread_id:
+            traces = [trace for trace in traces if trace.thread_id == thread_id]
+        return traces[:limit]
+
+
+_store = TraceStore(settings.TRACE_BUFFER_SIZE)
+
+
+def get_trace_store() -> TraceStore:
+    return _store
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(run_id: str, name: str, thread_id: str, user_id: str) -> Iterator[Trace]:
+    """创建 Trace 并设为当前上下文；运行中即可通过 run_id 查询进度"""
+    trace = Trace(run_id, name, thread_id, user_id)
+    _store.add(trace)
+    token = _current_trace.set(trace)
+    error = None
+    try:
+        yield trace
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # 流式响应被中断时，生成器可能在其他上下文中关闭
+            pass
+        trace.finish(error)
+        _export(trace)
+
+
+@contextmanager
+def trace_span(name: str, kind: str, **attributes) -> Iterator[Span | None]:
+    """在当前 Trace 中记录一段计时，无当前 Trace 时不做任何事"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    span = trace.start_span(name, kind, _current_span.get(), **attributes)
+    token = _current_span.set(span)
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.end_span(span, error)
+
+
+def instrument_async_method(obj: Any, attr: str, kind: str, name: str | None = None):
+    """将实例上的异步方法包装为带 span 的版本（用于 checkpointer 等第三方对象）"""
+    method = getattr(obj, attr)
+    span_name = name or f"{kind}.{attr}"
+
+    @functools.wraps(method)
+    async def traced(*args, **kwargs):
+        with trace_span(span_name, kind):
+            return await method(*args, **kwargs)
+
+    setattr(obj, attr, traced)
+
+
+def _export(trace: Trace):
+    """启用 Langfuse 时上报耗时分解"""
+    if settings.IS_LANGFUSE == 0:
+        return
+    try:
+        from src.utils.langfuse_monitor import init_langfuse
+
+        _, client = init_langfuse()
+        if client is not None:
+            client.create_event(
+                name="run-timing",
+                metadata={**trace.to_dict(include_spans=False), "user_id": trace.user_id},
+            )
+    except Exception as e:
+        logger.warning(f"[Tracing] Langfuse export failed: {e}")
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """将 LangChain 的 LLM / 工具回调记录为 span（同步执行，避免进入线程池）"""
+
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._spans: dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: str, kind: str, **attributes):
+        self._spans[run_id] = self.trace.start_span(name, kind, **attributes)
+
+    def _end(self, run_id: UUID, error: BaseException | None = None):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.trace.end_span(span, f"{type(error).__name__}: {error}" if error else None)
+
+    @staticmethod
+    def _model_name(serialized: dict | None, kwargs: dict) -> str:
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        return (
+            params.get("model") or params.get("model_name") or metadata.get("ls_model_name")
+            or ((serialized or {}).get("kwargs") or {}).get("model") or "llm"
+        )
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, self._model_name(serialized, kwargs), "llm")
+
+    def on_llm_start(self, serialized: dict, prompts: list, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, self._model_name(serialized, kwargs), "llm")
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name") or "tool", "tool")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
@@ -1,12 +1,19 @@
-"""实时双向文件同步服务"""
+"""实时双向文件同步服务
+
+多 worker / 多节点部署时（WORKSPACE_ROOT 为共享存储），每个用户的沙箱轮询在集群内只由一个进程执行：
+轮询前尝试获取该用户的 advisory lock，未获取到的进程保持待命，持有者退出后下一轮自动接手。
+"""
 import asyncio
+import time
 from datetime import datetime
 from pathlib import Path
 
 from daytona import FileUpload
 from src.config import settings
-from src.daytona_client import get_daytona_client
+from src.coordination import get_cluster_locks, lock_key
+from src.daytona_client import get_daytona_client, timed_operation
 from src.utils.get_logger import get_logger
+from src.utils.metrics import SYNC_BYTES, SYNC_LAG_SECONDS
 
 logger = get_logger("workspace-sync")
 
@@ -26,6 +33,7 @@ class RealtimeFileSyncService:
             cls._instance._file_mtimes: dict[str, dict[str, float]] = {}
             cls._instance._poll_interval = settings.SYNC_POLL_INTERVAL
             cls._instance._synced_users: set[str] = set()
+            cls._instance._owned_users: set[str] = set()
             logger.info(f"[FileSync] Initialized, poll_interval={cls._instance._poll_interval}s")
         return cls._instance
     
@@ -41,7 +49,8 @@ class RealtimeFileSyncService:
                 f"{SYNC_WORKSPACE}/{path}",
                 content
             )])
-            logger.debug(f"[FileSync] Synced to sandbox: {path}")
+            SYNC_BYTES.inc(len(content), direction="to_sandbox")
+            logger.debug(f"[FileSync] Synced to sandbox: {path}", extra={"sample_key": "sync_to_sandbox"})
         except Exception as e:
             logger.warning(f"[FileSync] Sync to sandbox failed: {e}")
     
@@ -72,14 +81,32 @@ class RealtimeFileSyncService:
             if user_id in self._file_mtimes:
                 del self._file_mtimes[user_id]
             self._synced_users.discard(user_id)
+            if user_id in self._owned_users:
+                self._owned_users.discard(user_id)
+                get_cluster_locks().release(lock_key("sync-poller", user_id))
             logger.info(f"[FileSync] Stopped polling for user {user_id}")
     
+    async def _acquire_poller(self, user_id: str) -> bool:
+        """尝试成为该用户在集群内唯一的轮询者"""
+        owned = await asyncio.to_thread(get_cluster_locks().try_acquire, lock_key("sync-poller", user_id))
+        if owned and user_id not in self._owned_users:
+            self._owned_users.add(user_id)
+            logger.info(f"[FileSync] Became poller for user {user_id}")
+        elif not owned and user_id in self._owned_users:
+            self._owned_users.discard(user_id)
+            self._file_mtimes.pop(user_id, None)
+            logger.info(f"[FileSync] Poller for user {user_id} moved to another worker")
+        return owned
+    
     async def _poll_sandbox_changes(self, user_id: str):
-        """轮询检测沙箱文件变化（按 user_id）"""
+        """轮询检测沙箱文件变化（按 user_id，集群内仅锁持有者执行）"""
         while True:
             try:
                 await asyncio.sleep(self._poll_interval)
                 
+                if not await self._acquire_poller(user_id):
+                    continue
+                
                 client = get_daytona_client()
                 sandbox_info = client.find_sandbox({"user_id": user_id, "type": "agent"})
                 
@@ -104,11 +131,14 @@ class RealtimeFileSyncService:
         except Exception:
             return
         
-        if user_id not in self._file_mtimes:
+        # 首轮轮询只建立 mtime 基线，不计入同步延迟
+        has_baseline = user_id in self._file_mtimes
+        if not has_baseline:
             self._file_mtimes[user_id] = {}
         mtimes = self._file_mtimes[user_id]
         
         changes = []
+        change_mtimes = []
         for file_info in files:
             if file_info.is_dir:
                 continue
@@ -136,10 +166,15 @@ class RealtimeFileSyncService:
                         continue
                 
                 changes.append(path)
+                if has_baseline and remote_mtime > 0:
+                    change_mtimes.append(remote_mtime)
                 mtimes[path] = remote_mtime
         
         if changes:
             await self._sync_from_sandbox(sandbox, user_id, changes)
+            now = time.time()
+            for remote_mtime in change_mtimes:
+                SYNC_LAG_SECONDS.observe(max(0.0, now - remote_mtime))
     
     async def _sync_from_sandbox(self, sandbox, user_id: str, paths: list[str]):
         """从沙箱同步文件到本地"""
@@ -155,6 +190,7 @@ class RealtimeFileSyncService:
                     local_path = local_workspace / relative
                     local_path.parent.mkdir(parents=True, exist_ok=True)
                     local_path.write_bytes(result.content)
+                    SYNC_BYTES.inc(len(result.content), direction="from_sandbox")
                     logger.info(f"[FileSync] Synced from sandbox: {relative}")
         except Exception as e:
             logger.error(f"[FileSync] Sync from sandbox failed: {e}")
@@ -187,6 +223,7 @@ class RealtimeFileSyncService:
         if files:
             results = sandbox.upload_files(files)
             failed = sum(1 for r in results if r.error)
+            SYNC_BYTES.inc(sum(len(content) for _, content in files), direction="to_sandbox")
         else:
             failed = 0
         
@@ -210,7 +247,10 @@ class RealtimeFileSyncService:
         for fp in local_workspace.rglob("*"):
             if fp.is_file():
                 relative = fp.relative_to(local_workspace)
-                logger.info(f"[FileSync] initial_sync_to_sandbox relative: {relative}")
+                logger.debug(
+                    f"[FileSync] initial_sync_to_sandbox relative: {relative}",
+                    extra={"sample_key": "initial_sync_file"},
+                )
                 try:
                     files.append(FileUpload(
                         source=fp.read_bytes(),
@@ -221,7 +261,9 @@ class RealtimeFileSyncService:
         
         if files:
             try:
-                daytona_sandbox._sandbox.fs.upload_files(files)
+                with timed_operation("upload_files"):
+                    daytona_sandbox._sandbox.fs.upload_files(files)
+                SYNC_BYTES.inc(sum(len(f.source) for f in files), direction="to_sandbox")
                 logger.info(f"[FileSync] Initial sync for user {user_id}: {len(files)} files")
             except Exception as e:
                 logger.error(f"[FileSync] Initial sync failed for user {user_id}: {e}")
@@ -250,6 +292,7 @@ class RealtimeFileSyncService:
                 try:
                     local_path.parent.mkdir(parents=True, exist_ok=True)
                     local_path.write_bytes(result.content)
+                    SYNC_BYTES.inc(len(result.content), direction="from_sandbox")
                     synced += 1
                 except Exception as e:
                     failed += 1
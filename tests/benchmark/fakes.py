@@ -0,0 +1,246 @@
+"""基准测试用的离线替身：假 LLM、内存版 Daytona、内存 checkpointer
+
+- FakeChatModel：按固定脚本回复（write_file → ask_user → 流式文本），可配置逐 token 延迟
+- FakeDaytonaClient / FakeSandbox：沙箱文件落在本地临时目录，所有操作按配置延迟阻塞，
+  与真实 SDK 一样是同步调用，因此事件循环阻塞等问题同样会在基准中暴露
+- MemoryCheckpointer / NullPool：无 Postgres 时替代 AsyncPostgresSaver 与连接池
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from deepagents.backends import FilesystemBackend
+from deepagents.backends.protocol import ExecuteResponse
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.daytona_client import DaytonaClient, timed_operation
+
+SANDBOX_HOME = "/home/daytona"
+DEFAULT_ANSWER = "基准测试完成：已写入 notes 文件并确认用户选择，以下是本轮执行的简要总结。" * 3
+
+
+class FakeChatModel(BaseChatModel):
+    """脚本化的工具调用模型
+
+    以最后一条 HumanMessage 之后的 ToolMessage 数量决定下一步：
+    0 → write_file（build 模式自动批准），1 → ask_user（触发中断），≥2 → 流式输出文本。
+    """
+
+    model_name: str = "fake-llm"
+    token_delay: float = 0.0
+    answer: str = DEFAULT_ANSWER
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _respond(self, messages: list) -> AIMessage:
+        tool_results = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, ToolMessage):
+                tool_results += 1
+
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+        if tool_results == 0:
+            return AIMessage(content="好的，先记录笔记。", tool_calls=[{
+                "name": "write_file",
+                "args": {"file_path": f"{SANDBOX_HOME}/bench/{call_id}.md", "content": "# benchmark\n"},
+                "id": call_id,
+            }])
+        if tool_results == 1:
+            return AIMessage(content="继续之前需要确认。", tool_calls=[{
+                "name": "ask_user",
+                "args": {"questions": [{"question": "继续执行吗？", "options": [{"label": "是", "value": "yes"}]}]},
+                "id": call_id,
+            }])
+        return AIMessage(content=self.answer)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        message = self._respond(messages)
+        for token in re.findall(r".{1,4}", message.content, re.DOTALL):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]))
+
+
+class FakeRouter:
+    """替代 LLMRouter（标题生成）"""
+
+    saturated = False
+
+    def __init__(self, title: str = "基准测试会话"):
+        self.title = title
+
+    async def ainvoke(self, prompt: Any, **kwargs: Any) -> AIMessage:
+        return AIMessage(content=self.title)
+
+
+class FakeFileSystem:
+    """模拟 sandbox.fs（文件同步服务使用）"""
+
+    def __init__(self, root: Path, latency: float):
+        self.root = root
+        self.latency = latency
+
+    def _local(self, path: str) -> Path:
+        return self.root / path.lstrip("/")
+
+    def list_files(self, path: str) -> list:
+        time.sleep(self.latency)
+        directory = self._local(path)
+        if not directory.exists():
+            return []
+        return [
+            SimpleNamespace(
+                name=entry.name,
+                is_dir=entry.is_dir(),
+                mod_time=datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc),
+            )
+            for entry in directory.iterdir()
+        ]
+
+    def upload_files(self, files: list):
+        with timed_operation("upload_files"):
+            time.sleep(self.latency)
+            for file in files:
+                target = self._local(file.destination)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(file.source)
+
+    def delete_file(self, path: str):
+        time.sleep(self.latency)
+        self._local(path).unlink(missing_ok=True)
+
+
+class FakeSandbox(FilesystemBackend):
+    """本地目录模拟的 Agent 沙箱（实现 execute / upload_files / download_files）"""
+
+    def __init__(self, sandbox_id: str, root: Path, labels: dict, latency: float):
+        root.mkdir(parents=True, exist_ok=True)
+        (root / SANDBOX_HOME.lstrip("/")).mkdir(parents=True, exist_ok=True)
+        super().__init__(root_dir=root, virtual_mode=True)
+        self._id = sandbox_id
+        self.labels = labels
+        self.latency = latency
+        self.info = SimpleNamespace(id=sandbox_id, labels=labels)
+        self._sandbox = SimpleNamespace(id=sandbox_id, fs=FakeFileSystem(root, latency))
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    def execute(self, command: str, timeout: int | None = None) -> ExecuteResponse:
+        with timed_operation("execute"):
+            time.sleep(self.latency)
+        return ExecuteResponse(output=f"$ {command}\nok", exit_code=0, truncated=False)
+
+    def upload_files(self, files):
+        with timed_operation("upload_files"):
+            time.sleep(self.latency)
+            return super().upload_files(files)
+
+    def download_files(self, paths):
+        with timed_operation("download_files"):
+            time.sleep(self.latency)
+            return super().download_files(paths)
+
+
+class FakeDaytonaClient(DaytonaClient):
+    """内存版 Daytona 客户端，安装方式：DaytonaClient._instance = FakeDaytonaClient(...)"""
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, root: Path | None = None, latency: float = 0.0, create_latency: float | None = None):
+        # get_daytona_client() 经 DaytonaClient() 返回单例时会再次调用 __init__
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        self.root = Path(root)
+        self.latency = latency
+        self.create_latency = latency * 10 if create_latency is None else create_latency
+        self._sandboxes: dict[str, FakeSandbox] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        raise RuntimeError("FakeDaytonaClient has no SDK client")
+
+    def create_agent_sandbox(self, thread_id: str, user_id: str) -> FakeSandbox:
+        with timed_operation("create"):
+            time.sleep(self.create_latency)
+            sandbox_id = uuid.uuid4().hex
+            labels = {"type": "agent", "thread_id": thread_id, "user_id": user_id}
+            sandbox = FakeSandbox(sandbox_id, self.root / sandbox_id, labels, self.latency)
+        with self._lock:
+            self._sandboxes[sandbox_id] = sandbox
+        return sandbox
+
+    def find_sandbox(self, labels: dict):
+        with timed_operation("find_one"):
+            time.sleep(self.latency)
+            with self._lock:
+                sandboxes = list(self._sandboxes.values())
+        for sandbox in sandboxes:
+            if all(sandbox.labels.get(key) == value for key, value in labels.items()):
+                return sandbox.info
+        return None
+
+    def get_or_create_sandbox(self, thread_id: str, user_id: str) -> FakeSandbox:
+        existing = self.find_sandbox({"thread_id": thread_id, "type": "agent", "user_id": user_id})
+        if existing:
+            return self._sandboxes[existing.id]
+        sandbox = self.create_agent_sandbox(thread_id, user_id)
+        self._initial_sync(user_id, sandbox)
+        return sandbox
+
+    def delete_sandbox(self, sandbox_id: str):
+        with self._lock:
+            self._sandboxes.pop(sandbox_id, None)
+
+
+class MemoryCheckpointer(InMemorySaver):
+    """进程内 checkpointer（接口对齐 AsyncPostgresSaver.setup）"""
+
+    async def setup(self):
+        return None
+
+
+class NullPool:
+    """替代 AsyncConnectionPool（使用 MemoryCheckpointer 时）"""
+
+    async def open(self):
+        return None
+
+    async def close(self):
+        return None
+
+    def get_stats(self) -> dict:
+        return {}
@@ -0,0 +1,382 @@
+"""端到端性能基准（离线，可在 CI 中运行）
+
+在进程内启动 FastAPI 应用（uvicorn），LLM、Daytona 均替换为 fakes.py 中的替身，
+数据库默认使用临时 SQLite（checkpointer 为内存版）；指定 --database-url 为 Postgres
+时使用真实的 AsyncPostgresSaver。N 个并发用户依次执行：
+
+    注册/登录 → 创建会话 → chat(SSE) → 中断恢复(SSE) → 历史 → WebDAV 上传/下载
+
+输出各操作 p50/p95/p99、chat 首 token 时间、吞吐、CPU 与 RSS；可保存为 JSON，
+并与基线对比（p95 超出容忍度时退出码为 1）。
+
+Usage:
+    uv run python -m tests.benchmark.harness --users 20 --iterations 3 --daytona-latency 0.05
+    uv run python -m tests.benchmark.harness --json bench.json --baseline tests/benchmark/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT))
+
+PERCENTILES = (50, 95, 99)
+
+
+def configure_environment(work_dir: Path, database_url: str | None):
+    """在导入 src.config 之前设置基准所需的环境变量（已设置的变量保持不变）"""
+    defaults = {
+        "DATABASE_URL": database_url or f"sqlite:///{work_dir / 'bench.db'}",
+        "WORKSPACE_ROOT": str(work_dir / "workspace"),
+        "SHARED_DIR": str(work_dir / "shared"),
+        "SECRET_KEY": "benchmark-secret",
+        "ACCESS_TOKEN_EXPIRE_HOURS": "1",
+        "PORT": "0",
+        "IS_LANGFUSE": "0",
+        "LANGFUSE_SECRET_KEY": "x",
+        "LANGFUSE_PUBLIC_KEY": "x",
+        "LANGFUSE_BASE_URL": "http://127.0.0.1:9",
+        "ZHIPUAI_API_KEY": "x",
+        "ZHIPUAI_API_BASE": "http://127.0.0.1:9/v1",
+        "OPENAI_API_BASE_8001": "http://127.0.0.1:9/v1",
+        "OPENAI_API_BASE_8002": "http://127.0.0.1:9/v1",
+        "MODELSCOPE_SDK_TOKEN": "x",
+        "MODELSCOPE_URL": "http://127.0.0.1:9/v1",
+        "DOCKER_IMAGE": "benchmark",
+        "CONTAINER_WORKSPACE_DIR": "/workspace",
+        "CONTAINER_SKILLS_DIR": "/skills",
+        "CONTAINER_SHARED_DIR": "/shared",
+        "DAYTONA_SKILLS_SNAPSHOT_ID": "",
+        "RUN_MIGRATIONS_ON_STARTUP": "true",
+        # 基准用户之间共享 127.0.0.1，放宽登录限流
+        "LOGIN_MAX_FAILURES_PER_IP": "1000000",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    for key in ("WORKSPACE_ROOT", "SHARED_DIR"):
+        Path(os.environ[key]).mkdir(parents=True, exist_ok=True)
+
+
+def install_fakes(work_dir: Path, args) -> None:
+    """替换 LLM / Daytona / checkpointer（必须在应用 lifespan 启动前调用）"""
+    import src.agent_manager as agent_module
+    from api.server import get_agent_manager
+    from src.daytona_client import DaytonaClient
+    from tests.benchmark.fakes import FakeChatModel, FakeDaytonaClient, FakeRouter, MemoryCheckpointer, NullPool
+
+    agent_manager = get_agent_manager()
+    agent_module.big_llm = FakeChatModel(token_delay=args.token_delay)
+    agent_manager.title_service.router = FakeRouter()
+    DaytonaClient._instance = FakeDaytonaClient(work_dir / "sandboxes", latency=args.daytona_latency)
+
+    if os.environ["DATABASE_URL"].startswith("sqlite"):
+        agent_module.AsyncPostgresSaver = lambda pool: MemoryCheckpointer()
+        agent_manager.pool = NullPool()
+
+
+class ServerThread(threading.Thread):
+    """在独立线程（独立事件循环）中运行 uvicorn，客户端负载不与服务端共用循环"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+
+    def run(self):
+        self.server.run()
+
+    def start_and_wait(self, timeout: float = 60):
+        self.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join(timeout=30)
+
+
+class ResourceSampler(threading.Thread):
+    """周期采样 RSS，记录峰值；CPU 时间取进程总计（服务端 + 客户端）"""
+
+    def __init__(self, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def current_rss() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_rss = max(self.peak_rss, self.current_rss())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak_rss = max(self.peak_rss, self.current_rss())
+
+
+class Recorder:
+    """按操作记录耗时（秒）与错误"""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, list[str]] = defaultdict(list)
+
+    def add(self, operation: str, seconds: float):
+        self.samples[operation].append(seconds)
+
+    def fail(self, operation: str, message: str):
+        self.errors[operation].append(message)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩百分位"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _timed(recorder: Recorder, operation: str, request, expected: tuple[int, ...] = (200,)):
+    start = time.perf_counter()
+    try:
+        response = await request
+    except Exception as e:
+        recorder.fail(operation, f"{type(e).__name__}: {e}")
+        return None
+    recorder.add(operation, time.perf_counter() - start)
+    if response.status_code not in expected:
+        recorder.fail(operation, f"HTTP {response.status_code}: {response.text[:200]}")
+        return None
+    return response
+
+
+async def _stream_sse(client, recorder: Recorder, operation: str, url: str, payload: dict, headers: dict) -> list[str]:
+    """读取 SSE 直到结束，记录总耗时与首 token 时间，返回事件名列表"""
+    events = []
+    start = time.perf_counter()
+    first_token = None
+    try:
+        async with client.stream("POST", url, json=payload, headers=headers) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                recorder.fail(operation, f"HTTP {response.status_code}: {body[:200]!r}")
+                return events
+            async for line in response.aiter_lines():
+                if not line.startswith("event:"):
+                    continue
+                event = line.split(":", 1)[1].strip()
+                events.append(event)
+                if event == "messages/partial" and first_token is None:
+                    first_token = time.perf_counter() - start
+    except Exception as e:
+        recorder.fail(operation, f"{type(e).__name__}: {e}")
+        return events
+
+    recorder.add(operation, time.perf_counter() - start)
+    if first_token is not None:
+        recorder.add(f"{operation}_ttft", first_token)
+    if "error" in events:
+        recorder.fail(operation, "error event in stream")
+    return events
+
+
+async def run_user(client, recorder: Recorder, index: int, iterations: int, run_id: str, payload: bytes):
+    username = f"bench-{run_id}-{index}"
+    credentials = {"username": username, "password": "benchmark-password"}
+    await _timed(recorder, "register", client.post("/api/auth/register", json=credentials))
+    response = await _timed(recorder, "login", client.post("/api/auth/login", json=credentials))
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(iterations):
+        response = await _timed(recorder, "create_session", client.post("/api/sessions", headers=headers))
+        if response is None:
+            continue
+        thread_id = response.json()["thread_id"]
+
+        events = await _stream_sse(
+            client, recorder, "chat", f"/api/chat/{thread_id}",
+            {"message": "请写一份基准测试笔记，并在继续之前向我确认", "mode": "build"}, headers,
+        )
+        if "interrupt" in events:
+            await _stream_sse(
+                client, recorder, "resume", f"/api/resume/{thread_id}",
+                {"action": "answer", "answers": ["yes"]}, headers,
+            )
+        else:
+            recorder.fail("chat", "no interrupt event")
+
+        await _timed(recorder, "history", client.get(f"/api/history/{thread_id}", headers=headers))
+
+        path = f"/dav/bench/{i}.bin"
+        await _timed(recorder, "webdav_put", client.put(path, content=payload, headers=headers), expected=(200, 201, 204))
+        await _timed(recorder, "webdav_get", client.get(path, headers=headers))
+
+
+async def drive(base_url: str, users: int, iterations: int, payload_size: int) -> tuple[Recorder, float]:
+    import httpx
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    payload = os.urandom(payload_size)
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_user(client, recorder, i, iterations, run_id, payload) for i in range(users)))
+        elapsed = time.perf_counter() - start
+    return recorder, elapsed
+
+
+def summarize(recorder: Recorder, elapsed: float, cpu_seconds: float, peak_rss: int, args) -> dict:
+    operations = {}
+    for operation in sorted(set(recorder.samples) | set(recorder.errors)):
+        values = recorder.samples.get(operation, [])
+        stats = {"count": len(values), "errors": len(recorder.errors.get(operation, []))}
+        if values:
+            stats["mean_ms"] = round(sum(values) / len(values) * 1000, 2)
+            for q in PERCENTILES:
+                stats[f"p{q}_ms"] = round(percentile(values, q) * 1000, 2)
+        operations[operation] = stats
+
+    flows = len(recorder.samples.get("history", []))
+    return {
+        "config": {
+            "users": args.users,
+            "iterations": args.iterations,
+            "daytona_latency": args.daytona_latency,
+            "token_delay": args.token_delay,
+            "payload_bytes": args.payload_bytes,
+            "database": "postgres" if os.environ["DATABASE_URL"].startswith("postgres") else "sqlite",
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "flows_per_second": round(flows / elapsed, 3) if elapsed else 0.0,
+        "cpu_seconds": round(cpu_seconds, 3),
+        "cpu_percent": round(cpu_seconds / elapsed * 100, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+        "operations": operations,
+        "sample_errors": {op: errors[:3] for op, errors in recorder.errors.items()},
+    }
+
+
+def print_report(report: dict):
+    print(f"\nBenchmark: {report['config']}")
+    print(
+        f"elapsed={report['elapsed_seconds']}s flows/s={report['flows_per_second']} "
+        f"cpu={report['cpu_seconds']}s ({report['cpu_percent']}%) peak_rss={report['peak_rss_mb']}MB\n"
+    )
+    print(f"{'operation':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for operation, stats in report["operations"].items():
+        print(
+            f"{operation:<16}{stats['count']:>7}{stats['errors']:>8}"
+            f"{stats.get('p50_ms', '-'):>10}{stats.get('p95_ms', '-'):>10}"
+            f"{stats.get('p99_ms', '-'):>10}{stats.get('mean_ms', '-'):>10}"
+        )
+    for operation, errors in report["sample_errors"].items():
+        print(f"  [{operation}] {errors}")
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """返回 p95 超出基线 (1 + tolerance) 倍的操作"""
+    regressions = []
+    for operation, stats in baseline.get("operations", {}).items():
+        current = report["operations"].get(operation, {})
+        if "p95_ms" not in stats or "p95_ms" not in current:
+            continue
+        limit = stats["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit:
+            regressions.append(f"{operation}: p95 {current['p95_ms']}ms > {limit:.2f}ms (baseline {stats['p95_ms']}ms)")
+    return regressions
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_benchmark(args) -> dict:
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="agent-bench-"))
+    configure_environment(work_dir, args.database_url)
+
+    import main
+
+    install_fakes(work_dir, args)
+
+    server = ServerThread(main.app, _free_port())
+    server.start_and_wait()
+    base_url = f"http://127.0.0.1:{server.server.config.port}"
+
+    sampler = ResourceSampler()
+    sampler.start()
+    cpu_start = time.process_time()
+    try:
+        recorder, elapsed = asyncio.run(drive(base_url, args.users, args.iterations, args.payload_bytes))
+    finally:
+        cpu_seconds = time.process_time() - cpu_start
+        sampler.stop()
+        server.stop()
+
+    return summarize(recorder, elapsed, cpu_seconds, sampler.peak_rss, args)
+
+
+def parse_args(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark")
+    parser.add_argument("--users", type=int, default=10, help="concurrent users")
+    parser.add_argument("--iterations", type=int, default=3, help="flows per user")
+    parser.add_argument("--daytona-latency", type=float, default=0.02, help="fake Daytona latency per call (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake LLM delay per streamed token (s)")
+    parser.add_argument("--payload-bytes", type=int, default=64 * 1024, help="WebDAV upload size")
+    parser.add_argument("--database-url", default=None, help="Postgres URL; defaults to a temporary SQLite file")
+    parser.add_argument("--work-dir", default=None, help="directory for the database, workspaces and sandboxes")
+    parser.add_argument("--json", default=None, help="write the report to this file")
+    parser.add_argument("--baseline", default=None, help="baseline report to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 regression ratio")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    exit_code = 0
+    if any(stats["errors"] for stats in report["operations"].values()):
+        print("\nFAILED: some operations returned errors")
+        exit_code = 1
+    if args.baseline:
+        regressions = compare_with_baseline(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        exit_code = exit_code or (1 if regressions else 0)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
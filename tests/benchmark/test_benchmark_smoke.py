@@ -0,0 +1,51 @@
+"""基准 harness 冒烟测试：2 个用户各跑 1 轮完整流程，不允许出现错误
+
+基准会修改进程内单例（Daytona 客户端、LLM），因此在子进程中运行。
+
+Usage:
+    uv run python -m pytest tests/benchmark/test_benchmark_smoke.py
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def test_benchmark_smoke():
+    pytest.importorskip("uvicorn")
+    pytest.importorskip("httpx")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = Path(tmp) / "report.json"
+        result = subprocess.run(
+            [
+                sys.executable, "-m", "tests.benchmark.harness",
+                "--users", "2", "--iterations", "1", "--daytona-latency", "0",
+                "--work-dir", str(Path(tmp) / "work"), "--json", str(report_path),
+            ],
+            cwd=ROOT, capture_output=True, text=True, timeout=600,
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+        for operation in ("login", "create_session", "chat", "chat_ttft", "resume", "history", "webdav_put", "webdav_get"):
+            assert report["operations"][operation]["count"] > 0, operation
+
+
+def test_percentile_and_baseline_comparison():
+    sys.path.insert(0, str(ROOT))
+    from tests.benchmark.harness import compare_with_baseline, percentile
+
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+
+    baseline = {"operations": {"chat": {"p95_ms": 100.0}, "history": {"p95_ms": 10.0}}}
+    report = {"operations": {"chat": {"p95_ms": 130.0}, "history": {"p95_ms": 11.0}}}
+    regressions = compare_with_baseline(report, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("chat")
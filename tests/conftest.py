@@ -0,0 +1,35 @@
+"""pytest 共享 fixture
+
+temp_db：把 src.database 的 engine / SessionLocal（以及已按名导入它们的模块）替换为临时 sqlite，
+测试中的清表、写入不会触及 DATABASE_URL 指向的真实数据库。
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def temp_db(monkeypatch, tmp_path):
+    """每个测试一个独立的 sqlite 数据库（已建好全部表），返回 sessionmaker"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import src.database as database
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    replacements = {"engine": (database.engine, engine), "SessionLocal": (database.SessionLocal, session_local)}
+
+    for name, module in list(sys.modules.items()):
+        if module is None or not name.startswith(("src.", "api.")):
+            continue
+        for attr, (original, replacement) in replacements.items():
+            if getattr(module, attr, None) is original:
+                monkeypatch.setattr(module, attr, replacement)
+
+    database.Base.metadata.create_all(engine)
+    yield session_local
+    engine.dispose()
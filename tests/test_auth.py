@@ -0,0 +1,136 @@
+"""认证测试：登录失败限流（滑动窗口）、用户/角色缓存（临时 sqlite）
+
+Usage:
+    uv run python -m pytest tests/test_auth.py
+    uv run python tests/test_auth.py
+"""
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+import src.auth as auth
+from src.auth import LoginThrottle, get_principal, invalidate_principal
+from src.config import settings
+from src.database import User
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的 monotonic 时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(auth, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(settings, "LOGIN_FAILURE_WINDOW_SECONDS", 60)
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILURES_PER_USER", 3)
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILURES_PER_IP", 5)
+    monkeypatch.setattr(settings, "REGISTER_MAX_PER_IP", 2)
+    return now
+
+
+def test_user_limit_blocks_until_window_passes(clock):
+    throttle = LoginThrottle()
+    for _ in range(2):
+        throttle.record_failure("alice", "10.0.0.1")
+        clock[0] += 10
+    assert throttle.retry_after("alice", "10.0.0.1") == 0
+
+    throttle.record_failure("alice", "10.0.0.1")
+    # 最早一次失败在 t=1000，窗口 60s，当前 t=1020
+    assert throttle.retry_after("alice", "10.0.0.1") == 41
+    assert throttle.retry_after("bob", "10.0.0.2") == 0
+
+    clock[0] += 39.5
+    assert throttle.retry_after("alice", None) == 1
+    clock[0] += 0.5
+    assert throttle.retry_after("alice", None) == 0
+
+
+def test_ip_limit_spans_usernames(clock):
+    throttle = LoginThrottle()
+    for i in range(5):
+        throttle.record_failure(f"user{i}", "10.0.0.1")
+    assert throttle.retry_after("someone-else", "10.0.0.1") == 61
+    assert throttle.retry_after("someone-else", "10.0.0.2") == 0
+    assert throttle.retry_after("someone-else", None) == 0
+
+
+def test_successful_login_resets_user_but_not_ip(clock):
+    throttle = LoginThrottle()
+    for _ in range(5):
+        throttle.record_failure("alice", "10.0.0.1")
+    assert throttle.retry_after("alice", None) > 0
+    throttle.reset("alice")
+    assert throttle.retry_after("alice", None) == 0
+    assert throttle.retry_after("alice", "10.0.0.1") > 0
+
+
+def test_register_attempts_are_limited_per_ip(clock):
+    throttle = LoginThrottle()
+    for _ in range(2):
+        assert throttle.register_retry_after("10.0.0.1") == 0
+        throttle.record_register("10.0.0.1")
+    assert throttle.register_retry_after("10.0.0.1") == 61
+    assert throttle.register_retry_after("10.0.0.2") == 0
+    # 注册计数与登录失败计数互不影响
+    assert throttle.retry_after("alice", "10.0.0.1") == 0
+    clock[0] += 60
+    assert throttle.register_retry_after("10.0.0.1") == 0
+
+
+@pytest.fixture
+def users(temp_db):
+    """临时库中只有 alice（u1），返回 sessionmaker"""
+    with temp_db() as db:
+        db.add(User(user_id="u1", username="alice", password_hash="x", is_admin=False))
+        db.commit()
+    invalidate_principal()
+    yield temp_db
+    invalidate_principal()
+
+
+def _set_admin(sessions, user_id: str, is_admin: bool):
+    with sessions() as db:
+        db.query(User).filter(User.user_id == user_id).update({"is_admin": is_admin})
+        db.commit()
+
+
+def test_principal_is_cached_until_invalidated(users):
+    principal = get_principal("u1")
+    assert (principal.username, principal.is_admin) == ("alice", False)
+
+    _set_admin(users, "u1", True)
+    assert get_principal("u1") is principal
+
+    invalidate_principal("u1")
+    assert get_principal("u1").is_admin
+
+
+def test_missing_user_is_negatively_cached(users):
+    assert get_principal("ghost") is None
+    with users() as db:
+        db.add(User(user_id="ghost", username="ghost", password_hash="x", is_admin=True))
+        db.commit()
+    # 负缓存：未过期前仍视为不存在，不重复查库
+    assert get_principal("ghost") is None
+
+    invalidate_principal()
+    assert get_principal("ghost").is_admin
+
+
+def test_invalidation_from_other_worker_drops_cache(users):
+    from src.coordination import get_cluster_events
+
+    assert not get_principal("u1").is_admin
+    _set_admin(users, "u1", True)
+    # 模拟其他 worker 修改角色后经 NOTIFY 到达的失效通知
+    events = get_cluster_events()
+    events._on_notify(json.dumps({"o": "other-worker", "c": auth.PRINCIPAL_CHANNEL, "p": {"user_id": "u1"}}))
+    assert get_principal("u1").is_admin
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
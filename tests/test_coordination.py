@@ -0,0 +1,165 @@
+"""多 worker 协调测试
+
+进程内退化实现（sqlite）总是运行；设置 COORDINATION_TEST_DATABASE_URL（Postgres）后，
+以两个 ClusterLocks / ClusterEvents 实例模拟两个 worker 验证 advisory lock 与 LISTEN/NOTIFY。
+
+Usage:
+    uv run python -m pytest tests/test_coordination.py
+    COORDINATION_TEST_DATABASE_URL=postgresql://... uv run python tests/test_coordination.py
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.agent_skills.validation_events import EVENTS_CHANNEL, ValidationEventBus
+from src.coordination import (
+    ClusterEvents,
+    ClusterLocks,
+    ClusterSemaphore,
+    cluster_mutex,
+    get_cluster_events,
+    lock_key,
+)
+
+PG_URL = os.environ.get("COORDINATION_TEST_DATABASE_URL")
+requires_postgres = pytest.mark.skipif(not PG_URL, reason="COORDINATION_TEST_DATABASE_URL not set")
+
+
+def test_lock_key_is_stable_and_signed_64bit():
+    assert lock_key("sync-poller", "u1") == lock_key("sync-poller", "u1")
+    assert lock_key("sync-poller", "u1") != lock_key("sync-poller", "u2")
+    assert -2 ** 63 <= lock_key("snapshot-build") < 2 ** 63
+
+
+def test_semaphore_limits_concurrency():
+    semaphore = ClusterSemaphore("test-limit", 2, poll_interval=0.01)
+    active = peak = 0
+
+    async def work():
+        nonlocal active, peak
+        async with semaphore.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*(work() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+
+
+def test_cluster_mutex_serializes_threads():
+    key = lock_key("test-mutex")
+    inside = []
+
+    def worker(index):
+        with cluster_mutex(key):
+            inside.append(("enter", index))
+            time.sleep(0.01)
+            inside.append(("exit", index))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i in range(0, len(inside), 2):
+        assert inside[i][0] == "enter" and inside[i + 1] == ("exit", inside[i][1])
+
+
+def test_remote_events_skip_own_origin():
+    events = ClusterEvents(None)
+    received = []
+    events.subscribe("ch", received.append)
+    events.publish("ch", {"n": 1})
+    events._on_notify(json.dumps({"o": events._origin, "c": "ch", "p": {"n": 2}}))
+    events._on_notify(json.dumps({"o": "other-worker", "c": "ch", "p": {"n": 3}}))
+    assert received == [{"n": 1}, {"n": 3}]
+
+
+def test_validation_events_from_other_worker_reach_subscribers():
+    bus = ValidationEventBus()
+
+    async def main():
+        queue = bus.subscribe("skill-1")
+        # 模拟其他 worker 的事件经监听线程到达
+        listener = threading.Thread(target=bus._on_event, args=({"skill_id": "skill-1", "stage": "started", "elapsed": 0},))
+        listener.start()
+        listener.join()
+        event = await asyncio.wait_for(queue.get(), timeout=1)
+        assert event["stage"] == "started"
+        assert bus.is_running("skill-1")
+
+        bus._on_event({"skill_id": "skill-1", "stage": "completed", "elapsed": 3.2})
+        assert (await queue.get())["stage"] == "completed"
+        assert not bus.is_running("skill-1")
+
+    asyncio.run(main())
+
+
+def test_validation_bus_is_registered_on_cluster_channel():
+    bus = ValidationEventBus()
+
+    async def main():
+        queue = bus.subscribe("skill-2")
+        bus.publish("skill-2", "started")
+        assert (await queue.get())["stage"] == "started"
+
+    asyncio.run(main())
+    assert bus._on_event in get_cluster_events()._handlers[EVENTS_CHANNEL]
+
+
+@requires_postgres
+def test_advisory_lock_single_owner_and_failover():
+    first, second = ClusterLocks(PG_URL), ClusterLocks(PG_URL)
+    key = lock_key("test-owner", str(time.time()))
+    try:
+        assert first.try_acquire(key)
+        assert first.try_acquire(key)
+        assert not second.try_acquire(key)
+        # 持有者进程退出（连接关闭）后，锁自动释放
+        first.close()
+        assert second.try_acquire(key)
+    finally:
+        first.close()
+        second.close()
+
+
+@requires_postgres
+def test_notify_reaches_other_worker():
+    from src.coordination import NOTIFY_CHANNEL
+
+    import psycopg
+
+    receiver = ClusterEvents(PG_URL)
+    received = threading.Event()
+    receiver.subscribe("test", lambda payload: received.set() if payload == {"ok": True} else None)
+    time.sleep(0.5)
+    message = json.dumps({"o": "sender", "c": "test", "p": {"ok": True}})
+    with psycopg.connect(PG_URL, autocommit=True) as conn:
+        conn.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, message))
+    try:
+        assert received.wait(5)
+    finally:
+        receiver.close()
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        if not PG_URL and any(mark.name == "skipif" for mark in getattr(test, "pytestmark", [])):
+            print(f"  [SKIP] {test.__name__}")
+            continue
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
@@ -0,0 +1,135 @@
+"""持久化任务队列测试：领取 → 失败 → 退避重排 → 租约过期回收（临时 sqlite）
+
+Usage:
+    uv run python -m pytest tests/test_job_queue.py
+    uv run python tests/test_job_queue.py
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.config import settings
+import src.database as database
+from src.database import ValidationJob
+from src.job_queue import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JobQueue
+
+
+@pytest.fixture(autouse=True)
+def queue_settings(monkeypatch, temp_db):
+    monkeypatch.setattr(settings, "JOB_QUEUE_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "JOB_QUEUE_GLOBAL_CONCURRENCY", 5)
+
+
+def _job(job_id: str) -> ValidationJob:
+    with database.SessionLocal() as db:
+        return db.query(ValidationJob).filter(ValidationJob.job_id == job_id).first()
+
+
+def _make_runnable(job_id: str):
+    with database.SessionLocal() as db:
+        db.query(ValidationJob).filter(ValidationJob.job_id == job_id).update({"run_after": datetime.utcnow()})
+        db.commit()
+
+
+def _expire_lease(job_id: str):
+    with database.SessionLocal() as db:
+        db.query(ValidationJob).filter(ValidationJob.job_id == job_id).update(
+            {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+
+
+def test_enqueue_dedupes_active_jobs():
+    queue = JobQueue()
+    first = queue.enqueue("validate", {"skill_id": "s1"}, dedupe_key="s1")
+    assert queue.enqueue("validate", {"skill_id": "s1"}, dedupe_key="s1") == first
+    assert queue.enqueue("validate", {"skill_id": "s2"}, dedupe_key="s2") != first
+
+
+def test_concurrent_enqueue_creates_one_job():
+    queue = JobQueue()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        job_ids = set(pool.map(lambda _: queue.enqueue("validate", {"skill_id": "s1"}, dedupe_key="s1"), range(16)))
+    assert len(job_ids) == 1
+    with database.SessionLocal() as db:
+        assert db.query(ValidationJob).count() == 1
+
+
+def test_claim_fail_backoff_and_lease_reclaim():
+    queue = JobQueue()
+    job_id = queue.enqueue("validate", {"skill_id": "s1"})
+
+    job_id_claimed, job_type, payload, attempt = queue._claim()
+    assert (job_id_claimed, job_type, payload, attempt) == (job_id, "validate", {"skill_id": "s1"}, 1)
+    assert _job(job_id).status == JOB_RUNNING
+    assert queue._claim() is None
+
+    # 失败后按退避重新排队，run_after 之前不可领取
+    queue._retry_or_fail(job_id, "RuntimeError: boom")
+    job = _job(job_id)
+    assert job.status == JOB_QUEUED and job.lease_owner is None
+    assert job.run_after > datetime.utcnow()
+    assert queue._claim() is None
+
+    # 第二次尝试的 worker 崩溃：租约过期后回收，已达最大次数则标记失败
+    _make_runnable(job_id)
+    assert queue._claim()[3] == 2
+    crashed = JobQueue()
+    _expire_lease(job_id)
+    assert crashed.requeue_expired() == 1
+    job = _job(job_id)
+    assert job.status == JOB_FAILED and job.error == "Lease expired"
+
+
+def test_expired_lease_is_requeued_for_another_worker():
+    first, second = JobQueue(), JobQueue()
+    job_id = first.enqueue("validate", {})
+    assert first._claim()[0] == job_id
+    _expire_lease(job_id)
+    assert second.requeue_expired() == 1
+    assert _job(job_id).status == JOB_QUEUED
+
+    claimed = second._claim()
+    assert claimed[0] == job_id and claimed[3] == 2
+    assert _job(job_id).lease_owner == second.worker_id
+    # 原 worker 已失去租约，续约返回"需中断"
+    assert first._renew_lease(job_id) is True
+    assert second._renew_lease(job_id) is False
+
+
+def test_worker_runs_handler_to_completion(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "JOB_QUEUE_WORKER_SLOTS", 1)
+    queue = JobQueue()
+    seen = []
+
+    async def handler(ctx):
+        seen.append(ctx.payload["n"])
+        ctx.report(50, "half")
+        return {"ok": True}
+
+    queue.register("echo", handler)
+    job_id = queue.enqueue("echo", {"n": 1})
+
+    async def main():
+        await queue.start()
+        for _ in range(200):
+            if queue.get(job_id)["status"] == JOB_SUCCEEDED:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(main())
+    job = queue.get(job_id)
+    assert seen == [1]
+    assert job["status"] == JOB_SUCCEEDED and job["result"] == {"ok": True} and job["progress"] == 100
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
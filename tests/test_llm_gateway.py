@@ -0,0 +1,144 @@
+"""LLM 网关测试：令牌桶限速、ModelGate 并发闸门与健康统计、抖动重试（不调用真实 LLM）
+
+Usage:
+    uv run python -m pytest tests/test_llm_gateway.py
+    uv run python tests/test_llm_gateway.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_openai import ChatOpenAI
+
+import src.llm_gateway as gateway
+from src.llm_gateway import (
+    BACKOFF_BASE_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    GatedChatOpenAI,
+    ModelGate,
+    TokenBucket,
+    backoff_delay,
+)
+
+
+def _rate_limit_error() -> openai.RateLimitError:
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    return openai.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+def _model(name: str, max_retries: int = 2) -> GatedChatOpenAI:
+    return GatedChatOpenAI(
+        model=name, base_url="http://llm.test/v1", api_key="test", max_retries=0,
+        gate_name=name, gateway_max_retries=max_retries,
+    )
+
+
+@pytest.fixture
+def flaky_upstream(monkeypatch):
+    """上游先失败 failures 次再成功，记录调用次数；退避时间置零"""
+    state = {"failures": 0, "calls": 0, "error": _rate_limit_error}
+
+    async def agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        state["calls"] += 1
+        if state["calls"] <= state["failures"]:
+            raise state["error"]()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", agenerate)
+    monkeypatch.setattr(gateway, "backoff_delay", lambda attempt: 0)
+    return state
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket._try_take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket._try_take()
+    assert 0 < wait <= 0.1
+
+    async def main():
+        start = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.05
+
+
+def test_model_gate_limits_concurrency_and_tracks_waiting():
+    gate = ModelGate("gate-concurrency", max_concurrency=2, rate_limit=0, rate_burst=1)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with gate.slot():
+            peak = max(peak, gate.in_flight)
+            await asyncio.sleep(0.02)
+
+    async def main():
+        tasks = [asyncio.create_task(call()) for _ in range(5)]
+        await asyncio.sleep(0.005)
+        assert gate.saturated and gate.waiting == 3
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert peak == 2
+    assert gate.in_flight == gate.waiting == 0 and not gate.saturated
+    assert gate.total_calls == 5 and gate.max_wait_seconds > 0
+
+
+def test_model_gate_health_window():
+    gate = ModelGate("gate-health", max_concurrency=1, rate_limit=0, rate_burst=1)
+    assert gate.health() == {"samples": 0, "p50_ms": None, "p95_ms": None, "error_rate": 0.0}
+    for latency in (0.1, 0.2, 0.3):
+        gate.record(latency, ok=True)
+    gate.record(5.0, ok=False)
+    health = gate.health()
+    assert health["samples"] == 4
+    assert health["error_rate"] == 0.25
+    # 失败调用不计入延迟分位数
+    assert health["p50_ms"] == 200.0 and health["p95_ms"] == 300.0
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    for attempt in range(1, 12):
+        cap = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+        assert all(0 <= backoff_delay(attempt) <= cap for _ in range(50))
+
+
+def test_retryable_error_is_retried(flaky_upstream):
+    flaky_upstream["failures"] = 2
+    model = _model("gate-retry")
+    result = asyncio.run(model.ainvoke([HumanMessage(content="hi")]))
+    assert result.content == "ok"
+    assert flaky_upstream["calls"] == 3
+    assert model.gate.retries == 2 and model.gate.errors == 0
+    assert model.gate.health()["samples"] == 3
+
+
+def test_retries_exhausted_raises(flaky_upstream):
+    flaky_upstream["failures"] = 10
+    model = _model("gate-exhausted", max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(model.ainvoke([HumanMessage(content="hi")]))
+    assert flaky_upstream["calls"] == 3
+    assert model.gate.errors == 1
+    assert model.gate.in_flight == 0
+
+
+def test_non_retryable_error_is_not_retried(flaky_upstream):
+    flaky_upstream.update(failures=1, error=lambda: ValueError("bad request"))
+    model = _model("gate-fatal")
+    with pytest.raises(ValueError):
+        asyncio.run(model.ainvoke([HumanMessage(content="hi")]))
+    assert flaky_upstream["calls"] == 1 and model.gate.retries == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,126 @@
+"""LLM 路由测试：对冲请求的取消与故障转移（假模型，无需调用 LLM）
+
+Usage:
+    uv run python -m pytest tests/test_llm_router.py
+    uv run python tests/test_llm_router.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import settings
+from src.llm_gateway import ModelGate
+from src.llm_router import LLMRouter
+
+
+class FakeModel:
+    """只实现路由器用到的接口：gate_name / gate / ainvoke"""
+
+    def __init__(self, name: str, delay: float = 0, error: Exception | None = None):
+        self.gate_name = name
+        self.gate = ModelGate(name, max_concurrency=4, rate_limit=0, rate_burst=1)
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, input, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"{self.gate_name}:{input}"
+
+
+def _with_settings(hedge_delay: float, timeout: float):
+    original = settings.LLM_ROUTER_HEDGE_DELAY, settings.LLM_ROUTER_TIMEOUT
+    settings.LLM_ROUTER_HEDGE_DELAY, settings.LLM_ROUTER_TIMEOUT = hedge_delay, timeout
+    return original
+
+
+def _restore(original):
+    settings.LLM_ROUTER_HEDGE_DELAY, settings.LLM_ROUTER_TIMEOUT = original
+
+
+def test_hedge_returns_faster_backup():
+    slow, fast = FakeModel("slow", delay=1), FakeModel("fast", delay=0.01)
+    original = _with_settings(hedge_delay=0.05, timeout=5)
+    try:
+        result = asyncio.run(LLMRouter("t", [slow, fast]).ainvoke("hi"))
+    finally:
+        _restore(original)
+    assert result == "fast:hi"
+    assert slow.cancelled == 1
+
+
+def _invoke_until_timeout(router: LLMRouter):
+    async def main():
+        try:
+            await router.ainvoke("hi")
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+def test_timeout_before_hedge_cancels_primary():
+    primary, backup = FakeModel("a", delay=1), FakeModel("b", delay=1)
+    original = _with_settings(hedge_delay=0.5, timeout=0.05)
+    try:
+        _invoke_until_timeout(LLMRouter("t", [primary, backup]))
+    finally:
+        _restore(original)
+    # 主模型在对冲前超时被取消，随后单独故障转移到备用模型（同样超时）
+    assert primary.calls == 1 and primary.cancelled == 1
+    assert backup.calls == 1 and backup.cancelled == 1
+
+
+def test_timeout_after_hedge_cancels_both():
+    primary, backup = FakeModel("a", delay=1), FakeModel("b", delay=1)
+    original = _with_settings(hedge_delay=0.02, timeout=0.1)
+    try:
+        _invoke_until_timeout(LLMRouter("t", [primary, backup]))
+    finally:
+        _restore(original)
+    assert primary.cancelled == 1
+    assert backup.cancelled == 1
+
+
+def test_failed_hedge_backup_is_not_retried():
+    primary = FakeModel("a", delay=0.1, error=RuntimeError("a down"))
+    backup = FakeModel("b", delay=0.1, error=RuntimeError("b down"))
+    third = FakeModel("c")
+    original = _with_settings(hedge_delay=0.02, timeout=5)
+    try:
+        result = asyncio.run(LLMRouter("t", [primary, backup, third]).ainvoke("hi"))
+    finally:
+        _restore(original)
+    assert result == "c:hi"
+    assert backup.calls == 1
+
+
+def test_fast_primary_failure_fails_over_without_hedge():
+    primary = FakeModel("a", error=RuntimeError("a down"))
+    backup = FakeModel("b")
+    original = _with_settings(hedge_delay=1, timeout=5)
+    try:
+        result = asyncio.run(LLMRouter("t", [primary, backup]).ainvoke("hi"))
+    finally:
+        _restore(original)
+    assert result == "b:hi"
+    assert backup.calls == 1
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
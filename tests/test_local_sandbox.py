@@ -0,0 +1,118 @@
+"""local 沙箱后端测试（无需 Daytona）
+
+Usage:
+    uv run python -m pytest tests/test_local_sandbox.py
+    uv run python tests/test_local_sandbox.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from daytona import CreateSandboxFromSnapshotParams, FileUpload
+from langchain_daytona import DaytonaSandbox
+
+from src.sandbox_provider import LocalSandboxError, LocalSandboxProvider
+
+
+def _provider(**kwargs) -> LocalSandboxProvider:
+    return LocalSandboxProvider(tempfile.mkdtemp(prefix="local-sandbox-"), **kwargs)
+
+
+def test_exec_maps_sandbox_paths():
+    sandbox = _provider().create()
+    sandbox.fs.upload_file(b"hello", "/tmp/a.txt")
+    response = sandbox.process.exec("mkdir -p /skills/demo && cp /tmp/a.txt /skills/demo/ && ls /skills/demo && pwd")
+    assert response.exit_code == 0, response.result
+    assert response.result.split() == ["a.txt", "/home/daytona"]
+    assert sandbox.fs.download_file("/skills/demo/a.txt") == b"hello"
+    assert sandbox.process.exec("exit 3").exit_code == 3
+
+
+def test_fs_batch_and_listing():
+    sandbox = _provider().create()
+    sandbox.fs.upload_files([FileUpload(source=b"1", destination="/home/daytona/workspace/x.txt")])
+    names = [entry.name for entry in sandbox.fs.list_files("/home/daytona/workspace")]
+    assert names == ["x.txt"]
+    sandbox.fs.delete_file("/home/daytona/workspace/x.txt")
+    assert sandbox.fs.list_files("/home/daytona/workspace") == []
+
+    try:
+        sandbox.fs.download_file("/../../etc/passwd")
+        raise AssertionError("path escape not rejected")
+    except LocalSandboxError:
+        pass
+
+
+def test_snapshot_roundtrip():
+    provider = _provider()
+    builder = provider.create()
+    builder.fs.upload_file(b'{"demo": "abc"}', "/skills/.manifest.json")
+    snapshot = provider.create_snapshot(builder.id, name="skills-test")
+    provider.delete(builder)
+
+    sandbox = provider.create(CreateSandboxFromSnapshotParams(snapshot=snapshot.id))
+    assert sandbox.fs.download_file("/skills/.manifest.json") == b'{"demo": "abc"}'
+    # 快照内容与沙箱相互独立
+    sandbox.fs.upload_file(b"changed", "/skills/.manifest.json")
+    assert provider.create(CreateSandboxFromSnapshotParams(snapshot=snapshot.id)).fs.download_file(
+        "/skills/.manifest.json") == b'{"demo": "abc"}'
+
+    assert [s.name for s in provider.list_snapshots()] == ["skills-test"]
+    provider.delete_snapshot(snapshot.id)
+    assert provider.list_snapshots() == []
+
+
+def test_find_one_by_labels_survives_restart():
+    provider = _provider()
+    created = provider.create(SimpleNamespace(labels={"type": "agent", "thread_id": "t1"}))
+    provider.create(SimpleNamespace(labels={"type": "agent", "thread_id": "t2"}))
+
+    reopened = LocalSandboxProvider(provider.root)
+    assert reopened.find_one(labels={"thread_id": "t1", "type": "agent"}).id == created.id
+    try:
+        reopened.find_one(labels={"thread_id": "missing"})
+        raise AssertionError("expected not found")
+    except LocalSandboxError:
+        pass
+
+
+def test_langchain_backend_execute_and_files():
+    backend = DaytonaSandbox(sandbox=_provider().create())
+    response = backend.execute("echo ok && echo warn >&2")
+    assert response.exit_code == 0
+    assert "ok" in response.output
+    backend.upload_files([("/home/daytona/note.md", b"# note")])
+    assert backend.download_files(["/home/daytona/note.md"])[0].content == b"# note"
+
+
+def test_network_block_sets_unreachable_proxy():
+    sandbox = _provider().create(CreateSandboxFromSnapshotParams(network_block_all=True))
+    assert sandbox.process.exec("echo $HTTPS_PROXY").result.strip() == "http://127.0.0.1:9"
+
+
+def test_injected_latency_and_failures():
+    provider = _provider(latency=0.02)
+    start = time.perf_counter()
+    provider.create()
+    assert time.perf_counter() - start >= 0.02
+
+    flaky = _provider(failure_rate=0.5, seed=7)
+    failures = 0
+    for _ in range(40):
+        try:
+            flaky.list_snapshots()
+        except LocalSandboxError:
+            failures += 1
+    assert 5 < failures < 35
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
@@ -0,0 +1,143 @@
+"""异步结构化日志测试
+
+Usage:
+    uv run python -m pytest tests/test_logging.py
+    uv run python tests/test_logging.py
+"""
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import get_logger as log_module
+from src.utils.get_logger import (
+    configure_logging, get_log_levels, get_logger, log_context, set_log_level, shutdown_logging,
+)
+from src.utils.get_root_path import get_project_root
+
+
+def _records(name: str) -> list[dict]:
+    shutdown_logging()
+    path = get_project_root() / "logs" / f"{name}.log"
+    lines = path.read_text(encoding="utf-8").splitlines()
+    path.unlink()
+    return [json.loads(line) for line in lines]
+
+
+def _name() -> str:
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_json_records_carry_context():
+    configure_logging(fmt="json")
+    name = _name()
+    logger = get_logger(name)
+
+    async def run(thread_id: str):
+        with log_context(thread_id=thread_id, user_id="u1", run_id=f"run-{thread_id}"):
+            await asyncio.sleep(0)
+            logger.info(f"in {thread_id}")
+
+    async def main():
+        await asyncio.gather(run("t1"), run("t2"))
+        logger.info("outside")
+
+    asyncio.run(main())
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("failed")
+
+    records = {r["msg"]: r for r in _records(name)}
+    assert records["in t1"]["thread_id"] == "t1" and records["in t1"]["run_id"] == "run-t1"
+    assert records["in t2"]["thread_id"] == "t2"
+    assert "thread_id" not in records["outside"]
+    assert "RuntimeError: boom" in records["failed"]["exc"]
+
+
+def test_sampling_keeps_one_in_n():
+    configure_logging(sample_every=10)
+    name = _name()
+    logger = get_logger(name)
+    for i in range(35):
+        logger.info(f"file {i}", extra={"sample_key": "per_file"})
+    logger.info("summary")
+
+    messages = [r["msg"] for r in _records(name)]
+    assert messages == ["file 0", "file 10", "file 20", "file 30", "summary"]
+    configure_logging(sample_every=100)
+
+
+def test_runtime_level_change():
+    name = _name()
+    logger = get_logger(name)
+    logger.debug("hidden")
+    set_log_level(name, "debug")
+    assert get_log_levels()[name] == "DEBUG"
+    logger.debug("shown")
+    set_log_level(name, logging.INFO)
+
+    assert [r["msg"] for r in _records(name)] == ["shown"]
+
+
+def test_slow_disk_does_not_block_caller():
+    name = _name()
+    logger = get_logger(name)
+    original = log_module._RoutingHandler.emit
+
+    def slow_emit(self, record):
+        time.sleep(0.05)
+        original(self, record)
+
+    shutdown_logging()
+    log_module._RoutingHandler.emit = slow_emit
+    try:
+        start = time.perf_counter()
+        for i in range(20):
+            logger.info(f"line {i}")
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.2, f"logging blocked the caller for {elapsed:.3f}s"
+        assert len(_records(name)) == 20
+    finally:
+        log_module._RoutingHandler.emit = original
+
+
+def test_shutdown_during_concurrent_logging_loses_nothing():
+    name = _name()
+    logger = get_logger(name)
+    stop = threading.Event()
+    counts = [0] * 4
+
+    def writer(index: int):
+        while not stop.is_set():
+            logger.info(f"{index}-{counts[index]}")
+            counts[index] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(20):
+            shutdown = threading.Thread(target=shutdown_logging, daemon=True)
+            shutdown.start()
+            shutdown.join(5)
+            assert not shutdown.is_alive(), "shutdown_logging hung"
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert len(_records(name)) == sum(counts)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
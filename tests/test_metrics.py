@@ -0,0 +1,66 @@
+"""指标注册表测试（无需启动服务）
+
+Usage:
+    uv run python -m pytest tests/test_metrics.py
+    uv run python tests/test_metrics.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Requests", ("route",))
+    active = registry.gauge("demo_active", "Active")
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    with active.track_inprogress():
+        assert active.value() == 1
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{route="/a"} 3' in text
+    assert "demo_active 0" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Latency", ("op",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, op="x")
+    text = registry.render()
+    assert 'demo_seconds_bucket{op="x",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{op="x",le="1"} 2' in text
+    assert 'demo_seconds_bucket{op="x",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{op="x"} 3' in text
+
+
+def test_label_mismatch_and_duplicate_registration():
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "Demo", ("a",))
+    assert registry.counter("demo_total", "Demo", ("a",)) is counter
+    try:
+        counter.inc(b="1")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for wrong labels")
+
+
+def test_collector_runs_on_render():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("demo_pool_size", "Pool size")
+    registry.add_collector(lambda: gauge.set(7))
+    registry.add_collector(lambda: 1 / 0)
+    assert "demo_pool_size 7" in registry.render()
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
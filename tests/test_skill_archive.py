@@ -0,0 +1,103 @@
+"""Skill 压缩包安全解压测试（无需启动服务）
+
+Usage:
+    uv run python -m pytest tests/test_skill_archive.py
+    uv run python tests/test_skill_archive.py
+"""
+import io
+import stat
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import settings
+from src.agent_skills.skill_archive import ArchiveError, extract_upload, safe_extract, save_upload
+from src.agent_skills.skill_hash import combine_hashes, compute_skill_hash
+
+SKILL_MD = "---\nname: demo\ndescription: demo skill\n---\n# Demo\n"
+
+
+def build_zip(entries: dict[str, bytes], symlinks: dict[str, str] | None = None) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+        for name, target in (symlinks or {}).items():
+            info = zipfile.ZipInfo(name)
+            info.external_attr = (stat.S_IFLNK | 0o777) << 16
+            zf.writestr(info, target)
+    return buffer.getvalue()
+
+
+def expect_archive_error(data: bytes, keyword: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = Path(tmp) / "skill.zip"
+        zip_path.write_bytes(data)
+        try:
+            safe_extract(zip_path, Path(tmp) / "out")
+        except ArchiveError as e:
+            assert keyword in str(e), f"Unexpected error: {e}"
+            return
+    raise AssertionError(f"Expected ArchiveError containing '{keyword}'")
+
+
+def test_extract_hashes_match_directory_hash():
+    data = build_zip({"demo/SKILL.md": SKILL_MD.encode(), "demo/scripts/run.py": b"print('ok')\n"})
+    with tempfile.TemporaryDirectory() as tmp:
+        skill_dir, file_hashes = extract_upload(io.BytesIO(data), "demo.zip", Path(tmp))
+        assert skill_dir.name == "demo"
+        assert set(file_hashes) == {"SKILL.md", "scripts/run.py"}
+        assert combine_hashes(file_hashes) == compute_skill_hash(skill_dir)
+        assert not (Path(tmp) / "demo.zip").exists()
+
+
+def test_rejects_path_traversal():
+    expect_archive_error(build_zip({"../evil.txt": b"x"}), "traversal")
+    expect_archive_error(build_zip({"/etc/evil.txt": b"x"}), "Absolute")
+
+
+def test_rejects_symlink():
+    expect_archive_error(build_zip({"SKILL.md": SKILL_MD.encode()}, symlinks={"link": "/etc/passwd"}), "Symlink")
+
+
+def test_rejects_too_many_entries():
+    entries = {f"f{i}.txt": b"x" for i in range(settings.SKILL_ARCHIVE_MAX_ENTRIES + 1)}
+    expect_archive_error(build_zip(entries), "entries")
+
+
+def test_rejects_zip_bomb_ratio():
+    expect_archive_error(build_zip({"bomb.bin": b"\0" * (8 * 1024 * 1024)}), "compression ratio")
+
+
+def test_corrupt_member_raises_archive_error():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("SKILL.md", SKILL_MD.encode())
+    expect_archive_error(buffer.getvalue().replace(b"# Demo", b"# Evil"), "Cannot read SKILL.md")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("data.bin", bytes(range(256)) * 64)
+    data = buffer.getvalue()
+    payload_end = data.index(b"PK\x01\x02")
+    expect_archive_error(data[:40] + b"\xff" * (payload_end - 40) + data[payload_end:], "Cannot read data.bin")
+
+
+def test_rejects_oversized_upload():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            save_upload(io.BytesIO(b"x" * 2048), Path(tmp) / "big.zip", max_bytes=1024)
+        except ArchiveError:
+            return
+    raise AssertionError("Expected ArchiveError for oversized upload")
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
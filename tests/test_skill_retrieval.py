@@ -0,0 +1,87 @@
+"""Skill 检索离线基准：BM25 触发准确率（无需启动服务）
+
+Usage:
+    uv run python -m pytest tests/test_skill_retrieval.py
+    uv run python tests/test_skill_retrieval.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.agent_skills.skill_retrieval import BM25Index, format_skill_hints, tokenize
+
+CATALOG = [
+    {"name": "pdf-extract", "description": "从 PDF 文件中提取文本和表格", "triggers": ["解析PDF", "PDF转文字"]},
+    {"name": "excel-report", "description": "读取 Excel 表格并生成统计报表", "triggers": ["xlsx", "数据汇总"]},
+    {"name": "chart-plot", "description": "使用 matplotlib 绘制折线图、柱状图等数据图表", "triggers": ["画图", "可视化"]},
+    {"name": "image-resize", "description": "批量调整图片尺寸、压缩与格式转换", "triggers": ["缩放图片", "png jpg"]},
+    {"name": "web-scraper", "description": "抓取网页内容并保存为 Markdown", "triggers": ["爬虫", "crawl"]},
+    {"name": "docx-writer", "description": "生成 Word 文档，支持标题、段落和表格样式", "triggers": ["word", "docx"]},
+    {"name": "csv-clean", "description": "清洗 CSV 数据：去重、缺失值填充、字段规范化", "triggers": ["数据清洗"]},
+    {"name": "translate-doc", "description": "将文档翻译为中文或英文，保留原有格式", "triggers": ["翻译"]},
+]
+for entry in CATALOG:
+    entry["path"] = f"/skills/{entry['name']}"
+
+# (用户请求, 期望触发的 Skill)
+QUERIES = [
+    ("帮我把这个 PDF 里的表格提取出来", "pdf-extract"),
+    ("解析一下上传的pdf文件内容", "pdf-extract"),
+    ("把 sales.xlsx 按月份汇总生成报表", "excel-report"),
+    ("统计一下 Excel 里每个部门的销售额", "excel-report"),
+    ("用这些数据画一个折线图", "chart-plot"),
+    ("把结果可视化成柱状图", "chart-plot"),
+    ("把文件夹里的图片都压缩一下", "image-resize"),
+    ("将 png 转换成 jpg 并缩放到 800 宽", "image-resize"),
+    ("抓取这个网页的内容保存成 markdown", "web-scraper"),
+    ("写个爬虫 crawl 一下新闻列表", "web-scraper"),
+    ("生成一份 Word 文档格式的周报", "docx-writer"),
+    ("输出 docx 文件，带标题和表格", "docx-writer"),
+    ("清洗这个 csv，去掉重复行", "csv-clean"),
+    ("数据里有缺失值，帮我填充一下", "csv-clean"),
+    ("把这篇英文文档翻译成中文", "translate-doc"),
+    ("translate this document into English", "translate-doc"),
+]
+
+
+def evaluate(index: BM25Index, k: int = 3) -> tuple[float, float]:
+    top1 = topk = 0
+    for query, expected in QUERIES:
+        names = [entry["name"] for entry, _ in index.search(query, k=k)]
+        top1 += bool(names) and names[0] == expected
+        topk += expected in names
+    return top1 / len(QUERIES), topk / len(QUERIES)
+
+
+def test_tokenize_mixed_text():
+    assert tokenize("解析PDF文件") == ["pdf", "解析", "文件"]
+    assert tokenize("图") == ["图"]
+
+
+def test_trigger_accuracy_benchmark():
+    top1, top3 = evaluate(BM25Index(CATALOG))
+    print(f"  top1={top1:.2%} top3={top3:.2%} over {len(QUERIES)} queries")
+    assert top1 >= 0.8, f"top1 accuracy {top1:.2%}"
+    assert top3 >= 0.9, f"top3 accuracy {top3:.2%}"
+
+
+def test_unrelated_query_injects_nothing():
+    assert BM25Index(CATALOG).search("今天天气怎么样", k=3, min_score=1.0) == []
+
+
+def test_empty_index():
+    assert BM25Index([]).search("pdf") == []
+
+
+def test_format_skill_hints():
+    text = format_skill_hints([CATALOG[0]])
+    assert "pdf-extract" in text and "/skills/pdf-extract/SKILL.md" in text
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
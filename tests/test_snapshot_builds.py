@@ -0,0 +1,88 @@
+"""快照构建队列测试：构建异常时记录失败并继续处理后续排队（临时 sqlite，无需 Daytona）
+
+Usage:
+    uv run python -m pytest tests/test_snapshot_builds.py
+    uv run python tests/test_snapshot_builds.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+import src.database as database
+from src.config import settings
+from src.database import SnapshotBuild
+from src.snapshot_manager import BUILD_FAILED, BUILD_QUEUED, BUILD_RUNNING, SnapshotManager
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(temp_db):
+    return temp_db
+
+
+def _queue_builds(count: int) -> list[str]:
+    with database.SessionLocal() as db:
+        for i in range(count):
+            db.add(SnapshotBuild(build_id=f"build-{i}", status=BUILD_QUEUED, reason="test", request_count=1))
+        db.commit()
+    return [f"build-{i}" for i in range(count)]
+
+
+def _statuses() -> dict[str, tuple[str, str | None]]:
+    with database.SessionLocal() as db:
+        return {b.build_id: (b.status, b.error) for b in db.query(SnapshotBuild).all()}
+
+
+def test_build_exception_marks_failed_and_continues(monkeypatch):
+    build_ids = _queue_builds(2)
+    manager = SnapshotManager()
+    monkeypatch.setattr(settings, "SNAPSHOT_BUILD_DEBOUNCE_SECONDS", 0)
+
+    def crash(build_id=None):
+        raise ConnectionError("daytona down")
+
+    monkeypatch.setattr(manager, "_build", crash)
+    asyncio.run(manager._run_queued_builds())
+
+    statuses = _statuses()
+    for build_id in build_ids:
+        assert statuses[build_id][0] == BUILD_FAILED
+        assert "daytona down" in statuses[build_id][1]
+
+
+def test_sandbox_creation_failure_is_reported(monkeypatch):
+    manager = SnapshotManager()
+    skills_dir = Path(settings.SHARED_DIR) / "skills"
+    skills_dir.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(manager, "_collect_desired_manifest", lambda: {"demo": "hash"})
+
+    def fail_create(client, base_snapshot_id):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(manager, "_create_build_sandbox", fail_create)
+    result = manager._build("build-x")
+    assert result["snapshot_id"] is None
+    assert "quota exceeded" in result["error"]
+
+
+def test_resume_fails_interrupted_and_reschedules_queued(monkeypatch):
+    _queue_builds(1)
+    with database.SessionLocal() as db:
+        db.add(SnapshotBuild(build_id="build-running", status=BUILD_RUNNING, reason="test", request_count=1))
+        db.commit()
+    manager = SnapshotManager()
+    scheduled = []
+    monkeypatch.setattr(manager, "_ensure_worker", lambda: scheduled.append(True))
+
+    asyncio.run(manager.resume_pending_builds())
+    statuses = _statuses()
+    assert statuses["build-running"] == (BUILD_FAILED, "Interrupted by restart")
+    assert statuses["build-0"][0] == BUILD_QUEUED
+    assert scheduled == [True]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,48 @@
+"""启动开销测试：导入应用不应加载 LLM / Agent 相关的重型依赖
+
+Usage:
+    uv run python -m pytest tests/test_startup.py
+    uv run python tests/test_startup.py
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ("langchain_openai", "deepagents", "langchain_daytona", "src.agent_manager", "src.agent_skills.skill_validator")
+
+
+def _loaded_after(statement: str) -> list[str]:
+    code = f"import sys; {statement}; print('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=os.environ.copy(),
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    line = result.stdout.strip().splitlines()[-1]
+    return [name for name in line.removeprefix("loaded:").split(",") if name]
+
+
+def test_config_import_is_lazy():
+    assert _loaded_after("from src.config import settings") == []
+
+
+def test_llm_built_on_first_access():
+    assert _loaded_after("import src.config as c; c.big_llm") == ["langchain_openai"]
+
+
+def test_app_import_defers_agent_stack():
+    assert _loaded_after("import main") == []
+
+
+def test_agent_skills_package_exports_lazily():
+    assert _loaded_after("from src.agent_skills import get_skill_manager, STATUS_PENDING") == []
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")
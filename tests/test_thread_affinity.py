@@ -0,0 +1,109 @@
+"""线程亲和测试：一致性哈希环、成员登记（临时 sqlite）与请求路由（无需启动服务）
+
+Usage:
+    uv run python -m pytest tests/test_thread_affinity.py
+    uv run python tests/test_thread_affinity.py
+"""
+import asyncio
+import sys
+import uuid
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from starlette.requests import Request
+
+from src.config import settings
+from src.thread_affinity import FORWARDED_HEADER, HashRing, ThreadAffinity
+
+THREADS = [f"user{i % 50}-{uuid.UUID(int=i)}" for i in range(20000)]
+
+
+def _workers(n: int) -> list[str]:
+    return [f"http://10.0.0.{i}:8000" for i in range(1, n + 1)]
+
+
+def _request(path: str, headers: dict | None = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = HashRing(_workers(4))
+    assert ring.owner(THREADS[0]) == HashRing(list(reversed(_workers(4)))).owner(THREADS[0])
+    load = Counter(ring.owner(thread_id) for thread_id in THREADS)
+    assert set(load) == set(_workers(4))
+    # 128 个虚拟节点时各 worker 负载偏差在 ±25% 内
+    assert max(load.values()) < 1.25 * len(THREADS) / 4
+    assert min(load.values()) > 0.75 * len(THREADS) / 4
+
+
+def test_join_moves_only_its_share():
+    before, after = HashRing(_workers(4)), HashRing(_workers(5))
+    moved = [t for t in THREADS if before.owner(t) != after.owner(t)]
+    # 新 worker 只接走约 1/5 的 thread，且全部迁往新 worker
+    assert 0.12 < len(moved) / len(THREADS) < 0.28
+    assert {after.owner(t) for t in moved} == {_workers(5)[-1]}
+
+
+def test_leave_moves_only_departed_threads():
+    before, after = HashRing(_workers(5)), HashRing(_workers(4))
+    departed = _workers(5)[-1]
+    for thread_id in THREADS:
+        if before.owner(thread_id) != departed:
+            assert after.owner(thread_id) == before.owner(thread_id)
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).owner(THREADS[0]) is None
+
+
+def test_membership_join_and_leave(temp_db):
+    first, second = ThreadAffinity("http://10.0.0.1:8000"), ThreadAffinity("http://10.0.0.2:8000/")
+    first._beat()
+    assert first.refresh().nodes == ("http://10.0.0.1:8000",)
+    second._beat()
+    assert first.refresh().nodes == ("http://10.0.0.1:8000", "http://10.0.0.2:8000")
+    assert second.refresh().nodes == first.ring.nodes
+
+    second._leave()
+    assert first.refresh().nodes == ("http://10.0.0.1:8000",)
+    first._leave()
+
+
+def test_routing_decisions():
+    affinity = ThreadAffinity("http://10.0.0.1:8000")
+    affinity.ring = HashRing(["http://10.0.0.1:8000", "http://10.0.0.9:1"])
+    local = next(t for t in THREADS if affinity.owner_of(t) == affinity.url)
+    remote = next(t for t in THREADS if affinity.owner_of(t) != affinity.url)
+
+    async def main():
+        assert await affinity.route(_request(f"/api/status/{local}"), local) is None
+        # 已被转发过的请求由本 worker 处理，避免循环
+        assert await affinity.route(_request(f"/api/status/{remote}", {FORWARDED_HEADER: "x"}), remote) is None
+        # 属主不可达时退回本地处理
+        assert await affinity.route(_request(f"/api/status/{remote}"), remote) is None
+
+        original = settings.THREAD_AFFINITY_MODE
+        settings.THREAD_AFFINITY_MODE = "redirect"
+        try:
+            response = await affinity.route(_request(f"/api/status/{remote}"), remote)
+        finally:
+            settings.THREAD_AFFINITY_MODE = original
+        assert response.status_code == 307
+        assert response.headers["location"] == f"http://10.0.0.9:1/api/status/{remote}"
+        if affinity._http is not None:
+            await affinity._http.aclose()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
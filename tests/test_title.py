@@ -0,0 +1,121 @@
+"""会话标题生成测试：启发式快速路径、缓存命中、满载时延后批量生成（假路由器 + 临时 sqlite）
+
+Usage:
+    uv run python -m pytest tests/test_title.py
+    uv run python tests/test_title.py
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+import src.agent_utils.title as title_module
+from src.agent_utils.title import DEFAULT_TITLE, TitleService, _clean_title, heuristic_title
+from src.database import Thread, TitleCache
+
+LONG_MESSAGE = "帮我写一个 Python 脚本，批量把目录下的 PNG 图片转换成 JPEG 并压缩到 200KB 以内"
+
+
+class FakeRouter:
+    """记录提示词的假路由器，saturated 可由测试切换"""
+
+    def __init__(self, reply=lambda prompt: "图片批量转换"):
+        self.reply = reply
+        self.saturated = False
+        self.prompts: list[str] = []
+
+    async def ainvoke(self, prompt, hedge=True):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=self.reply(prompt))
+
+
+def test_heuristic_fast_path_skips_llm():
+    router = FakeRouter()
+    service = TitleService(router)
+    assert heuristic_title("你好！") == DEFAULT_TITLE
+    assert heuristic_title("  ") == DEFAULT_TITLE
+    assert asyncio.run(service.get_title("t1", "Hello")) == DEFAULT_TITLE
+    assert asyncio.run(service.get_title("t1", "修复登录 bug")) == "修复登录 bug"
+    assert heuristic_title(LONG_MESSAGE) is None
+    assert router.prompts == []
+
+
+def test_clean_title_handles_decoration_only_replies():
+    assert _clean_title('""') == DEFAULT_TITLE
+    assert _clean_title("**") == DEFAULT_TITLE
+    assert _clean_title("  ") == DEFAULT_TITLE
+    assert _clean_title('"# 图片批量转换"') == "图片批量转换"
+    assert _clean_title("图片批量转换\n说明") == "图片批量转换"
+
+
+def test_generated_title_is_cached_in_memory_and_db(temp_db):
+    router = FakeRouter(lambda prompt: '"图片批量转换"')
+    assert asyncio.run(TitleService(router).get_title("t1", LONG_MESSAGE)) == "图片批量转换"
+    assert len(router.prompts) == 1
+
+    # 新实例（如重启后）的内存缓存为空，从持久化缓存命中
+    service = TitleService(router)
+    same_prompt = LONG_MESSAGE.upper() + "。"
+    assert asyncio.run(service.get_title("t2", same_prompt)) == "图片批量转换"
+    assert asyncio.run(service.get_title("t3", same_prompt)) == "图片批量转换"
+    assert len(router.prompts) == 1
+    with temp_db() as db:
+        assert db.query(TitleCache).one().hits == 1
+
+
+def test_saturated_router_defers_and_batches(monkeypatch, temp_db):
+    monkeypatch.setattr(title_module, "BATCH_WINDOW_SECONDS", 0)
+    messages = [f"{LONG_MESSAGE}，第 {i} 个" for i in range(3)]
+    router = FakeRouter(lambda prompt: json.dumps([f"标题{i}" for i in range(3)], ensure_ascii=False))
+    router.saturated = True
+    service = TitleService(router)
+
+    async def main():
+        provisional = []
+        for i, message in enumerate(messages):
+            title = await service.get_title(f"t{i}", message)
+            provisional.append(title)
+            with temp_db() as db:
+                db.add(Thread(thread_id=f"t{i}", user_id="u", title=title))
+                db.commit()
+        assert router.prompts == []
+        router.saturated = False
+        await service._worker
+        return provisional
+
+    provisional = asyncio.run(main())
+    assert provisional == [message[:title_module.TITLE_MAX_LENGTH] for message in messages]
+    # 三条消息合并为一次 LLM 调用，回写标题并写入缓存
+    assert len(router.prompts) == 1 and "3 条消息" in router.prompts[0]
+    with temp_db() as db:
+        assert {t.thread_id: t.title for t in db.query(Thread).all()} == {f"t{i}": f"标题{i}" for i in range(3)}
+    assert asyncio.run(service.get_title("t9", messages[1])) == "标题1"
+    assert len(router.prompts) == 1
+
+
+def test_deferred_title_keeps_user_rename(monkeypatch, temp_db):
+    monkeypatch.setattr(title_module, "BATCH_WINDOW_SECONDS", 0)
+    router = FakeRouter(lambda prompt: '["图片批量转换"]')
+    router.saturated = True
+    service = TitleService(router)
+
+    async def main():
+        await service.get_title("t1", LONG_MESSAGE)
+        with temp_db() as db:
+            db.add(Thread(thread_id="t1", user_id="u", title="我的改名"))
+            db.commit()
+        router.saturated = False
+        await service._worker
+
+    asyncio.run(main())
+    with temp_db() as db:
+        assert db.query(Thread).one().title == "我的改名"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
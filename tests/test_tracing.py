@@ -0,0 +1,121 @@
+"""运行追踪测试：span 树、LangChain 回调、环形缓冲
+
+Usage:
+    uv run python -m pytest tests/test_tracing.py
+    uv run python tests/test_tracing.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.tools import tool
+
+from src.utils.tracing import (
+    Trace, TraceStore, TracingCallbackHandler, current_trace, get_trace_store,
+    instrument_async_method, start_trace, trace_span,
+)
+
+
+@tool
+def slow_tool(seconds: float) -> str:
+    """Sleep for a while."""
+    time.sleep(seconds)
+    return "done"
+
+
+def test_span_tree_and_breakdown():
+    with start_trace("run-a", "chat", "thread-a", "user-a") as trace:
+        with trace_span("create", "sandbox") as outer:
+            with trace_span("initial_sync", "sync") as inner:
+                time.sleep(0.01)
+        with trace_span("upload_files", "sandbox"):
+            pass
+    assert current_trace() is None
+
+    data = get_trace_store().get("run-a").to_dict()
+    spans = {s["name"]: s for s in data["spans"]}
+    assert data["finished"] and data["spans"][0]["kind"] == "run"
+    assert spans["initial_sync"]["parent_id"] == outer.span_id
+    assert spans["create"]["parent_id"] == trace.root.span_id
+    assert data["breakdown"]["sandbox"]["count"] == 2
+    assert data["breakdown"]["sync"]["total_ms"] >= 10
+    assert inner.duration <= outer.duration
+
+
+def test_no_trace_is_noop():
+    with trace_span("create", "sandbox") as span:
+        assert span is None
+
+
+def test_langchain_callbacks_record_llm_and_tool():
+    model = FakeListChatModel(responses=["hi"])
+
+    async def run():
+        with start_trace("run-b", "chat", "thread-b", "user-b") as trace:
+            config = {"callbacks": [TracingCallbackHandler(trace)]}
+            await model.ainvoke("hello", config=config)
+            await slow_tool.ainvoke({"seconds": 0.02}, config=config)
+
+    asyncio.run(run())
+    breakdown = get_trace_store().get("run-b").breakdown()
+    assert breakdown["llm"]["count"] == 1
+    assert breakdown["tool"]["count"] == 1 and breakdown["tool"]["total_ms"] >= 20
+
+
+def test_concurrent_runs_are_isolated():
+    async def run(run_id: str):
+        with start_trace(run_id, "chat", run_id, "u"):
+            for _ in range(3):
+                with trace_span("op", "sandbox"):
+                    await asyncio.sleep(0.001)
+
+    async def main():
+        await asyncio.gather(*(run(f"iso-{i}") for i in range(5)))
+
+    asyncio.run(main())
+    for i in range(5):
+        assert get_trace_store().get(f"iso-{i}").breakdown()["sandbox"]["count"] == 3
+
+
+def test_instrumented_method_and_error():
+    class Saver:
+        async def aput(self, value):
+            if value is None:
+                raise ValueError("bad")
+            return value
+
+    saver = Saver()
+    instrument_async_method(saver, "aput", "checkpoint")
+
+    async def run():
+        with start_trace("run-c", "resume", "thread-c", "user-c"):
+            await saver.aput(1)
+            try:
+                await saver.aput(None)
+            except ValueError:
+                pass
+
+    asyncio.run(run())
+    spans = [s for s in get_trace_store().get("run-c").to_dict()["spans"] if s["kind"] == "checkpoint"]
+    assert [s["name"] for s in spans] == ["checkpoint.aput", "checkpoint.aput"]
+    assert spans[1]["error"] == "ValueError: bad"
+
+
+def test_ring_buffer_evicts_oldest():
+    store = TraceStore(maxsize=3)
+    for i in range(5):
+        store.add(Trace(f"r{i}", "chat", "t", "u"))
+    assert store.get("r0") is None and store.get("r4") is not None
+    assert [t.run_id for t in store.recent()] == ["r4", "r3", "r2"]
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"  [PASS] {test.__name__}")
+    print(f"\nAll {len(tests)} tests passed")